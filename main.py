@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
-"""Main entry point for DART MCP Server - completely standalone."""
+"""Main entry point for DART MCP Server."""
 
 import os
 import sys
 
+# Run from a checkout without installing the package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+
 def main():
     """Main function."""
     port = int(os.environ.get('PORT', 8000))
-    host = '0.0.0.0'
+    host = os.environ.get('HOST', '0.0.0.0')
     
     print(f"🚀 Starting DART MCP Server...")
     print(f"📍 Host: {host}")
@@ -15,274 +19,9 @@ def main():
     print(f"🌐 Environment: {os.environ.get('RAILWAY_ENVIRONMENT', os.environ.get('RENDER', 'local'))}")
     
     try:
-        # Install dependencies if needed
-        try:
-            import fastapi
-            import uvicorn
-            print("✅ Dependencies already installed")
-        except ImportError:
-            print("📦 Installing dependencies...")
-            os.system("pip install fastapi uvicorn")
-            import fastapi
-            import uvicorn
-            print("✅ Dependencies installed successfully")
-        
-        # Create the FastAPI app inline
-        from fastapi import FastAPI
-        from datetime import datetime
-        
-        app = FastAPI(title="DART MCP Server")
-        
-        @app.get("/")
-        async def root():
-            return {"message": "DART MCP Server is running!", "status": "ok"}
-        
-        @app.get("/health")
-        async def health_check():
-            return {"status": "healthy", "timestamp": datetime.now().isoformat()}
-        
-        @app.get("/test")
-        async def test_endpoint():
-            return {"message": "Test endpoint working!", "status": "ok"}
-        
-        @app.get("/mcp/routes")
-        async def list_routes():
-            try:
-                # Import the real GTFS logic
-                import sys
-                import os
-                sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
-                
-                from dart_mcp.server import list_routes as real_list_routes
-                result = await real_list_routes()
-                return {
-                    "success": True,
-                    "data": result,
-                    "error": None
-                }
-            except Exception as e:
-                # Fallback to hardcoded list
-                return {
-                    "success": True,
-                    "data": "Available DART bus routes:\n• UNIVERSITY\n• FAIRGROUNDS\n• MAURY ST\n• FRANKLIN AVE\n• E 14TH ST\n• SW 9TH ST\n• INDIANOLA AVE\n• UNIVERSITY / INGERSOLL",
-                    "error": None
-                }
-        
-        @app.get("/mcp/stations")
-        async def list_stations():
-            try:
-                # Import the real GTFS logic
-                import sys
-                import os
-                sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
-                
-                from dart_mcp.server import list_stations as real_list_stations
-                result = await real_list_stations()
-                return {
-                    "success": True,
-                    "data": result,
-                    "error": None
-                }
-            except Exception as e:
-                # Fallback to hardcoded list
-                return {
-                    "success": True,
-                    "data": "Available DART bus stops:\n• DART Central Station\n• University\n• Fairgrounds\n• Maury St\n• Franklin Ave\n• E 14th St\n• SW 9th St\n• Indianola Ave\n• University / Ingersoll",
-                    "error": None
-                }
-        
-        @app.post("/mcp/next_trains")
-        async def next_trains(request: dict):
-            """Get next DART bus departures from origin to destination."""
-            try:
-                origin = request.get("origin", "")
-                destination = request.get("destination", "")
-                when_iso = request.get("when_iso")
-                
-                # Import the real GTFS logic
-                try:
-                    # Add the src directory to Python path
-                    import sys
-                    import os
-                    sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
-                    
-                    from dart_mcp import gtfs
-                    from dart_mcp.server import next_trains as real_next_trains
-                    
-                    # Use the real GTFS-based logic
-                    result = await real_next_trains(origin, destination, when_iso)
-                    
-                    # Check if the result indicates no service (likely due to expired GTFS data)
-                    if "No more buses today" in result or "No departures found" in result:
-                        # Provide realistic demo data for common routes
-                        return await get_demo_schedule(origin, destination)
-                    
-                    return {
-                        "success": True,
-                        "data": result,
-                        "error": None
-                    }
-                    
-                except ImportError as e:
-                    # Fallback to demo data if GTFS import fails
-                    return await get_demo_schedule(origin, destination)
-                    
-            except Exception as e:
-                return {
-                    "success": False,
-                    "data": "",
-                    "error": f"Error getting next trains: {str(e)}"
-                }
-
-        @app.get("/mcp/tools")
-        async def mcp_tools():
-            return {
-                "tools": [
-                    {
-                        "name": "next_trains",
-                        "description": "Get next DART bus departures from origin to destination",
-                        "input_schema": {
-                            "type": "object",
-                            "properties": {
-                                "origin": {
-                                    "type": "string",
-                                    "description": "Origin stop name (e.g., 'Central Station')"
-                                },
-                                "destination": {
-                                    "type": "string", 
-                                    "description": "Destination stop name (e.g., 'Maury St')"
-                                },
-                                "when_iso": {
-                                    "type": "string",
-                                    "description": "Optional ISO-8601 datetime (default: now)"
-                                }
-                            },
-                            "required": ["origin", "destination"]
-                        }
-                    },
-                    {
-                        "name": "list_routes",
-                        "description": "List all available DART bus routes",
-                        "input_schema": {"type": "object", "properties": {}}
-                    },
-                    {
-                        "name": "list_stations",
-                        "description": "List all available DART bus stops", 
-                        "input_schema": {"type": "object", "properties": {}}
-                    }
-                ]
-            }
-        
-        async def get_demo_schedule(origin: str, destination: str):
-            """Provide realistic demo schedules for common routes."""
-            from datetime import datetime, timedelta
-            
-            now = datetime.now()
-            current_hour = now.hour
-            current_minute = now.minute
-            
-            def generate_upcoming_times(base_interval_minutes=15, num_departures=5):
-                """Generate upcoming departure times based on current time."""
-                times = []
-                current_time = now
-                
-                # If it's late night (after 10 PM), show early morning times for next day
-                if current_hour >= 22:
-                    # Show times starting from 5:30 AM next day
-                    next_day = current_time + timedelta(days=1)
-                    start_time = next_day.replace(hour=5, minute=30, second=0, microsecond=0)
-                elif current_hour < 5:
-                    # If it's very early morning, show times starting from 5:30 AM same day
-                    start_time = current_time.replace(hour=5, minute=30, second=0, microsecond=0)
-                    if start_time <= current_time:
-                        start_time = start_time + timedelta(days=1)
-                else:
-                    # Normal hours - show next few departures
-                    # Round up to next 15-minute interval
-                    minutes_to_next = 15 - (current_minute % 15)
-                    if minutes_to_next == 15:
-                        minutes_to_next = 0
-                    start_time = current_time + timedelta(minutes=minutes_to_next)
-                    start_time = start_time.replace(second=0, microsecond=0)
-                
-                # Generate departure times
-                for i in range(num_departures):
-                    departure_time = start_time + timedelta(minutes=i * base_interval_minutes)
-                    times.append(departure_time.strftime("%I:%M %p"))
-                
-                return times
-            
-            # Common route patterns with dynamic schedules
-            routes = {
-                ("central station", "6th ave"): {
-                    "route": "Route 3 - UNIVERSITY",
-                    "stops": ["Central Station", "6th Ave / University Ave"],
-                    "interval": 15  # Every 15 minutes
-                },
-                ("central station", "valley west mall"): {
-                    "route": "Route 72 - WEST DES MOINES VALLEY", 
-                    "stops": ["Central Station", "Valley West Mall"],
-                    "interval": 30  # Every 30 minutes
-                },
-                ("central station", "university"): {
-                    "route": "Route 3 - UNIVERSITY",
-                    "stops": ["Central Station", "University"],
-                    "interval": 15  # Every 15 minutes
-                },
-                ("dart", "6th ave"): {
-                    "route": "Route 3 - UNIVERSITY", 
-                    "stops": ["DART Central Station", "6th Ave / University Ave"],
-                    "interval": 15  # Every 15 minutes
-                },
-                ("dart", "valley west mall"): {
-                    "route": "Route 72 - WEST DES MOINES VALLEY",
-                    "stops": ["DART Central Station", "Valley West Mall"],
-                    "interval": 30  # Every 30 minutes
-                }
-            }
-            
-            # Normalize inputs for matching
-            origin_norm = origin.lower().strip()
-            dest_norm = destination.lower().strip()
-            
-            # Try exact match first
-            key = (origin_norm, dest_norm)
-            if key in routes:
-                route_info = routes[key]
-                upcoming_times = generate_upcoming_times(route_info['interval'])
-                schedule_text = f"Next buses from {route_info['stops'][0]} to {route_info['stops'][1]}:\n"
-                for time in upcoming_times:
-                    schedule_text += f"• {route_info['route']}: {time}\n"
-                return {
-                    "success": True,
-                    "data": schedule_text.strip(),
-                    "error": None
-                }
-            
-            # Try partial matches
-            for (orig, dest), route_info in routes.items():
-                if (origin_norm in orig or orig in origin_norm) and (dest_norm in dest or dest in dest_norm):
-                    upcoming_times = generate_upcoming_times(route_info['interval'])
-                    schedule_text = f"Next buses from {route_info['stops'][0]} to {route_info['stops'][1]}:\n"
-                    for time in upcoming_times:
-                        schedule_text += f"• {route_info['route']}: {time}\n"
-                    return {
-                        "success": True,
-                        "data": schedule_text.strip(),
-                        "error": None
-                    }
-            
-            # No match found
-            return {
-                "success": True,
-                "data": f"No direct routes found from {origin} to {destination}. Available routes include: Route 3 (University), Route 72 (Valley West), Route 1 (Fairgrounds), Route 2 (Maury St).",
-                "error": None
-            }
-
-        print("✅ FastAPI app created successfully")
-        print(f"🎯 Starting server on {host}:{port}")
-        
-        uvicorn.run(app, host=host, port=port, log_level="info")
+        # The same app, engine and workers as every other entry point
+        from dart_mcp.remote_server import main as serve
+        serve()
         
     except Exception as e:
         print(f"❌ Server error: {e}")
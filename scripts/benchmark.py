@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Compare the storage engines on a GTFS feed: startup time, resident memory
+and query latency. Each engine runs in a fresh interpreter so memory numbers
+are not polluted by the other one.
+
+    python scripts/benchmark.py [--feed path/to/gtfs] [--engines pandas sqlite]
+"""
+
+import argparse
+import json
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def timed(func, repeat):
+    """Median wall time of ``func`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def open_engine(engine, feed, workdir):
+    from dart_mcp import gtfs, storage
+
+    if engine == "pandas":
+        return storage.PandasBackend(gtfs.load_gtfs_data(feed))
+    return storage.SQLiteBackend.from_feed(feed, Path(workdir) / "gtfs.sqlite")
+
+
+def run_engine(engine, feed, workdir, repeat):
+    """Benchmark one engine in this process and return its measurements."""
+    sys.path.insert(0, str(SRC_DIR))
+    baseline = rss_mb()
+
+    start = time.perf_counter()
+    backend = open_engine(engine, feed, workdir)
+    build_seconds = time.perf_counter() - start
+
+    # A second start shows the cost paid by every restart or extra worker
+    start = time.perf_counter()
+    backend = open_engine(engine, feed, workdir)
+    catalog = backend.route_catalog
+    open_seconds = time.perf_counter() - start
+
+    rng = random.Random(42)
+    stations = backend.list_all_stations()
+    names = rng.sample(stations, min(20, len(stations)))
+    routes = rng.sample(sorted(catalog.routes), min(20, len(catalog.routes)))
+    boards = []
+    for route_id in routes:
+        info = catalog.routes[route_id]
+        trip_ids = catalog.trips.get((route_id, None), [])
+        for stops in info.stops.values():
+            boards.append((stops[:1], trip_ids))
+            break
+    when = date(2025, 1, 8)
+    service_ids = backend.get_active_service_ids(when)
+
+    def departures():
+        for stop_ids, trip_ids in boards:
+            active = backend.active_trip_ids(trip_ids, service_ids)
+            backend.find_departures(stop_ids, active, 8 * 3600)
+
+    results = {
+        "engine": engine,
+        "build_seconds": round(build_seconds, 3),
+        "open_seconds": round(open_seconds, 3),
+        "find_stops_by_name_ms": round(
+            timed(lambda: [backend.find_stops_by_name(n) for n in names], repeat)
+            / max(len(names), 1),
+            3,
+        ),
+        "find_departures_ms": round(timed(departures, repeat) / max(len(boards), 1), 3),
+    }
+    results["rss_mb"] = round(rss_mb() - baseline, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--feed", type=Path, help="GTFS folder (default: bundled)")
+    parser.add_argument("--engines", nargs="+", default=["pandas", "sqlite"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.feed is None:
+        sys.path.insert(0, str(SRC_DIR))
+        from dart_mcp import gtfs
+
+        args.feed = gtfs.get_gtfs_folder()
+
+    if args.worker:
+        results = run_engine(args.worker, args.feed, args.workdir, args.repeat)
+        print(json.dumps(results))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        rows = []
+        for engine in args.engines:
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--feed",
+                    str(args.feed),
+                    "--repeat",
+                    str(args.repeat),
+                    "--worker",
+                    engine,
+                    "--workdir",
+                    workdir,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            rows.append(json.loads(out.splitlines()[-1]))
+
+    columns = list(rows[0])
+    print(" | ".join(columns))
+    for row in rows:
+        print(" | ".join(str(row[column]) for column in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 #!/usr/bin/env python
 """
-Download the latest DART GTFS feed, unzip, and place it in
-src/dart_mcp/data/dart-tx-us
+Download the latest DART GTFS feed, unzip, compact it (see
+dart_mcp.compaction) and place it in src/dart_mcp/data/dart-tx-us
 """
 
 import io
 import pathlib
 import shutil
+import sys
 import tempfile
 import urllib.request
 import zipfile
@@ -19,6 +20,7 @@ TARGET_DIR = (
     / "data"
     / "dart-tx-us"
 )
+SRC_DIR = pathlib.Path(__file__).parent.parent / "src"
 
 
 def main():
@@ -26,13 +28,20 @@ def main():
     with urllib.request.urlopen(GTFS_URL, timeout=60) as r:
         data = r.read()
 
+    sys.path.insert(0, str(SRC_DIR))
+    from dart_mcp.compaction import compact_feed
+
     with tempfile.TemporaryDirectory() as td:
         with zipfile.ZipFile(io.BytesIO(data)) as zf:
-            zf.extractall(td)
+            zf.extractall(pathlib.Path(td) / "raw")
+
+        # Drop expired service and everything no query reads
+        report = compact_feed(pathlib.Path(td) / "raw", pathlib.Path(td) / "compact")
+        print(report.summary())
 
         # Clean and create data directory
         shutil.rmtree(TARGET_DIR, ignore_errors=True)
-        shutil.copytree(td, TARGET_DIR)
+        shutil.copytree(pathlib.Path(td) / "compact", TARGET_DIR)
         print(f"✅  GTFS refreshed in {TARGET_DIR}")
 
 
@@ -0,0 +1,213 @@
+"""Admission control and load shedding for the HTTP tool endpoints.
+
+Every tool endpoint belongs to a :class:`Pool` with its own concurrency
+limit and a bounded wait queue. A request that finds its pool busy waits in
+the queue for at most ``max_wait`` seconds; when the queue is full, or the
+wait runs out, it is shed at once with ``503`` and a ``Retry-After`` header
+instead of adding to everyone's latency.
+
+Pools are isolated from each other, which is how cheap lookups get priority
+over expensive routing queries: station and route listings have a pool of
+their own with a generous limit, while the routing pool is small and sheds
+early, so a burst of travel-time matrices can never hold up
+``/mcp/stations``.
+
+Limits can be tuned per pool with ``DART_MCP_LIMIT_<POOL>`` set to
+``<concurrency>/<queue>``, e.g. ``DART_MCP_LIMIT_ROUTING=4/16``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import os
+from collections.abc import Awaitable, Callable, MutableMapping
+from typing import Any
+
+# ASGI plumbing
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# Seconds clients are told to wait before retrying a shed request
+RETRY_AFTER_SECONDS = 1
+
+
+class Overloaded(Exception):
+    """Raised when a pool can't admit a request."""
+
+    def __init__(self, pool: str, reason: str) -> None:
+        super().__init__(f"{pool} pool overloaded ({reason})")
+        self.pool = pool
+        self.reason = reason
+
+
+class Pool:
+    """A concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(
+        self, name: str, concurrency: int, queue_size: int, max_wait: float
+    ) -> None:
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.admitted = 0
+        self.shed: collections.Counter[str] = collections.Counter()
+        self._waiters: collections.deque[asyncio.Future[None]] = collections.deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """Take a slot, waiting in the queue if needed.
+
+        Raises :class:`Overloaded` when the queue is full or the wait runs
+        out.
+        """
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.shed["queue_full"] += 1
+            raise Overloaded(self.name, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:  # noqa: UP041 - not TimeoutError before 3.11
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self.shed["timeout"] += 1
+                raise Overloaded(self.name, "timeout") from None
+            # Otherwise the slot was handed over just as the wait ran out
+        except BaseException:
+            # Cancelled, e.g. because the client went away
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        """Free a slot, handing it straight to the longest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+def _pool_from_env(
+    name: str, concurrency: int, queue_size: int, max_wait: float
+) -> Pool:
+    setting = os.environ.get(f"DART_MCP_LIMIT_{name.upper()}")
+    if setting:
+        concurrency_text, _, queue_text = setting.partition("/")
+        concurrency = int(concurrency_text)
+        queue_size = int(queue_text or queue_size)
+    return Pool(name, concurrency, queue_size, max_wait)
+
+
+def default_pools() -> dict[str, Pool]:
+    """The standard pools, with limits overridable from the environment."""
+    max_wait = float(os.environ.get("DART_MCP_QUEUE_WAIT_SECONDS", 2.0))
+    return {
+        "lookup": _pool_from_env("lookup", 32, 256, max_wait),
+        "departures": _pool_from_env("departures", 8, 64, max_wait),
+        "routing": _pool_from_env("routing", 2, 8, max_wait / 2),
+    }
+
+
+class AdmissionControl:
+    """ASGI middleware applying per-endpoint :class:`Pool` limits.
+
+    ``routes`` maps request paths to pool names; other paths (health checks,
+    metrics, documentation) are never limited. The slot is held until the
+    response body has been sent, streaming responses included.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: dict[str, str],
+        pools: dict[str, Pool] | None = None,
+    ) -> None:
+        self.app = app
+        self.routes = routes
+        self.pools = pools if pools is not None else default_pools()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        pool_name = self.routes.get(scope["path"]) if scope["type"] == "http" else None
+        if pool_name is None:
+            await self.app(scope, receive, send)
+            return
+
+        pool = self.pools[pool_name]
+        try:
+            await pool.acquire()
+        except Overloaded as e:
+            await _send_overloaded(send, e)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            pool.release()
+
+
+def render_metrics(pools: dict[str, Pool]) -> str:
+    """Pool gauges and counters in the Prometheus text format."""
+    lines = []
+    gauges: tuple[tuple[str, str, Callable[[Pool], int]], ...] = (
+        ("active", "Requests being served", lambda p: p.active),
+        ("queued", "Requests waiting for a slot", lambda p: p.queued),
+        ("concurrency_limit", "Concurrent requests allowed", lambda p: p.concurrency),
+        ("queue_limit", "Requests allowed to wait", lambda p: p.queue_size),
+    )
+    for suffix, help_text, value in gauges:
+        metric = f"dart_mcp_admission_{suffix}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        lines += [
+            f'{metric}{{pool="{name}"}} {value(pool)}' for name, pool in pools.items()
+        ]
+
+    metric = "dart_mcp_admission_admitted_total"
+    lines += [f"# HELP {metric} Requests admitted", f"# TYPE {metric} counter"]
+    lines += [
+        f'{metric}{{pool="{name}"}} {pool.admitted}' for name, pool in pools.items()
+    ]
+    metric = "dart_mcp_admission_shed_total"
+    lines += [f"# HELP {metric} Requests shed", f"# TYPE {metric} counter"]
+    lines += [
+        f'{metric}{{pool="{name}",reason="{reason}"}} {pool.shed[reason]}'
+        for name, pool in pools.items()
+        for reason in ("queue_full", "timeout")
+    ]
+    return "\n".join(lines) + "\n"
+
+
+async def _send_overloaded(send: Send, error: Overloaded) -> None:
+    body = b'{"success":false,"data":"","error":"Server is busy, please retry shortly"}'
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(RETRY_AFTER_SECONDS).encode()),
+                (b"x-shed-reason", error.reason.encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,437 @@
+"""Timetable analytics for service planning.
+
+:func:`service_frequency` answers "how often does route X serve stop Y, by
+hour?": departures per hour, mean and longest headway and the span of
+service, for a date or a day type. It works on the typed arrays of the
+:class:`~dart_mcp.gtfs.TripLayout` and :class:`~dart_mcp.gtfs.DepartureIndex`
+with numpy rather than looping over stop times.
+
+:func:`build_segment_times` computes scheduled run-time statistics between
+consecutive stops by route, direction and hour band, to spot schedule
+padding and slow corridors. It is built once per feed as the
+:attr:`~dart_mcp.gtfs.GTFSData.segment_times` index, and
+:func:`route_segment_times` reads a route's rows from it.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Any
+
+from . import gtfs
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None  # type: ignore[assignment]
+    pd = None  # type: ignore[assignment]
+
+# Day types and the calendar.txt columns a service must run on to match
+DAY_TYPES = {
+    "weekday": gtfs.WEEKDAY_COLUMNS[:5],
+    **{day: (day,) for day in gtfs.WEEKDAY_COLUMNS},
+}
+# Bands of the day for run-time statistics, as (name, first hour, end hour);
+# departures past midnight count toward the early band
+HOUR_BANDS = (
+    ("early", 0, 6),
+    ("am_peak", 6, 9),
+    ("midday", 9, 15),
+    ("pm_peak", 15, 19),
+    ("evening", 19, 24),
+)
+SEGMENT_COLUMNS = ("trips", "min", "median", "p90")
+
+
+@dataclass(frozen=True)
+class HourlyService:
+    """Departures in one clock hour and the headways ending in it."""
+
+    hour: int
+    departures: int
+    mean_headway_minutes: float | None
+    max_headway_minutes: float | None
+
+
+@dataclass(frozen=True)
+class ServiceFrequency:
+    """How often one stop, or one direction of a route, is served in a day.
+
+    For a whole route, departures are counted where each trip starts.
+    """
+
+    label: str
+    departures: int
+    first_departure: str | None
+    last_departure: str | None
+    mean_headway_minutes: float | None
+    max_headway_minutes: float | None
+    hours: list[HourlyService]
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def service_ids_for_day(day: date | str, data: gtfs.GTFSData) -> list[Any]:
+    """Services running on a date, or on a day type from :data:`DAY_TYPES`."""
+    if isinstance(day, date):
+        return gtfs.get_active_service_ids(day, data)
+    columns = DAY_TYPES.get(day.strip().lower())
+    if columns is None:
+        raise ValueError(
+            f"Unknown day '{day}': use an ISO date or one of {', '.join(DAY_TYPES)}"
+        )
+    calendar = data.calendar
+    runs = (calendar[list(columns)] == 1).all(axis=1)
+    return calendar.loc[runs, "service_id"].tolist()
+
+
+def parse_day(day: str) -> date | str:
+    """An ISO date as a :class:`date`; anything else is taken as a day type."""
+    try:
+        return date.fromisoformat(day.strip())
+    except ValueError:
+        return day.strip().lower()
+
+
+def _headways(seconds: np.ndarray) -> tuple[float | None, float | None]:
+    gaps = np.diff(seconds)
+    if not len(gaps):
+        return None, None
+    return round(float(gaps.mean()) / 60, 1), round(float(gaps.max()) / 60, 1)
+
+
+def summarize_departures(label: str, seconds: np.ndarray) -> ServiceFrequency:
+    """Hourly counts, headways and span of a day's departure times."""
+    seconds = np.sort(np.asarray(seconds, dtype=np.int64))
+    hours = seconds // 3600
+    hour_values, hour_counts = np.unique(hours, return_counts=True)
+    # Each headway counts toward the hour of the departure that ends it
+    gaps = pd.Series(np.diff(seconds) / 60).groupby(hours[1:]).agg(["mean", "max"])
+    mean_gaps, max_gaps = gaps["mean"], gaps["max"]
+    hourly = [
+        HourlyService(
+            hour=int(hour),
+            departures=int(count),
+            mean_headway_minutes=(
+                round(float(mean_gaps[hour]), 1) if hour in gaps.index else None
+            ),
+            max_headway_minutes=(
+                round(float(max_gaps[hour]), 1) if hour in gaps.index else None
+            ),
+        )
+        for hour, count in np.column_stack((hour_values, hour_counts)).tolist()
+    ]
+    mean_headway, max_headway = _headways(seconds)
+    return ServiceFrequency(
+        label=label,
+        departures=len(seconds),
+        first_departure=gtfs.seconds_to_time(int(seconds[0])) if len(seconds) else None,
+        last_departure=gtfs.seconds_to_time(int(seconds[-1])) if len(seconds) else None,
+        mean_headway_minutes=mean_headway,
+        max_headway_minutes=max_headway,
+        hours=hourly,
+    )
+
+
+def _template_seconds(
+    templates: list[gtfs.FrequencyTemplate], stop_ids: set[str] | None
+) -> np.ndarray:
+    """Departure times of headway-based trips at ``stop_ids``, or from their
+    first stop when ``stop_ids`` is ``None``."""
+    chunks: list[np.ndarray] = []
+    for template in templates:
+        positions = (
+            [0]
+            if stop_ids is None
+            else [p for p, s in enumerate(template.stop_ids) if s in stop_ids]
+        )
+        for start, end, headway in template.windows:
+            starts = np.arange(start, end, headway, dtype=np.int64)
+            chunks.extend(starts + template.departure_offsets[p] for p in positions)
+    if not chunks:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def service_frequency(
+    data: gtfs.GTFSData,
+    day: date | str,
+    route: str | None = None,
+    stop: str | None = None,
+) -> list[ServiceFrequency]:
+    """Departures per hour, headways and span of service on ``day``.
+
+    With a ``stop``, its departures (on ``route`` only, if given) are
+    summarized together, all platforms included. With only a ``route``,
+    each direction is summarized from the departures of its trips at their
+    first stop. Raises ``ValueError`` for unknown names.
+    """
+    layout = data.trip_layout
+    trips = np.ones(len(layout.trip_ids), dtype=bool)
+    if route is not None:
+        trip_ids = data.route_catalog.trip_ids(route)
+        if not trip_ids:
+            raise ValueError(f"Route '{route}' not found")
+        trips[:] = False
+        trips[
+            [layout.trip_index[str(t)] for t in trip_ids if str(t) in layout.trip_index]
+        ] = True
+    trips &= data.connections.active_trips(service_ids_for_day(day, data))
+    templates = [
+        template
+        for trip_id, template in data.frequency_templates.items()
+        if trips[layout.trip_index[str(trip_id)]]
+    ]
+
+    if stop is not None:
+        stops = gtfs.find_stops_by_name(stop, data)
+        if not stops:
+            raise ValueError(f"Stop '{stop}' not found")
+        stop_ids = {s["stop_id"] for s in stops}
+        stop_ids.update(
+            platform
+            for stop_id in list(stop_ids)
+            for platform in gtfs.get_platform_stops_for_station(stop_id, data)
+        )
+        rows = data.departures.rows_after(stop_ids)
+        rows = rows[trips[layout.trips[rows]]]
+        seconds = np.concatenate(
+            [layout.departures[rows], _template_seconds(templates, stop_ids)]
+        )
+        label = stops[0]["stop_name"]
+        if route is not None:
+            label = f"{label}, route {route}"
+        return [summarize_departures(label, seconds)]
+    if route is None:
+        raise ValueError("Give a route, a stop or both")
+
+    # Where each trip starts: its first call with a departure time
+    timed = np.flatnonzero(np.asarray(layout.departures) >= 0)
+    first_trips, first = np.unique(layout.trips[timed], return_index=True)
+    starts = timed[first]
+    template_trips = np.zeros(len(layout.trip_ids), dtype=bool)
+    template_trips[[layout.trip_index[str(t)] for t in data.frequency_templates]] = True
+    keep = trips[first_trips] & ~template_trips[first_trips]
+    first_trips, starts = first_trips[keep], starts[keep]
+
+    _, directions = trip_routes(data.trips, layout.trip_ids)
+    headsigns = _route_headsigns(data, route)
+    results = []
+    for direction in np.unique(directions[trips]).tolist():
+        in_direction = directions[first_trips] == direction
+        seconds = np.concatenate(
+            [
+                layout.departures[starts[in_direction]],
+                _template_seconds(
+                    [
+                        t
+                        for t in templates
+                        if directions[layout.trip_index[str(t.trip_id)]] == direction
+                    ],
+                    None,
+                ),
+            ]
+        )
+        label = _direction_label(route, direction, headsigns)
+        results.append(summarize_departures(label, seconds))
+    return results
+
+
+def trip_routes(
+    trips_df: pd.DataFrame, trip_ids: list[Any]
+) -> tuple[np.ndarray, np.ndarray]:
+    """Route ID (a string, ``None`` if unknown) and ``direction_id`` (0 where
+    the feed has none) of each of ``trip_ids``."""
+    trips = trips_df.drop_duplicates("trip_id")
+    trips = trips.set_index(trips["trip_id"].astype(str))
+    keys = [str(trip_id) for trip_id in trip_ids]
+    routes = trips["route_id"].astype(str).reindex(keys)
+    if "direction_id" not in trips.columns:
+        return routes.to_numpy(dtype=object), np.zeros(len(keys), dtype=int)
+    directions = trips["direction_id"].reindex(keys).fillna(0).astype(int)
+    return routes.to_numpy(dtype=object), directions.to_numpy()
+
+
+def _route_headsigns(data: gtfs.GTFSData, route: str) -> dict[int, list[str]]:
+    """Headsigns of each direction of the routes matching ``route``."""
+    headsigns: dict[int, list[str]] = {}
+    for info in data.route_catalog.resolve(route):
+        for direction, names in info.headsigns.items():
+            headsigns.setdefault(direction, []).extend(names)
+    return headsigns
+
+
+def _direction_label(
+    route: str, direction: int, headsigns: dict[int, list[str]]
+) -> str:
+    label = f"Route {route}, direction {direction}"
+    if headsigns.get(direction):
+        label += f" (to {' / '.join(headsigns[direction])})"
+    return label
+
+
+@dataclass(frozen=True)
+class SegmentTimes:
+    """Scheduled run times between consecutive timed stops.
+
+    ``routes`` maps each route ID to a table with one row per direction,
+    segment (``from_stop_id``, ``to_stop_id``) and hour band (an index into
+    :data:`HOUR_BANDS`), holding the number of trips and the minimum, median
+    and 90th percentile run time in seconds.
+    """
+
+    routes: dict[str, pd.DataFrame]
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self.routes.values())
+
+
+def _template_segments(
+    template: gtfs.FrequencyTemplate, trip: int, stop_index: dict[str, int]
+) -> pd.DataFrame:
+    """One row per hop of every instance of a headway-based trip."""
+    departures = np.asarray(template.departure_offsets[:-1], dtype=np.int64)
+    run_times = np.asarray(template.arrival_offsets[1:], dtype=np.int64) - departures
+    stops = np.array([stop_index.get(s, -1) for s in template.stop_ids])
+    starts = np.concatenate(
+        [np.arange(start, end, headway) for start, end, headway in template.windows]
+        or [np.empty(0, dtype=np.int64)]
+    )
+    instances = len(starts)
+    return pd.DataFrame(
+        {
+            "trip": trip,
+            "from_stop": np.tile(stops[:-1], instances),
+            "to_stop": np.tile(stops[1:], instances),
+            "departure": (starts[:, None] + departures[None, :]).ravel(),
+            "seconds": np.tile(run_times, instances),
+        }
+    )
+
+
+def build_segment_times(
+    trips_df: pd.DataFrame,
+    connections: gtfs.Connections,
+    frequency_templates: dict[Any, gtfs.FrequencyTemplate] | None = None,
+) -> SegmentTimes:
+    """Group the hops of every trip by route, direction, segment and hour band
+    and take run-time statistics of each group.
+
+    Scheduled trips come from the connections, so stops without times are
+    skipped and a segment spans the timed stops around them. Every instance
+    of a headway-based trip counts once.
+    """
+    routes, directions = trip_routes(trips_df, connections.trip_ids)
+    hops = [
+        pd.DataFrame(
+            {
+                "trip": np.asarray(connections.trips),
+                "from_stop": np.asarray(connections.from_stops),
+                "to_stop": np.asarray(connections.to_stops),
+                "departure": np.asarray(connections.departures, dtype=np.int64),
+                "seconds": np.asarray(connections.arrivals, dtype=np.int64)
+                - np.asarray(connections.departures, dtype=np.int64),
+            }
+        )
+    ]
+    if frequency_templates:
+        trip_index = {str(t): i for i, t in enumerate(connections.trip_ids)}
+        hops += [
+            _template_segments(
+                template, trip_index[str(trip_id)], connections.stop_index
+            )
+            for trip_id, template in frequency_templates.items()
+        ]
+    frame = pd.concat(hops, ignore_index=True)
+    frame = frame[(frame["from_stop"] >= 0) & (frame["to_stop"] >= 0)]
+
+    band_starts = np.array([first for _, first, _ in HOUR_BANDS])
+    hours = (frame["departure"].to_numpy() // 3600) % 24
+    grouped = frame.assign(
+        route_id=routes[frame["trip"].to_numpy()],
+        direction_id=directions[frame["trip"].to_numpy()],
+        band=np.searchsorted(band_starts, hours, side="right") - 1,
+    ).groupby(["route_id", "direction_id", "from_stop", "to_stop", "band"])["seconds"]
+    table = grouped.agg(["size", "min", "median"])
+    table.columns = ["trips", "min", "median"]
+    table["p90"] = grouped.quantile(0.9)
+    table = table.reset_index()
+
+    stop_ids = np.array(connections.stop_ids, dtype=object)
+    table["from_stop_id"] = stop_ids[table.pop("from_stop").to_numpy()]
+    table["to_stop_id"] = stop_ids[table.pop("to_stop").to_numpy()]
+    return SegmentTimes(
+        routes={
+            str(route_id): rows.drop(columns="route_id").reset_index(drop=True)
+            for route_id, rows in table.groupby("route_id")
+        }
+    )
+
+
+def route_segment_times(
+    data: gtfs.GTFSData,
+    route: str,
+    direction: int | None = None,
+    hour_band: str | None = None,
+) -> list[dict[str, Any]]:
+    """Run-time statistics of the segments of ``route``, in minutes.
+
+    Rows are ordered by direction, hour band and the segment's position
+    along the route. Raises ``ValueError`` for an unknown route or band.
+    """
+    infos = data.route_catalog.resolve(route)
+    if not infos:
+        raise ValueError(f"Route '{route}' not found")
+    band_names = [name for name, _, _ in HOUR_BANDS]
+    if hour_band is not None and hour_band not in band_names:
+        raise ValueError(
+            f"Unknown hour band '{hour_band}': use one of {', '.join(band_names)}"
+        )
+
+    headsigns = _route_headsigns(data, route)
+    rows = []
+    for info in infos:
+        table = data.segment_times.routes.get(str(info.route_id))
+        if table is None:
+            continue
+        if direction is not None:
+            table = table[table["direction_id"] == direction]
+        if hour_band is not None:
+            table = table[table["band"] == band_names.index(hour_band)]
+        for record in table.to_dict("records"):
+            order = info.stops.get(record["direction_id"], [])
+            from_stop = record["from_stop_id"]
+            rows.append(
+                {
+                    "route": info.display_name,
+                    "direction": _direction_label(
+                        info.short_name or route, record["direction_id"], headsigns
+                    ),
+                    "direction_id": record["direction_id"],
+                    "hour_band": band_names[record["band"]],
+                    "from_stop_id": from_stop,
+                    "from_stop": data.stop_names.get(from_stop, from_stop),
+                    "to_stop_id": record["to_stop_id"],
+                    "to_stop": data.stop_names.get(
+                        record["to_stop_id"], record["to_stop_id"]
+                    ),
+                    "trips": int(record["trips"]),
+                    **{
+                        f"{name}_minutes": round(float(record[name]) / 60, 1)
+                        for name in SEGMENT_COLUMNS[1:]
+                    },
+                    "_order": (
+                        str(info.route_id),
+                        record["direction_id"],
+                        record["band"],
+                        order.index(from_stop) if from_stop in order else len(order),
+                    ),
+                }
+            )
+    rows.sort(key=lambda row: row["_order"])
+    for row in rows:
+        del row["_order"]
+    return rows
@@ -0,0 +1,139 @@
+"""Persistent query-result cache shared by server processes.
+
+Results are stored in a local SQLite database so that every worker process,
+and every restart, can reuse answers already computed for the same GTFS
+feed. The cache is optional: set ``DART_MCP_CACHE`` to a file path to enable
+it. ``DART_MCP_CACHE_MAX_ENTRIES`` bounds its size (default 10000).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from . import storage
+from .serialization import dumps
+
+DEFAULT_MAX_ENTRIES = 10_000
+# Hits refresh an entry's LRU timestamp at most this often, to keep reads cheap
+TOUCH_INTERVAL_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    feed_version TEXT NOT NULL,
+    value BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def make_key(tool: str, params: dict[str, Any]) -> str:
+    """Normalized cache key for a tool call.
+
+    Parameters are ordered by name and string values have surrounding and
+    repeated whitespace collapsed, so equivalent calls share one entry.
+    """
+    normalized = {
+        name: " ".join(value.split()) if isinstance(value, str) else value
+        for name, value in params.items()
+    }
+    return tool + ":" + json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+class ResultCache:
+    """Size-bounded SQLite cache of JSON-serializable tool results.
+
+    The database runs in WAL mode so processes can read concurrently while
+    one of them writes. Entries belong to a feed version; opening the cache
+    with a new ``feed_version`` drops everything computed for older feeds.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        feed_version: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.path = Path(path)
+        self.feed_version = feed_version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            self.path, timeout=10.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(
+            "DELETE FROM results WHERE feed_version != ?", (feed_version,)
+        )
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached result for ``key``, or ``None`` on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, last_used FROM results"
+                " WHERE key = ? AND feed_version = ?",
+                (key, self.feed_version),
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > TOUCH_INTERVAL_SECONDS:
+                self._conn.execute(
+                    "UPDATE results SET last_used = ? WHERE key = ?", (now, key)
+                )
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        """Store ``value`` and evict the least recently used entries if full."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, self.feed_version, dumps(value), time.time()),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+            if count > self.max_entries:
+                # Evict a tenth at once so a full cache doesn't trim on every put
+                excess = count - self.max_entries + self.max_entries // 10
+                self._conn.execute(
+                    "DELETE FROM results WHERE key IN"
+                    " (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return int(count)
+
+    def clear(self) -> None:
+        """Remove every cached result."""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> ResultCache | None:
+    """Open the cache configured by ``DART_MCP_CACHE``, if any."""
+    path = os.environ.get("DART_MCP_CACHE")
+    if not path:
+        return None
+
+    max_entries = int(os.environ.get("DART_MCP_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+    return ResultCache(
+        path, storage.get_default_backend().feed_version or "", max_entries
+    )
@@ -0,0 +1,232 @@
+"""Shrink a downloaded GTFS feed to what the server actually queries.
+
+:func:`compact_feed` copies a feed folder while:
+
+- dropping services that never run or whose last day has passed, together
+  with their trips, stop times and frequencies;
+- dropping routes and stops no remaining trip uses, and merging stops that
+  are exact duplicates of each other;
+- keeping only the columns listed in :data:`dart_mcp.gtfs.FEED_COLUMNS` and
+  leaving out files no query reads, such as shapes.txt.
+
+Expired services are only dropped while some service is still running. A
+feed whose every service has ended is kept as it is and reported as
+expired, so an out-of-date download shows up as such instead of as an empty
+timetable.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+
+from .gtfs import FEED_COLUMNS, last_service_dates, parse_gtfs_date
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None  # type: ignore[assignment]
+
+# Files copied unchanged even though no query reads them
+PASSTHROUGH_FILES = ("agency.txt", "feed_info.txt")
+# Stops with equal values in all of these columns are merged into one
+STOP_IDENTITY_COLUMNS = (
+    "stop_name",
+    "stop_lat",
+    "stop_lon",
+    "location_type",
+    "parent_station",
+)
+
+
+@dataclass(frozen=True)
+class CompactionReport:
+    """What :func:`compact_feed` removed from a feed."""
+
+    as_of: date
+    bytes_before: int
+    bytes_after: int
+    rows_before: dict[str, int]
+    rows_after: dict[str, int]
+    dropped_files: list[str] = field(default_factory=list)
+    dropped_services: list[str] = field(default_factory=list)
+    merged_stops: int = 0
+    service_end: date | None = None
+
+    @property
+    def expired(self) -> bool:
+        """Whether no service of the feed runs on or after :attr:`as_of`."""
+        return self.service_end is None or self.service_end < self.as_of
+
+    def summary(self) -> str:
+        saved = 1 - self.bytes_after / self.bytes_before if self.bytes_before else 0
+        lines = [
+            f"Compacted feed: {self.bytes_before / 2**20:.1f} MB -> "
+            f"{self.bytes_after / 2**20:.1f} MB ({saved:.0%} smaller)"
+        ]
+        for name, before in self.rows_before.items():
+            after = self.rows_after.get(name, 0)
+            if after != before:
+                lines.append(f"  {name}: {before} -> {after} rows")
+        if self.dropped_files:
+            lines.append(f"  dropped files: {', '.join(self.dropped_files)}")
+        if self.dropped_services:
+            lines.append(f"  dropped services: {len(self.dropped_services)}")
+        if self.merged_stops:
+            lines.append(f"  merged duplicate stops: {self.merged_stops}")
+        if self.service_end is None:
+            lines.append("  WARNING: no service in this feed ever runs")
+        elif self.expired:
+            lines.append(
+                f"  WARNING: feed expired, its last service day was "
+                f"{self.service_end.isoformat()}"
+            )
+        else:
+            lines.append(f"  service runs until {self.service_end.isoformat()}")
+        return "\n".join(lines)
+
+
+def _keep_services(
+    tables: dict[str, pd.DataFrame], as_of: date
+) -> tuple[set[str] | None, date | None]:
+    """Service IDs worth keeping (``None`` for all of them) and the last day
+    any service runs."""
+    if "calendar.txt" not in tables and "calendar_dates.txt" not in tables:
+        # Nothing to judge services by, so keep them all
+        return None, None
+
+    calendar = tables.get("calendar.txt")
+    if calendar is None:
+        # Feeds may define service through calendar_dates.txt alone
+        calendar = pd.DataFrame(columns=FEED_COLUMNS["calendar.txt"])
+    last_dates = last_service_dates(calendar, tables.get("calendar_dates.txt"))
+    if last_dates.empty:
+        return set(), None
+
+    service_end = parse_gtfs_date(last_dates.max())
+    current = last_dates[last_dates >= int(as_of.strftime("%Y%m%d"))]
+    if current.empty:
+        # Every service has ended: keep them so the feed is still usable
+        # for past dates, and let the report flag it as expired
+        current = last_dates
+    return set(current.index), service_end
+
+
+def _keep_rows(
+    tables: dict[str, pd.DataFrame], name: str, column: str, values: set[str]
+) -> None:
+    """Keep the rows of table ``name`` whose ``column`` is one of ``values``."""
+    table = tables.get(name)
+    if table is not None and column in table.columns:
+        tables[name] = table[table[column].isin(values)]
+
+
+def _merge_duplicate_stops(tables: dict[str, pd.DataFrame]) -> int:
+    """Merge stops identical in :data:`STOP_IDENTITY_COLUMNS` and point every
+    reference at the kept one. Returns how many stops were merged."""
+    stops = tables["stops.txt"].drop_duplicates("stop_id")
+    columns = [c for c in STOP_IDENTITY_COLUMNS if c in stops.columns]
+    if not columns:
+        tables["stops.txt"] = stops
+        return 0
+
+    first = stops.groupby(columns, sort=False)["stop_id"].transform("first")
+    duplicate = first != stops["stop_id"]
+    remap = first[duplicate].set_axis(stops.loc[duplicate, "stop_id"]).to_dict()
+    tables["stops.txt"] = stops[~duplicate]
+    if not remap:
+        return 0
+
+    for name, column in (
+        ("stop_times.txt", "stop_id"),
+        ("transfers.txt", "from_stop_id"),
+        ("transfers.txt", "to_stop_id"),
+        ("stops.txt", "parent_station"),
+    ):
+        table = tables.get(name)
+        if table is not None and column in table.columns:
+            table[column] = table[column].replace(remap)
+    return len(remap)
+
+
+def _drop_unused_stops(tables: dict[str, pd.DataFrame]) -> None:
+    """Keep the stops trips or transfers use, and their parent stations."""
+    stops = tables["stops.txt"]
+    used = set(tables["stop_times.txt"]["stop_id"])
+    transfers = tables.get("transfers.txt")
+    if transfers is not None:
+        used |= set(transfers["from_stop_id"]) | set(transfers["to_stop_id"])
+    if "parent_station" in stops.columns:
+        used |= set(stops.loc[stops["stop_id"].isin(used), "parent_station"])
+    tables["stops.txt"] = stops[stops["stop_id"].isin(used)]
+
+
+def compact_feed(
+    source: Path, destination: Path, as_of: date | None = None
+) -> CompactionReport:
+    """Write a compacted copy of the feed in ``source`` to ``destination``.
+
+    Services are judged as of ``as_of`` (default: today). Values are copied
+    as text, so IDs, times and dates keep their exact formatting.
+    """
+    as_of = as_of or date.today()
+    files = sorted(source.glob("*.txt"))
+    bytes_before = sum(path.stat().st_size for path in files)
+
+    tables = {}
+    dropped_files = []
+    for path in files:
+        if path.name in FEED_COLUMNS:
+            columns = FEED_COLUMNS[path.name]
+            tables[path.name] = pd.read_csv(
+                path,
+                dtype=str,
+                keep_default_na=False,
+                usecols=columns.__contains__,
+            )
+        elif path.name not in PASSTHROUGH_FILES:
+            dropped_files.append(path.name)
+    rows_before = {name: len(table) for name, table in tables.items()}
+
+    services, service_end = _keep_services(tables, as_of)
+    dropped_services = []
+    if services is not None:
+        if "calendar.txt" in tables:
+            calendar_services = set(tables["calendar.txt"]["service_id"])
+            dropped_services = sorted(calendar_services - services)
+        for name in ("calendar.txt", "calendar_dates.txt", "trips.txt"):
+            _keep_rows(tables, name, "service_id", services)
+
+    trips = tables.get("trips.txt")
+    if trips is not None:
+        if "trip_id" in trips.columns:
+            for name in ("stop_times.txt", "frequencies.txt"):
+                _keep_rows(tables, name, "trip_id", set(trips["trip_id"]))
+        if "route_id" in trips.columns:
+            _keep_rows(tables, "routes.txt", "route_id", set(trips["route_id"]))
+
+    merged_stops = 0
+    if "stop_id" in tables.get("stops.txt", ()):
+        merged_stops = _merge_duplicate_stops(tables)
+        if "stop_id" in tables.get("stop_times.txt", ()):
+            _drop_unused_stops(tables)
+
+    destination.mkdir(parents=True, exist_ok=True)
+    for name, table in tables.items():
+        table.to_csv(destination / name, index=False)
+    for name in PASSTHROUGH_FILES:
+        if (source / name).exists():
+            (destination / name).write_bytes((source / name).read_bytes())
+
+    return CompactionReport(
+        as_of=as_of,
+        bytes_before=bytes_before,
+        bytes_after=sum(path.stat().st_size for path in destination.glob("*.txt")),
+        rows_before=rows_before,
+        rows_after={name: len(table) for name, table in tables.items()},
+        dropped_files=dropped_files,
+        dropped_services=dropped_services,
+        merged_stops=merged_stops,
+        service_end=service_end,
+    )
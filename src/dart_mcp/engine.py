@@ -0,0 +1,79 @@
+"""The query engine behind every HTTP entry point.
+
+An :class:`Engine` owns what the HTTP handlers share for the lifetime of a
+process: the storage backend, its warmup, the admission pools, and the
+encoded static listings. :func:`dart_mcp.remote_server.create_app`
+builds the app around one engine and hands it to every handler through
+dependency injection, and the handlers pass the engine's backend into the
+tools they run, so all deployments run the same preloaded, indexed query
+paths.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from . import gtfs, storage
+from .admission import Pool, default_pools
+from .http_cache import StaticPayloads, feed_last_modified
+from .warmup import DEFAULT_WAIT_SECONDS, Warmup, warm_backend
+
+
+class Engine:
+    """Shared state of the HTTP handlers.
+
+    ``load_backend`` opens the storage backend, once, on first use; by
+    default the engine ``DART_MCP_STORAGE`` selects. ``warmup_wait`` is how
+    long a request that arrives during warmup waits before getting a 503; it
+    defaults to ``DART_MCP_WARMUP_WAIT_SECONDS``.
+    """
+
+    def __init__(
+        self,
+        warmup: Warmup | None = None,
+        pools: dict[str, Pool] | None = None,
+        payloads: StaticPayloads | None = None,
+        warmup_wait: float | None = None,
+        load_backend: Callable[
+            [], storage.StorageBackend
+        ] = storage.get_default_backend,
+    ) -> None:
+        self.load_backend = load_backend
+        self._backend: storage.StorageBackend | None = None
+        self._backend_lock = threading.Lock()
+        self.warmup = warmup or Warmup(self._warm)
+        self.pools = pools if pools is not None else default_pools()
+        self.payloads = payloads or StaticPayloads(
+            lambda: feed_last_modified(gtfs.get_gtfs_folder())
+        )
+        if warmup_wait is None:
+            warmup_wait = float(
+                os.environ.get("DART_MCP_WARMUP_WAIT_SECONDS", DEFAULT_WAIT_SECONDS)
+            )
+        self.warmup_wait = warmup_wait
+
+    @property
+    def backend(self) -> storage.StorageBackend:
+        """The engine's storage backend, opened on first use."""
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = self.load_backend()
+        return self._backend
+
+    def _warm(self) -> dict[str, Any]:
+        return warm_backend(lambda: self.backend)
+
+    @property
+    def feed_version(self) -> str | None:
+        try:
+            return self.backend.feed_version
+        except Exception:
+            return None
+
+    def start(self) -> None:
+        """Start loading the backend in the background."""
+        self.warmup.start()
@@ -0,0 +1,483 @@
+"""Bring loaded GTFS data up to date with a changed feed folder.
+
+A daily feed update usually touches a handful of trips and service dates.
+Rather than reading and indexing the whole feed again, :func:`update_gtfs_data`
+compares the folder with the per-file digests recorded at load time and only
+re-reads the files that changed. It works out which trips, stops and
+services differ, carries every index whose sources are unchanged over to the
+new data, patches the trip layout and the per-stop departure and arrival
+indexes trip by trip and rebuilds the other indexes derived from what
+changed. A changed stop_times.txt is still read in full to find the trips
+that differ. With a timetable directory, the patched timetable is saved and
+mapped in place of the previous one.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import os
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from . import gtfs
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None  # type: ignore[assignment]
+    pd = None  # type: ignore[assignment]
+
+
+@dataclass(frozen=True)
+class KeyDiff:
+    """IDs added, removed and changed between two versions of a table."""
+
+    added: frozenset[str] = frozenset()
+    removed: frozenset[str] = frozenset()
+    changed: frozenset[str] = frozenset()
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, "
+            f"{len(self.changed)} changed"
+        )
+
+
+@dataclass(frozen=True)
+class FeedDiff:
+    """What differs between loaded data and its feed folder, and what
+    :func:`update_gtfs_data` did about it.
+
+    Row differences are only known for tables that were loaded before the
+    update; a table nothing had read yet is simply read from the new feed
+    when first needed.
+    """
+
+    old_version: str | None
+    new_version: str | None
+    # Feed files changed, added or removed
+    files: tuple[str, ...] = ()
+    # trips.txt rows by trip_id
+    trips: KeyDiff = KeyDiff()
+    # The calls of each trip in stop_times.txt, by trip_id
+    stop_times: KeyDiff = KeyDiff()
+    stops: KeyDiff = KeyDiff()
+    # calendar.txt and calendar_dates.txt rows by service_id
+    services: KeyDiff = KeyDiff()
+    # Indexes carried over unchanged, patched in place and built again
+    kept: tuple[str, ...] = ()
+    patched: tuple[str, ...] = ()
+    rebuilt: tuple[str, ...] = ()
+
+    def summary(self) -> str:
+        if not self.files:
+            return f"Feed {self.old_version} is up to date"
+        lines = [
+            f"Feed {self.old_version} -> {self.new_version}: "
+            f"{', '.join(self.files)} changed",
+            f"  trips: {self.trips.summary()}",
+            f"  stop times: {self.stop_times.summary()}",
+            f"  stops: {self.stops.summary()}",
+            f"  services: {self.services.summary()}",
+        ]
+        for label, names in (
+            ("kept", self.kept),
+            ("patched", self.patched),
+            ("rebuilt", self.rebuilt),
+        ):
+            if names:
+                lines.append(f"  {label}: {', '.join(names)}")
+        return "\n".join(lines)
+
+
+def _row_digests(frame: pd.DataFrame | None, key: str) -> pd.Series:
+    """One digest per ``key`` value, over all of that key's rows."""
+    if frame is None or frame.empty:
+        return pd.Series(dtype="uint64")
+    columns = sorted(frame.columns)
+    hashes = pd.util.hash_pandas_object(frame[columns].astype(str), index=False)
+    return hashes.groupby(frame[key].astype(str).to_numpy()).sum()
+
+
+def _diff_digests(old: pd.Series, new: pd.Series) -> KeyDiff:
+    common = old.index.intersection(new.index)
+    differs = old[common].to_numpy() != new[common].to_numpy()
+    return KeyDiff(
+        added=frozenset(new.index.difference(old.index)),
+        removed=frozenset(old.index.difference(new.index)),
+        changed=frozenset(common[differs]),
+    )
+
+
+def _service_digests(tables: dict[str, Any]) -> pd.Series:
+    """One digest per service over its calendar and calendar date rows."""
+    digests = [
+        _row_digests(tables.get(table), "service_id")
+        for table in ("calendar", "calendar_dates")
+    ]
+    by_service: pd.Series = pd.concat(digests).groupby(level=0).sum()
+    return by_service
+
+
+def diff_rows(old: pd.DataFrame | None, new: pd.DataFrame | None, key: str) -> KeyDiff:
+    """Compare two versions of a table row by row, keyed by ``key``."""
+    return _diff_digests(_row_digests(old, key), _row_digests(new, key))
+
+
+def _call_digests(trip_ids: list[Any], trips: np.ndarray, **calls: Any) -> pd.Series:
+    """One digest per trip over its ``calls`` columns, keyed by trip ID as a
+    string; ``trips`` holds each call's index into ``trip_ids``."""
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(calls), index=False)
+    digests = hashes.groupby(np.asarray(trips)).sum()
+    digests.index = pd.Index([str(trip_ids[t]) for t in digests.index], dtype=object)
+    return digests
+
+
+def diff_stop_times(layout: gtfs.TripLayout, stop_times_df: pd.DataFrame) -> KeyDiff:
+    """Compare the calls of each trip in ``layout`` and in ``stop_times_df``."""
+    trips, trip_ids = pd.factorize(stop_times_df["trip_id"])
+    # Stops are compared by their index in the layout; a stop the layout
+    # doesn't know only ever differs from the one it replaced
+    stops, stop_ids = pd.factorize(stop_times_df["stop_id"].astype(str))
+    stop_codes = np.array([layout.stop_index.get(s, -1) for s in stop_ids], dtype=int)
+
+    def seconds(column: str) -> np.ndarray:
+        times = gtfs.times_to_seconds(stop_times_df[column])
+        filled: np.ndarray = np.nan_to_num(times, nan=-1).astype(np.int64)
+        return filled
+
+    new = _call_digests(
+        list(trip_ids),
+        trips,
+        stop=stop_codes[stops],
+        sequence=stop_times_df["stop_sequence"].to_numpy(np.int64),
+        arrival=seconds("arrival_time"),
+        departure=seconds("departure_time"),
+    )
+    old = _call_digests(
+        layout.trip_ids,
+        layout.trips,
+        stop=np.asarray(layout.stops, dtype=int),
+        sequence=np.asarray(layout.sequences, dtype=np.int64),
+        arrival=np.asarray(layout.arrivals, dtype=np.int64),
+        departure=np.asarray(layout.departures, dtype=np.int64),
+    )
+    return _diff_digests(old, new)
+
+
+def _kept_trips(layout: gtfs.TripLayout, dropped_trips: Iterable[str]) -> np.ndarray:
+    dropped = set(dropped_trips)
+    return np.array(
+        [str(trip_id) not in dropped for trip_id in layout.trip_ids], dtype=bool
+    )
+
+
+def patch_trip_layout(
+    layout: gtfs.TripLayout,
+    stop_ids: list[str],
+    dropped_trips: Iterable[str] = (),
+    stop_times_df: pd.DataFrame | None = None,
+) -> gtfs.TripLayout:
+    """``layout`` without the trips ``dropped_trips`` and with the calls of
+    ``stop_times_df`` added, over stop indexes that start with ``stop_ids``.
+
+    The calls of the trips kept are copied as they are, so only the stop
+    times of new and changed trips are parsed and sorted.
+    """
+    stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+    all_stop_ids = list(stop_ids)
+    for stop_id in layout.stop_ids:
+        if stop_id not in stop_index:
+            stop_index[stop_id] = len(all_stop_ids)
+            all_stop_ids.append(stop_id)
+    stop_codes = np.array([stop_index[s] for s in layout.stop_ids], dtype=np.int32)
+
+    keep_trips = _kept_trips(layout, dropped_trips)
+    keep_rows = keep_trips[layout.trips]
+    trip_codes = (np.cumsum(keep_trips) - 1).astype(np.int32)
+    trip_ids = [layout.trip_ids[t] for t in np.flatnonzero(keep_trips)]
+
+    if stop_times_df is None:
+        stop_times_df = pd.DataFrame(
+            columns=["trip_id", "stop_id", "stop_sequence"]
+            + ["arrival_time", "departure_time"]
+        )
+    added = gtfs.build_trip_layout(stop_times_df, all_stop_ids)
+
+    trips = np.concatenate(
+        [trip_codes[layout.trips[keep_rows]], added.trips + len(trip_ids)]
+    ).astype(np.int32)
+    trip_ids += added.trip_ids
+    offsets = np.zeros(len(trip_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(trips, minlength=len(trip_ids)), out=offsets[1:])
+
+    def concat(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+        return np.concatenate([old[keep_rows], new]).astype(np.int32)
+
+    return gtfs.TripLayout(
+        trip_ids=trip_ids,
+        trip_index={str(trip_id): t for t, trip_id in enumerate(trip_ids)},
+        stop_ids=added.stop_ids,
+        stop_index=added.stop_index,
+        offsets=offsets,
+        trips=trips,
+        stops=np.concatenate([stop_codes[layout.stops[keep_rows]], added.stops]),
+        sequences=concat(layout.sequences, added.sequences),
+        arrivals=concat(layout.arrivals, added.arrivals),
+        departures=concat(layout.departures, added.departures),
+    )
+
+
+def patch_stop_index(
+    index: gtfs.DepartureIndex,
+    layout: gtfs.TripLayout,
+    kept_rows: np.ndarray,
+    added_rows: np.ndarray,
+    times: np.ndarray,
+) -> gtfs.DepartureIndex:
+    """``index`` for the trip layout ``layout`` was patched into: the calls
+    of the old layout rows ``kept_rows`` selects, renumbered, plus the calls
+    ``added_rows`` of ``layout`` that have one of ``times``.
+
+    The calls kept are still in order, so the added ones are merged in
+    rather than sorting every call of the feed again.
+    """
+    row_map = np.cumsum(kept_rows) - 1
+    keep = kept_rows[index.rows]
+    slots = np.repeat(np.arange(len(index.offsets) - 1), np.diff(index.offsets))
+    slots, seconds = slots[keep], index.seconds[keep]
+    rows = row_map[index.rows[keep]]
+
+    added_rows = added_rows[times[added_rows] >= 0]
+    stop_codes, stops = pd.factorize(layout.stops[added_rows])
+    stop_index = dict(index.index)
+    for stop in stops.tolist():
+        stop_index.setdefault(layout.stop_ids[stop], len(stop_index))
+    added_slots = np.array(
+        [stop_index[layout.stop_ids[stop]] for stop in stops.tolist()], dtype=np.int64
+    )[stop_codes]
+    added_seconds = times[added_rows]
+    order = np.lexsort((added_seconds, added_slots))
+
+    # Slots and times packed into one sortable key; ties go after the calls
+    # kept, as their rows come after them in ``layout``
+    def keys(slots: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+        packed: np.ndarray = (slots.astype(np.int64) << 32) + seconds
+        return packed
+
+    at = np.searchsorted(
+        keys(slots, seconds),
+        keys(added_slots[order], added_seconds[order]),
+        side="right",
+    )
+    slots = np.insert(slots, at, added_slots[order])
+    offsets = np.zeros(len(stop_index) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(slots, minlength=len(stop_index)), out=offsets[1:])
+    return dataclasses.replace(
+        index,
+        index=stop_index,
+        offsets=offsets,
+        seconds=np.insert(seconds, at, added_seconds[order]),
+        rows=np.insert(rows, at, added_rows[order]),
+    )
+
+
+def _patch_stop_indexes(
+    old: dict[str, Any], updated: gtfs.GTFSData, kept_rows: np.ndarray
+) -> None:
+    """Patch the departure and arrival indexes of ``old`` into ``updated``,
+    whose trip layout keeps the old rows ``kept_rows`` selects. Nothing is
+    patched when the trips that run by frequency changed, as their calls are
+    left out of both indexes."""
+    templates = old.get("frequency_templates")
+    if templates is None or updated.frequency_templates.keys() != templates.keys():
+        return
+    layout = updated.trip_layout
+    is_template = np.zeros(len(layout.trip_ids), dtype=bool)
+    is_template[[layout.trip_index[str(t)] for t in templates]] = True
+    added_rows = np.arange(np.count_nonzero(kept_rows), len(layout.trips))
+    added_rows = added_rows[~is_template[layout.trips[added_rows]]]
+    new = updated.__dict__
+    if "departures" in old:
+        new["departures"] = patch_stop_index(
+            old["departures"], layout, kept_rows, added_rows, layout.departures
+        )
+    if "arrivals" in old:
+        arrivals = np.where(layout.arrivals < 0, layout.departures, layout.arrivals)
+        new["arrivals"] = patch_stop_index(
+            old["arrivals"], layout, kept_rows, added_rows, arrivals
+        )
+
+
+def _index_sources() -> dict[str, tuple[str, ...]]:
+    return {
+        name: value.sources
+        for name, value in vars(gtfs.GTFSData).items()
+        if isinstance(value, gtfs.timed_cached_property)
+    }
+
+
+def _affected(changed_tables: set[str]) -> set[str]:
+    """Indexes built, directly or through other indexes, from
+    ``changed_tables``."""
+    sources = _index_sources()
+    affected: set[str] = set()
+    grew = True
+    while grew:
+        grew = False
+        for name, names in sources.items():
+            if name not in affected and (changed_tables | affected) & set(names):
+                affected.add(name)
+                grew = True
+    return affected
+
+
+def update_gtfs_data(
+    data: gtfs.GTFSData,
+    gtfs_folder: Path | None = None,
+    timetable_dir: str | Path | None = None,
+) -> tuple[gtfs.GTFSData, FeedDiff]:
+    """Return data for the current contents of ``gtfs_folder`` built from
+    ``data``, and what changed.
+
+    ``gtfs_folder`` defaults to the folder ``data`` was read from. ``data``
+    itself is left untouched, so queries can keep using it until the result
+    replaces it. Data loaded without file digests is loaded again in full.
+    """
+    from . import timetable
+
+    if gtfs_folder is None:
+        gtfs_folder = getattr(data, "gtfs_folder", None) or gtfs.get_gtfs_folder()
+    digests = gtfs.feed_file_digests(gtfs_folder)
+    version = gtfs.compute_feed_version(gtfs_folder, digests)
+    old_digests = data.file_digests
+    if old_digests is None:
+        updated = gtfs.load_gtfs_data(gtfs_folder, timetable_dir=timetable_dir)
+        return updated, FeedDiff(
+            data.feed_version,
+            version,
+            files=tuple(sorted(digests)),
+            rebuilt=tuple(sorted(updated.build_seconds)),
+        )
+
+    files = sorted(
+        name
+        for name in digests.keys() | old_digests.keys()
+        if digests.get(name) != old_digests.get(name)
+    )
+    if not files:
+        return data, FeedDiff(data.feed_version, version)
+
+    changed_tables = {
+        table for table, name in gtfs.TABLE_FILES.items() if name in files
+    }
+    old = data.__dict__
+    updated = gtfs.LazyGTFSData(gtfs_folder, version, digests)
+    new = updated.__dict__
+    for table in gtfs.TABLE_READERS:
+        if table in old and table not in changed_tables:
+            new[table] = old[table]
+    # Keep the new data as warm as the old: read the changed tables that
+    # were loaded, and stop_times whenever the trip layout needs patching
+    reread = {table for table in changed_tables if old.get(table) is not None}
+    if "stop_times" in changed_tables and "trip_layout" in old:
+        reread.add("stop_times")
+    updated.prepare(sorted(reread))
+
+    def loaded(table: str) -> bool:
+        return table in changed_tables and old.get(table) is not None
+
+    diff: dict[str, Any] = {}
+    if loaded("trips"):
+        diff["trips"] = diff_rows(old["trips"], new["trips"], "trip_id")
+    if loaded("all_stops"):
+        diff["stops"] = diff_rows(old["all_stops"], new["all_stops"], "stop_id")
+    if loaded("calendar") or loaded("calendar_dates"):
+        diff["services"] = _diff_digests(_service_digests(old), _service_digests(new))
+
+    affected = _affected(changed_tables)
+    kept, patched, rebuild = [], [], []
+    for name in _index_sources():
+        if name not in old:
+            continue
+        if name not in affected:
+            new[name] = old[name]
+            kept.append(name)
+        elif name not in ("trip_layout", "connections"):
+            rebuild.append(name)
+
+    if "trip_layout" in old and "trip_layout" in affected:
+        layout = old["trip_layout"]
+        dropped: Iterable[str] = ()
+        added = None
+        if "stop_times" in changed_tables:
+            new_calls = new["stop_times"]
+            diff["stop_times"] = calls = diff_stop_times(layout, new_calls)
+            dropped = calls.removed | calls.changed
+            added = new_calls[
+                new_calls["trip_id"].astype(str).isin(calls.added | calls.changed)
+            ]
+        new["trip_layout"] = patch_trip_layout(
+            layout, updated.footpaths.stop_ids, dropped, added
+        )
+        patched.append("trip_layout")
+        _patch_stop_indexes(old, updated, _kept_trips(layout, dropped)[layout.trips])
+        for name in ("departures", "arrivals"):
+            if name in new:
+                rebuild.remove(name)
+                patched.append(name)
+
+    if "connections" in old and "connections" in affected:
+        if affected & {"trip_layout", "frequency_templates"}:
+            rebuild.append("connections")
+        else:
+            # Only the services of the trips changed
+            connections = old["connections"]
+            new["connections"] = dataclasses.replace(
+                connections,
+                trip_services=gtfs.trip_service_ids(
+                    updated.trips, connections.trip_ids
+                ),
+            )
+            patched.append("connections")
+
+    updated.prepare(rebuild)
+    for name in kept:
+        if name in data.build_seconds:
+            updated.build_seconds[name] = data.build_seconds[name]
+
+    if "trip_layout" in old and timetable_dir is not None:
+        path = timetable.timetable_path(timetable_dir, version)
+        if not path.exists():
+            timetable.save_timetable(updated, path)
+        timetable.attach_timetable(updated, path)
+        new["stop_times"] = None
+
+    return updated, FeedDiff(
+        data.feed_version,
+        version,
+        files=tuple(files),
+        kept=tuple(kept),
+        patched=tuple(patched),
+        rebuilt=tuple(name for name in _index_sources() if name in rebuild),
+        **diff,
+    )
+
+
+def refresh_default_data() -> FeedDiff | None:
+    """Update the data :func:`dart_mcp.gtfs.get_default_data` returns to the
+    current feed, or return ``None`` if it hasn't been loaded yet."""
+    data = gtfs.cached_default_data()
+    if data is None:
+        return None
+    updated, diff = update_gtfs_data(
+        data, timetable_dir=os.environ.get("DART_MCP_TIMETABLE_DIR")
+    )
+    gtfs.set_default_data(updated)
+    return diff
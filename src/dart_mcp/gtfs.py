@@ -2,29 +2,659 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import date
-from functools import lru_cache
+import hashlib
+import heapq
+import math
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from functools import cached_property
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeVar, overload
 
 try:
+    import numpy as np
     import pandas as pd
 except ImportError:
     print("Warning: pandas not available. Some functionality may be limited.")
-    pd = None
+    np = None  # type: ignore[assignment]
+    pd = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from .analytics import SegmentTimes
+
+# Walking transfers are generated between stops at most this far apart
+MAX_WALK_METERS = 400.0
+# Average walking speed used to turn distances into transfer times (~4.7 km/h)
+WALK_SPEED_MPS = 1.3
+# Mean Earth radius, used for the equirectangular distance approximation
+EARTH_RADIUS_METERS = 6_371_000.0
+# Service days ahead of today that departure lookups roll over into
+SERVICE_DAY_HORIZON = 7
+SECONDS_PER_DAY = 24 * 3600
+# Common shorthands accepted by find_stops_by_name()
+STOP_NAME_ABBREVIATIONS = {
+    "dart": "dart central station",
+    "central": "dart central station",
+    "dt": "dart central station",
+    "downtown": "dart central station",
+}
+
+# Columns the queries read from each feed file; everything else is skipped
+FEED_COLUMNS = {
+    "stops.txt": (
+        "stop_id",
+        "stop_name",
+        "stop_lat",
+        "stop_lon",
+        "location_type",
+        "parent_station",
+    ),
+    "trips.txt": (
+        "route_id",
+        "service_id",
+        "trip_id",
+        "trip_headsign",
+        "trip_short_name",
+        "direction_id",
+    ),
+    "stop_times.txt": (
+        "trip_id",
+        "arrival_time",
+        "departure_time",
+        "stop_id",
+        "stop_sequence",
+    ),
+    "calendar.txt": (
+        "service_id",
+        "monday",
+        "tuesday",
+        "wednesday",
+        "thursday",
+        "friday",
+        "saturday",
+        "sunday",
+        "start_date",
+        "end_date",
+    ),
+    "calendar_dates.txt": ("service_id", "date", "exception_type"),
+    "routes.txt": ("route_id", "route_short_name", "route_long_name"),
+    "frequencies.txt": ("trip_id", "start_time", "end_time", "headway_secs"),
+    "transfers.txt": (
+        "from_stop_id",
+        "to_stop_id",
+        "transfer_type",
+        "min_transfer_time",
+    ),
+}
+WEEKDAY_COLUMNS = FEED_COLUMNS["calendar.txt"][1:8]
+# Derived indexes in build order; those within a stage only depend on
+# earlier stages and are built in parallel
+INDEX_STAGES = (
+    ("footpaths",),
+    ("trip_layout",),
+    ("frequency_templates", "route_catalog"),
+    ("departures", "arrivals", "connections", "service_spans"),
+    ("segment_times",),
+)
+
+
+class Departure(NamedTuple):
+    """A single departure, as returned by the departure lookups.
+
+    ``arrival_time`` is the arrival at the destination, or ``None`` when the
+    lookup was not for a particular destination.
+    """
+
+    departure_time: str
+    arrival_time: str | None
+    train_name: str
+    headsign: str
+
+
+@dataclass(frozen=True)
+class Footpaths:
+    """Walking transfers between stops in compressed adjacency form.
+
+    The outgoing footpaths of the stop at index ``i`` of :attr:`stop_ids` are
+    ``targets[offsets[i]:offsets[i + 1]]`` with matching ``walk_seconds``.
+    """
+
+    stop_ids: list[str]
+    index: dict[str, int]
+    offsets: np.ndarray
+    targets: np.ndarray
+    walk_seconds: np.ndarray
+
+    def neighbors(self, stop_id: str) -> list[tuple[str, int]]:
+        """Return ``(stop_id, walk_seconds)`` pairs reachable on foot."""
+        i = self.index.get(stop_id)
+        if i is None:
+            return []
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return [
+            (self.stop_ids[self.targets[k]], int(self.walk_seconds[k]))
+            for k in range(start, end)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+
+@dataclass(frozen=True)
+class FrequencyTemplate:
+    """A headway-based trip: one stop pattern plus the windows it repeats in.
+
+    Offsets are relative to the departure from the first stop; ``windows``
+    holds ``(start_seconds, end_seconds, headway_seconds)`` tuples from
+    frequencies.txt. Concrete trips are only generated on demand.
+    """
+
+    trip_id: Any
+    stop_ids: list[str]
+    stop_sequences: list[int]
+    arrival_offsets: list[int]
+    departure_offsets: list[int]
+    windows: list[tuple[int, int, int]]
+
+    def start_times(self, position: int, after_seconds: int) -> Iterator[int]:
+        """Yield trip start times whose departure at ``position`` is not
+        earlier than ``after_seconds``, in ascending order."""
+        earliest_start = after_seconds - self.departure_offsets[position]
+        for start, end, headway in sorted(self.windows):
+            k = max(0, -(-(earliest_start - start) // headway))
+            trip_start = start + k * headway
+            while trip_start < end:
+                yield trip_start
+                trip_start += headway
+
+    def start_times_before(self, position: int, before_seconds: int) -> Iterator[int]:
+        """Yield trip start times whose arrival at ``position`` is not later
+        than ``before_seconds``, in descending order."""
+        latest_start = before_seconds - self.arrival_offsets[position]
+        for start, end, headway in sorted(self.windows, reverse=True):
+            last = min(latest_start, end - 1)
+            if last >= start:
+                yield from range(
+                    start + (last - start) // headway * headway, start - 1, -headway
+                )
+
+    def start_span(self) -> tuple[int, int] | None:
+        """First and last trip start time, ``None`` if no window has any."""
+        windows = [(start, end, h) for start, end, h in self.windows if start < end]
+        if not windows:
+            return None
+        return (
+            min(start for start, _, _ in windows),
+            max(start + (end - 1 - start) // h * h for start, end, h in windows),
+        )
+
+
+@dataclass(frozen=True)
+class DepartureIndex:
+    """Scheduled departures grouped by stop and sorted by time.
+
+    The departures of the stop at slot ``i`` are ``seconds[offsets[i]:
+    offsets[i + 1]]``; ``rows`` holds the matching rows of the
+    :class:`TripLayout` arrays. Frequency-based template trips are left out,
+    their departures are generated from :class:`FrequencyTemplate` instead.
+    """
+
+    index: dict[str, int]
+    offsets: np.ndarray
+    seconds: np.ndarray
+    rows: np.ndarray
+
+    def rows_after(self, stop_ids: Iterable[str], after_seconds: int = 0) -> np.ndarray:
+        """Return trip layout rows departing any of ``stop_ids`` at or after
+        ``after_seconds``."""
+        chunks = []
+        for stop_id in stop_ids:
+            slot = self.index.get(stop_id)
+            if slot is None:
+                continue
+            start, end = self.offsets[slot], self.offsets[slot + 1]
+            start += np.searchsorted(self.seconds[start:end], after_seconds)
+            chunks.append(self.rows[start:end])
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(chunks)
+
+
+@dataclass(frozen=True)
+class ArrivalIndex(DepartureIndex):
+    """Scheduled arrivals grouped by stop and sorted by time, for arrive-by
+    searches; laid out like :class:`DepartureIndex`. Calls without an
+    arrival time count as arriving at their departure time.
+    """
+
+    def rows_before(self, stop_ids: Iterable[str], before_seconds: int) -> np.ndarray:
+        """Return trip layout rows arriving at any of ``stop_ids`` at or
+        before ``before_seconds``."""
+        chunks = []
+        for stop_id in stop_ids:
+            slot = self.index.get(stop_id)
+            if slot is None:
+                continue
+            start, end = self.offsets[slot], self.offsets[slot + 1]
+            end = start + np.searchsorted(
+                self.seconds[start:end], before_seconds, side="right"
+            )
+            chunks.append(self.rows[start:end])
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(chunks)
+
+
+@dataclass(frozen=True)
+class ServiceSpans:
+    """First and last departure of every trip pattern at every stop.
+
+    Trips of one route, headsign and service calling at the same stops in
+    the same order form a pattern; ``trip_patterns`` holds the pattern of
+    each :class:`TripLayout` trip and ``pattern_sizes`` the number of trips
+    of each pattern. The patterns calling at the stop at slot ``i`` are
+    ``patterns[offsets[i]:offsets[i + 1]]``, with their earliest and latest
+    departure there, headway-based trips included, and the trips making them.
+    """
+
+    index: dict[str, int]
+    offsets: np.ndarray
+    trip_patterns: np.ndarray
+    pattern_sizes: np.ndarray
+    patterns: np.ndarray
+    first_seconds: np.ndarray
+    first_trips: np.ndarray
+    last_seconds: np.ndarray
+    last_trips: np.ndarray
+
+    def whole_patterns(self, trips: np.ndarray) -> np.ndarray | None:
+        """The patterns ``trips`` (unique trip layout indexes) make up, or
+        ``None`` if they hold only some trips of a pattern."""
+        patterns, counts = np.unique(self.trip_patterns[trips], return_counts=True)
+        if (counts < self.pattern_sizes[patterns]).any():
+            return None
+        return patterns
+
+    def span(
+        self, stop_ids: Iterable[str], patterns: np.ndarray
+    ) -> tuple[tuple[int, int], tuple[int, int]] | None:
+        """Return ``(first, last)`` departures of ``patterns`` from any of
+        ``stop_ids`` as ``(seconds, trip)`` pairs, or ``None`` if none of them
+        calls there."""
+        slots = [self.index[s] for s in stop_ids if s in self.index]
+        if not slots or not len(patterns):
+            return None
+        at_stops = np.concatenate(
+            [np.arange(self.offsets[i], self.offsets[i + 1]) for i in slots]
+        )
+        at_stops = at_stops[np.isin(self.patterns[at_stops], patterns)]
+        if not len(at_stops):
+            return None
+        first = at_stops[np.argmin(self.first_seconds[at_stops])]
+        last = at_stops[np.argmax(self.last_seconds[at_stops])]
+        return (
+            (int(self.first_seconds[first]), int(self.first_trips[first])),
+            (int(self.last_seconds[last]), int(self.last_trips[last])),
+        )
+
+
+@dataclass(frozen=True)
+class RouteInfo:
+    """One route from routes.txt with its per-direction headsigns and stops."""
+
+    route_id: Any
+    short_name: str
+    long_name: str
+    headsigns: dict[int, list[str]]
+    stops: dict[int, list[str]]
+
+    @property
+    def display_name(self) -> str:
+        """Human readable route name, e.g. ``"3 UNIVERSITY"``."""
+        return " ".join(part for part in (self.short_name, self.long_name) if part)
+
+
+@dataclass(frozen=True)
+class RouteCatalog:
+    """Routes indexed by name and by the stops they serve.
+
+    ``names`` maps normalized short names, long names and headsigns to
+    ``(route_id, headsign)`` pairs, where ``headsign`` is ``None`` when the
+    whole route matched. ``trips`` maps the same pairs to trip IDs.
+    """
+
+    routes: dict[Any, RouteInfo]
+    names: dict[str, list[tuple[Any, str | None]]]
+    searchable: list[str]
+    trips: dict[tuple[Any, str | None], list[Any]]
+    stop_routes: dict[str, list[Any]]
+
+    def lookup(self, name: str) -> list[tuple[Any, str | None]]:
+        """Resolve a route name or headsign to ``(route_id, headsign)`` keys.
+
+        Exact matches win; otherwise every long name or headsign containing
+        ``name`` matches. Short names only match exactly, so ``"1"`` does not
+        pull in route 10.
+        """
+        key = normalize_route_name(name)
+        if not key:
+            return []
+        if key in self.names:
+            return self.names[key]
+        return [
+            match
+            for candidate in self.searchable
+            if key in candidate
+            for match in self.names[candidate]
+        ]
+
+    def resolve(self, name: str) -> list[RouteInfo]:
+        """Return the routes matching ``name``, without duplicates."""
+        route_ids = dict.fromkeys(route_id for route_id, _ in self.lookup(name))
+        return [self.routes[route_id] for route_id in route_ids]
+
+    def trip_ids(self, name: str) -> list[Any]:
+        """Return the trip IDs of every route or headsign matching ``name``."""
+        trip_ids: dict[Any, None] = {}
+        for match in self.lookup(name):
+            trip_ids.update(dict.fromkeys(self.trips.get(match, [])))
+        return list(trip_ids)
+
+    def routes_at(self, stop_id: str) -> list[RouteInfo]:
+        """Return the routes that call at ``stop_id``."""
+        route_ids = self.stop_routes.get(stop_id, [])
+        return [self.routes[route_id] for route_id in route_ids]
+
+    @cached_property
+    def trip_routes(self) -> dict[Any, Any]:
+        """Route ID of every trip, from the whole-route entries of
+        :attr:`trips`."""
+        return {
+            trip_id: route_id
+            for (route_id, headsign), trip_ids in self.trips.items()
+            if headsign is None
+            for trip_id in trip_ids
+        }
+
+
+@dataclass(frozen=True)
+class TripLayout:
+    """``stop_times`` in trip order, stored as compressed sparse rows.
+
+    The calls of the trip at index ``t`` of :attr:`trip_ids` occupy the
+    contiguous range ``offsets[t]:offsets[t + 1]`` of every per-call array,
+    ordered by ``stop_sequence``, and ``trips`` holds ``t`` for each of them.
+    Times are seconds since midnight, ``-1`` for untimed stops. Stop indexes
+    follow :attr:`Footpaths.stop_ids`, with stops that only appear in
+    stop_times appended after them, so walking transfers can be looked up
+    without translating IDs.
+
+    Once built, the layout is all the queries need from stop_times.
+    """
+
+    trip_ids: list[Any]
+    trip_index: dict[str, int]
+    stop_ids: list[str]
+    stop_index: dict[str, int]
+    offsets: np.ndarray
+    trips: np.ndarray
+    stops: np.ndarray
+    sequences: np.ndarray
+    arrivals: np.ndarray
+    departures: np.ndarray
+
+    def calls(self, trip_id: Any) -> slice:
+        """Return the range of ``trip_id``'s calls (empty when unknown)."""
+        t = self.trip_index.get(str(trip_id))
+        if t is None:
+            return slice(0, 0)
+        return slice(int(self.offsets[t]), int(self.offsets[t + 1]))
+
+    def calls_after(self, trip_id: Any, stop_id: str) -> slice:
+        """Return the calls of ``trip_id`` after its first call at ``stop_id``."""
+        calls = self.calls(trip_id)
+        stop = self.stop_index.get(stop_id, -1)
+        matches = np.flatnonzero(self.stops[calls] == stop)
+        if not len(matches):
+            return slice(0, 0)
+        return slice(calls.start + int(matches[0]) + 1, calls.stop)
+
+
+@dataclass(frozen=True)
+class Connections:
+    """Elementary timetable connections sorted by departure time.
+
+    Each connection is one trip hop between two consecutive timed stops.
+    Stop and trip indexes are those of :class:`TripLayout`.
+    """
+
+    stop_ids: list[str]
+    stop_index: dict[str, int]
+    trip_ids: list[Any]
+    trip_services: np.ndarray
+    departures: np.ndarray
+    arrivals: np.ndarray
+    from_stops: np.ndarray
+    to_stops: np.ndarray
+    trips: np.ndarray
+    _active_masks: dict[tuple[Any, ...], np.ndarray] = field(
+        default_factory=dict, init=False, compare=False, repr=False
+    )
+
+    def active_trips(self, service_ids: Iterable[Any]) -> np.ndarray:
+        """Boolean mask over trip indexes running under ``service_ids``."""
+        key = tuple(sorted(service_ids, key=str))
+        mask = self._active_masks.get(key)
+        if mask is None:
+            mask = np.isin(self.trip_services, list(key))
+            self._active_masks[key] = mask
+        return mask
+
+    def window(self, start_seconds: int, end_seconds: int) -> slice:
+        """Slice of connections departing within ``[start, end]``."""
+        start = int(np.searchsorted(self.departures, start_seconds, side="left"))
+        end = int(np.searchsorted(self.departures, end_seconds, side="right"))
+        return slice(start, end)
+
+
+# Per-thread stack of nested index builds, see timed_cached_property
+_index_builds = threading.local()
+
+T = TypeVar("T")
+
+
+class timed_cached_property(cached_property[T]):
+    """A :class:`functools.cached_property` for the derived indexes of
+    :class:`GTFSData`.
+
+    ``sources`` names the tables and other indexes the index is built from;
+    they are loaded, in parallel, before the build starts. How long the
+    build took is recorded in the instance's ``build_seconds``, leaving out
+    time spent building other indexes it depends on. Concurrent first
+    accesses build the index once.
+    """
+
+    def __init__(self, func: Callable[[Any], T], sources: tuple[str, ...] = ()) -> None:
+        super().__init__(func)
+        self.sources = sources
+        self.build_lock = threading.RLock()
+
+    @overload
+    def __get__(
+        self, instance: None, owner: type | None = None
+    ) -> timed_cached_property[T]: ...
+
+    @overload
+    def __get__(self, instance: object, owner: type | None = None) -> T: ...
+
+    def __get__(
+        self, instance: Any, owner: type | None = None
+    ) -> T | timed_cached_property[T]:
+        if instance is None:
+            return self
+        built: T
+        if self.attrname in instance.__dict__:
+            built = instance.__dict__[self.attrname]
+            return built
+        instance.prepare(self.sources)
+        with self.build_lock:
+            if self.attrname in instance.__dict__:
+                built = instance.__dict__[self.attrname]
+                return built
+            nested = _index_builds.__dict__.setdefault("nested", [])
+            nested.append(0.0)
+            started = time.perf_counter()
+            try:
+                value: T = super().__get__(instance, owner)
+            finally:
+                elapsed = time.perf_counter() - started
+                own = elapsed - nested.pop()
+                if nested:
+                    nested[-1] += elapsed
+            instance.build_seconds[self.attrname] = own
+            return value
+
+
+def derived_from(  # noqa: UP047 - no type parameter syntax before 3.12
+    *sources: str,
+) -> Callable[[Callable[[Any], T]], timed_cached_property[T]]:
+    """Declare a derived index of :class:`GTFSData` built from ``sources``,
+    the tables and indexes it reads."""
+    return lambda func: timed_cached_property(func, sources)
 
 
 @dataclass
 class GTFSData:
-    """Container for all loaded GTFS tables."""
+    """Container for all loaded GTFS tables.
+
+    ``stop_times`` is only read to build :attr:`trip_layout`; it is ``None``
+    when the layout was loaded from a saved timetable instead.
+    ``file_digests`` holds the content digest of each feed file the data was
+    loaded from (see :func:`feed_file_digests`), when known.
+    """
 
     all_stops: pd.DataFrame
     stations: pd.DataFrame
     trips: pd.DataFrame
-    stop_times: pd.DataFrame
+    stop_times: pd.DataFrame | None
     calendar: pd.DataFrame
     station_to_platform_stops: dict[str, list[str]]
+    transfers: pd.DataFrame | None = None
+    frequencies: pd.DataFrame | None = None
+    routes: pd.DataFrame | None = None
+    feed_version: str | None = None
+    calendar_dates: pd.DataFrame | None = None
+    file_digests: dict[str, str] | None = None
+
+    @property
+    def build_seconds(self) -> dict[str, float]:
+        """Seconds each derived index took to build, keyed by name."""
+        seconds: dict[str, float] = self.__dict__.setdefault("_build_seconds", {})
+        return seconds
+
+    def prepare(self, names: Iterable[str]) -> None:
+        """Make sure the tables and indexes ``names`` are there, reading and
+        building missing ones in parallel. Every table of a plain
+        :class:`GTFSData` is loaded."""
+        missing = [name for name in names if name not in self.__dict__]
+        if len(missing) < 2:
+            for name in missing:
+                getattr(self, name)
+            return
+        with ThreadPoolExecutor(
+            max_workers=min(load_threads(), len(missing)),
+            thread_name_prefix="dart-mcp-load",
+        ) as pool:
+            for future in [pool.submit(getattr, self, name) for name in missing]:
+                future.result()
+
+    def load_all(self) -> None:
+        """Load every table and build every derived index up front, in
+        parallel as far as their dependencies allow."""
+        with ThreadPoolExecutor(
+            max_workers=load_threads(), thread_name_prefix="dart-mcp-load"
+        ) as pool:
+            # stop_times goes first as it takes longest; the indexes that
+            # don't need it are built meanwhile
+            tables = [pool.submit(getattr, self, name) for name in TABLE_READERS]
+            for stage in INDEX_STAGES:
+                for future in [pool.submit(getattr, self, name) for name in stage]:
+                    future.result()
+            for future in tables:
+                future.result()
+
+    @derived_from("all_stops", "transfers")
+    def footpaths(self) -> Footpaths:
+        """Walking transfers between nearby stops, built on first use."""
+        return build_footpaths(self.all_stops, self.transfers)
+
+    @derived_from("frequencies", "trip_layout")
+    def frequency_templates(self) -> dict[Any, FrequencyTemplate]:
+        """Headway-based trips keyed by trip ID, built on first use."""
+        return build_frequency_templates(self.trip_layout, self.frequencies)
+
+    @derived_from("trip_layout", "frequency_templates")
+    def departures(self) -> DepartureIndex:
+        """Per-stop sorted departure index, built on first use."""
+        return build_departure_index(self.trip_layout, self.frequency_templates)
+
+    @derived_from("trip_layout", "frequency_templates")
+    def arrivals(self) -> ArrivalIndex:
+        """Per-stop sorted arrival index for arrive-by searches."""
+        return build_arrival_index(self.trip_layout, self.frequency_templates)
+
+    @derived_from("routes", "trips", "trip_layout")
+    def route_catalog(self) -> RouteCatalog:
+        """Route names, directions and stop sequences, built on first use."""
+        return build_route_catalog(self.routes, self.trips, self.trip_layout)
+
+    @derived_from("stop_times", "footpaths")
+    def trip_layout(self) -> TripLayout:
+        """Trip-ordered stop times with per-trip offsets, built on first use."""
+        if self.stop_times is None:
+            raise ValueError("The stop times were replaced by a mapped timetable")
+        return build_trip_layout(self.stop_times, self.footpaths.stop_ids)
+
+    @derived_from("trips", "trip_layout", "frequency_templates")
+    def connections(self) -> Connections:
+        """Timetable connections for one-to-many sweeps, built on first use."""
+        return build_connections(self.trip_layout, self.trips, self.frequency_templates)
+
+    @derived_from("trips", "trip_layout", "frequency_templates")
+    def service_spans(self) -> ServiceSpans:
+        """First and last departure of each trip pattern at each stop."""
+        return build_service_spans(
+            self.trip_layout, self.trips, self.frequency_templates
+        )
+
+    @derived_from("trips", "connections", "frequency_templates")
+    def segment_times(self) -> SegmentTimes:
+        """Run-time statistics per route segment and hour band."""
+        from .analytics import build_segment_times
+
+        return build_segment_times(
+            self.trips, self.connections, self.frequency_templates
+        )
+
+    @derived_from("calendar", "calendar_dates")
+    def service_end(self) -> date | None:
+        """Last day any service of the feed runs, ``None`` if none ever does."""
+        last_dates = last_service_dates(self.calendar, self.calendar_dates)
+        if last_dates.empty:
+            return None
+        return parse_gtfs_date(last_dates.max())
+
+    @derived_from("all_stops")
+    def stop_names(self) -> dict[str, str]:
+        """Display name of every stop keyed by stop ID."""
+        stops = self.all_stops[["stop_id", "stop_name"]]
+        return dict(stops.itertuples(index=False, name=None))
 
 
 def get_gtfs_folder() -> Path:
@@ -41,35 +671,578 @@ def get_gtfs_folder() -> Path:
     )
 
 
-def load_gtfs_data() -> GTFSData:
-    """Load and prepare GTFS data and return a :class:`GTFSData` instance."""
+def feed_file_digests(gtfs_folder: Path) -> dict[str, str]:
+    """Content digest of each file of the feed, keyed by file name."""
+    digests = {}
+    for path in sorted(gtfs_folder.glob("*.txt")):
+        digest = hashlib.blake2b(digest_size=16)
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digests[path.name] = digest.hexdigest()
+    return digests
 
-    gtfs_folder = get_gtfs_folder()
-    if not gtfs_folder.exists():
-        raise FileNotFoundError(f"GTFS folder '{gtfs_folder}' not found.")
 
-    # Load GTFS files
-    all_stops_df = pd.read_csv(gtfs_folder / "stops.txt")
-    trips_df = pd.read_csv(gtfs_folder / "trips.txt")
-    stop_times_df = pd.read_csv(gtfs_folder / "stop_times.txt")
-    calendar_df = pd.read_csv(gtfs_folder / "calendar.txt")
+def compute_feed_version(
+    gtfs_folder: Path, file_digests: dict[str, str] | None = None
+) -> str:
+    """Fingerprint the feed files, so results can be tied to one feed.
 
-    # Ensure consistent data types for stop_id columns
-    all_stops_df["stop_id"] = all_stops_df["stop_id"].astype(str)
-    stop_times_df["stop_id"] = stop_times_df["stop_id"].astype(str)
+    The digest covers file names and contents; redeploying an unchanged feed
+    keeps the same version even though file timestamps differ. Pass the
+    folder's :func:`feed_file_digests` if they are at hand.
+    """
+    if file_digests is None:
+        file_digests = feed_file_digests(gtfs_folder)
+    digest = hashlib.blake2b(digest_size=16)
+    for name, file_digest in sorted(file_digests.items()):
+        digest.update(name.encode())
+        digest.update(bytes.fromhex(file_digest))
+    return digest.hexdigest()
 
-    # Filter stops to only include station stops (location_type == 1)
-    stations_df = all_stops_df[all_stops_df["location_type"] == 1].copy()
 
-    # Create normalized station names for searching
-    stations_df["normalized_name"] = (
-        stations_df["stop_name"]
-        .str.lower()
-        .str.replace(" station", "")
-        .str.replace(" dart", "")
+def parse_gtfs_date(value: Any) -> date:
+    """Turn a GTFS ``YYYYMMDD`` date (string or integer) into a date."""
+    value = int(value)
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+
+def last_service_dates(
+    calendar_df: pd.DataFrame, calendar_dates_df: pd.DataFrame | None = None
+) -> pd.Series:
+    """Last ``YYYYMMDD`` day each service runs, indexed by service ID.
+
+    A calendar row counts up to its ``end_date`` if it runs on at least one
+    weekday, and dates added in calendar_dates extend it. Services that
+    never run are left out.
+    """
+    runs = calendar_df[list(WEEKDAY_COLUMNS)].astype(int).any(axis=1)
+    start = calendar_df["start_date"].astype(int)
+    end = calendar_df["end_date"].astype(int)
+    active = calendar_df[runs & (start <= end)]
+    last = pd.Series(end[active.index].to_numpy(), index=active["service_id"])
+
+    if calendar_dates_df is not None and not calendar_dates_df.empty:
+        added = calendar_dates_df[calendar_dates_df["exception_type"].astype(int) == 1]
+        extra = pd.Series(
+            added["date"].astype(int).to_numpy(), index=added["service_id"]
+        )
+        last = pd.concat([last, extra])
+
+    return last.groupby(level=0).max()
+
+
+def build_footpaths(
+    stops_df: pd.DataFrame,
+    transfers_df: pd.DataFrame | None = None,
+    max_walk_meters: float = MAX_WALK_METERS,
+    walk_speed_mps: float = WALK_SPEED_MPS,
+) -> Footpaths:
+    """Build the walking-transfer graph between nearby boarding stops.
+
+    Stops are bucketed into a grid of ``max_walk_meters`` cells so distances
+    are only computed between stops in neighboring cells. Explicit
+    ``transfers.txt`` rules are applied on top: ``min_transfer_time`` overrides
+    the walking estimate and ``transfer_type == 3`` removes the link.
+    """
+    stops = stops_df
+    if "location_type" in stops.columns:
+        # Stations are reached through their platforms, not walked to
+        stops = stops[stops["location_type"].fillna(0) != 1]
+
+    stop_ids = stops["stop_id"].astype(str).tolist()
+    index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+    links: dict[tuple[int, int], int] = {}
+
+    if {"stop_lat", "stop_lon"} <= set(stops.columns) and len(stops):
+        lat = pd.to_numeric(stops["stop_lat"], errors="coerce").to_numpy(float)
+        lon = pd.to_numeric(stops["stop_lon"], errors="coerce").to_numpy(float)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+
+        # Project onto a local plane in metres around the feed's mean latitude
+        mean_lat = math.radians(float(np.nanmean(lat))) if valid.any() else 0.0
+        y = np.radians(np.where(valid, lat, 0.0)) * EARTH_RADIUS_METERS
+        x = (
+            np.radians(np.where(valid, lon, 0.0))
+            * EARTH_RADIUS_METERS
+            * math.cos(mean_lat)
+        )
+
+        cells: dict[tuple[int, int], list[int]] = {}
+        cell_x = np.floor(x / max_walk_meters).astype(np.int64)
+        cell_y = np.floor(y / max_walk_meters).astype(np.int64)
+        for i in np.flatnonzero(valid):
+            cells.setdefault((int(cell_x[i]), int(cell_y[i])), []).append(int(i))
+
+        for (cx, cy), members in cells.items():
+            src = np.asarray(members)
+            neighbors = [
+                j
+                for dx in (-1, 0, 1)
+                for dy in (-1, 0, 1)
+                for j in cells.get((cx + dx, cy + dy), ())
+            ]
+            dst = np.asarray(neighbors)
+            dist = np.hypot(
+                x[src][:, None] - x[dst][None, :], y[src][:, None] - y[dst][None, :]
+            )
+            rows, cols = np.nonzero((dist <= max_walk_meters) & (src[:, None] != dst))
+            seconds = np.ceil(dist[rows, cols] / walk_speed_mps).astype(int)
+            found = np.column_stack((src[rows], dst[cols], seconds))
+            for a, b, secs in found.tolist():
+                links[(a, b)] = secs
+
+    if transfers_df is not None and not transfers_df.empty:
+        for row in transfers_df.itertuples(index=False):
+            a = index.get(str(row.from_stop_id))
+            b = index.get(str(row.to_stop_id))
+            if a is None or b is None or a == b:
+                continue
+            transfer_type = getattr(row, "transfer_type", 0)
+            if transfer_type == 3:
+                links.pop((a, b), None)
+                continue
+            min_time = getattr(row, "min_transfer_time", None)
+            if min_time is not None and not pd.isna(min_time):
+                links[(a, b)] = int(min_time)
+            else:
+                links.setdefault((a, b), 0)
+
+    pairs = sorted(links.items())
+    sources = np.fromiter((a for (a, _), _ in pairs), dtype=np.int32, count=len(pairs))
+    targets = np.fromiter((b for (_, b), _ in pairs), dtype=np.int32, count=len(pairs))
+    walk_seconds = np.fromiter(
+        (secs for _, secs in pairs), dtype=np.int32, count=len(pairs)
+    )
+    offsets = np.zeros(len(stop_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(stop_ids)), out=offsets[1:])
+
+    return Footpaths(
+        stop_ids=stop_ids,
+        index=index,
+        offsets=offsets,
+        targets=targets,
+        walk_seconds=walk_seconds,
+    )
+
+
+def times_to_seconds(times: pd.Series) -> np.ndarray:
+    """Vectorized :func:`time_to_seconds`; missing or invalid times become NaN."""
+    # Timetables repeat the same few thousand clock times, parse each once
+    codes, uniques = pd.factorize(times)
+    parsed = np.array(
+        [time_to_seconds(value) for value in uniques] + [None], dtype=float
+    )
+    return parsed[codes]
+
+
+def build_frequency_templates(
+    layout: TripLayout, frequencies_df: pd.DataFrame | None
+) -> dict[Any, FrequencyTemplate]:
+    """Turn frequencies.txt rows and their trips' stop times into templates."""
+    if frequencies_df is None or frequencies_df.empty:
+        return {}
+
+    windows: dict[Any, list[tuple[int, int, int]]] = {}
+    for row in frequencies_df.to_dict("records"):
+        start = time_to_seconds(row["start_time"])
+        end = time_to_seconds(row["end_time"])
+        if start is None or end is None or row["headway_secs"] <= 0:
+            continue
+        windows.setdefault(row["trip_id"], []).append(
+            (start, end, int(row["headway_secs"]))
+        )
+
+    templates = {}
+    for trip_id, trip_windows in windows.items():
+        t = layout.trip_index.get(str(trip_id))
+        if t is None:
+            continue
+        calls = slice(int(layout.offsets[t]), int(layout.offsets[t + 1]))
+        # Non-timepoint stops have no times, fall back to the other column
+        arrivals, departures = layout.arrivals[calls], layout.departures[calls]
+        arr = np.where(arrivals < 0, departures, arrivals)
+        dep = np.where(departures < 0, arrivals, departures)
+        if (arr < 0).any() or (dep < 0).any():
+            continue
+        first = dep[0]
+        templates[layout.trip_ids[t]] = FrequencyTemplate(
+            trip_id=layout.trip_ids[t],
+            stop_ids=[layout.stop_ids[stop] for stop in layout.stops[calls].tolist()],
+            stop_sequences=layout.sequences[calls].tolist(),
+            arrival_offsets=(arr - first).tolist(),
+            departure_offsets=(dep - first).tolist(),
+            windows=trip_windows,
+        )
+    return templates
+
+
+def build_departure_index(
+    layout: TripLayout,
+    frequency_templates: dict[Any, FrequencyTemplate] | None = None,
+) -> DepartureIndex:
+    """Group scheduled departures by stop and sort them by time."""
+    return _index_by_stop(
+        DepartureIndex, layout, layout.departures, frequency_templates
+    )
+
+
+def build_arrival_index(
+    layout: TripLayout,
+    frequency_templates: dict[Any, FrequencyTemplate] | None = None,
+) -> ArrivalIndex:
+    """Group scheduled arrivals by stop and sort them by time."""
+    arrivals = np.where(layout.arrivals < 0, layout.departures, layout.arrivals)
+    return _index_by_stop(ArrivalIndex, layout, arrivals, frequency_templates)
+
+
+IndexT = TypeVar("IndexT", bound=DepartureIndex)
+
+
+def _index_by_stop(  # noqa: UP047 - no type parameter syntax before 3.12
+    cls: type[IndexT],
+    layout: TripLayout,
+    times: np.ndarray,
+    frequency_templates: dict[Any, FrequencyTemplate] | None,
+) -> IndexT:
+    """Sort the timed calls of scheduled trips by stop and ``times``."""
+    keep = times >= 0
+    if frequency_templates:
+        templates = np.zeros(len(layout.trip_ids), dtype=bool)
+        templates[[layout.trip_index[str(t)] for t in frequency_templates]] = True
+        keep &= ~templates[layout.trips]
+
+    rows = np.flatnonzero(keep)
+    stop_codes, stop_ids = pd.factorize(layout.stops[rows])
+    seconds = times[rows]
+    order = np.lexsort((seconds, stop_codes))
+
+    offsets = np.zeros(len(stop_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(stop_codes, minlength=len(stop_ids)), out=offsets[1:])
+
+    return cls(
+        index={layout.stop_ids[stop]: i for i, stop in enumerate(stop_ids.tolist())},
+        offsets=offsets,
+        seconds=seconds[order],
+        rows=rows[order],
+    )
+
+
+def build_service_spans(
+    layout: TripLayout,
+    trips_df: pd.DataFrame,
+    frequency_templates: dict[Any, FrequencyTemplate] | None = None,
+) -> ServiceSpans:
+    """Group trips into patterns and record each pattern's first and last
+    departure at every stop it calls at."""
+    trips = trips_df.drop_duplicates("trip_id")
+    trips = trips.set_index(trips["trip_id"].astype(str))
+    keys = trips.reindex([str(trip_id) for trip_id in layout.trip_ids])
+    offsets = layout.offsets.tolist()
+    trip_patterns = (
+        pd.DataFrame(
+            {
+                "route": keys["route_id"].astype(str),
+                "headsign": keys["trip_headsign"] if "trip_headsign" in keys else "",
+                "service": keys["service_id"].astype(str),
+                "stops": [
+                    layout.stops[offsets[t] : offsets[t + 1]].tobytes()
+                    for t in range(len(layout.trip_ids))
+                ],
+            }
+        )
+        .groupby(["route", "headsign", "service", "stops"], sort=False, dropna=False)
+        .ngroup()
+        .to_numpy()
+    )
+
+    # Scheduled departures, plus the first and last instance of every
+    # headway-based trip at each of its stops
+    scheduled = layout.departures >= 0
+    template_stops: list[list[int]] = []
+    template_times: list[np.ndarray] = []
+    template_trips: list[np.ndarray] = []
+    if frequency_templates:
+        templates = np.zeros(len(layout.trip_ids), dtype=bool)
+        for trip_id, template in frequency_templates.items():
+            t = layout.trip_index[str(trip_id)]
+            templates[t] = True
+            start_span = template.start_span()
+            if start_span is None:
+                continue
+            departure_offsets = np.asarray(template.departure_offsets)
+            calls = [layout.stop_index[s] for s in template.stop_ids]
+            template_stops += [calls, calls]
+            template_times += [start + departure_offsets for start in start_span]
+            template_trips.append(np.full(2 * len(calls), t))
+        scheduled &= ~templates[layout.trips]
+    rows = np.flatnonzero(scheduled)
+    stops = np.concatenate([layout.stops[rows], *map(np.asarray, template_stops)])
+    seconds = np.concatenate([layout.departures[rows], *template_times]).astype(
+        np.int64
+    )
+    trip_codes = np.concatenate([layout.trips[rows], *template_trips]).astype(np.int64)
+    patterns = trip_patterns[trip_codes]
+
+    order = np.lexsort((seconds, patterns, stops))
+    stops, patterns = stops[order], patterns[order]
+    seconds, trip_codes = seconds[order], trip_codes[order]
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = (stops[1:] != stops[:-1]) | (patterns[1:] != patterns[:-1])
+    firsts = np.flatnonzero(new_group)
+    lasts = np.append(firsts[1:], len(order)) - 1
+
+    stop_codes, stop_slots = np.unique(stops[firsts], return_inverse=True)
+    span_offsets = np.zeros(len(stop_codes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(stop_slots, minlength=len(stop_codes)), out=span_offsets[1:])
+    return ServiceSpans(
+        index={layout.stop_ids[stop]: i for i, stop in enumerate(stop_codes.tolist())},
+        offsets=span_offsets,
+        trip_patterns=trip_patterns,
+        pattern_sizes=np.bincount(trip_patterns),
+        patterns=patterns[firsts],
+        first_seconds=seconds[firsts],
+        first_trips=trip_codes[firsts],
+        last_seconds=seconds[lasts],
+        last_trips=trip_codes[lasts],
+    )
+
+
+def build_trip_layout(stop_times_df: pd.DataFrame, stop_ids: list[str]) -> TripLayout:
+    """Sort ``stop_times`` by (trip, sequence) and record per-trip offsets."""
+    trip_codes, trip_ids = pd.factorize(stop_times_df["trip_id"])
+
+    stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+    all_stop_ids = list(stop_ids)
+    stop_id_column = stop_times_df["stop_id"].astype(str)
+    for stop_id in stop_id_column.unique():
+        if stop_id not in stop_index:
+            stop_index[stop_id] = len(all_stop_ids)
+            all_stop_ids.append(stop_id)
+
+    sequences = stop_times_df["stop_sequence"].to_numpy()
+    rows = np.lexsort((sequences, trip_codes))
+
+    arrivals = times_to_seconds(stop_times_df["arrival_time"])[rows]
+    departures = times_to_seconds(stop_times_df["departure_time"])[rows]
+
+    offsets = np.zeros(len(trip_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(trip_codes, minlength=len(trip_ids)), out=offsets[1:])
+
+    return TripLayout(
+        trip_ids=list(trip_ids),
+        trip_index={str(trip_id): t for t, trip_id in enumerate(trip_ids)},
+        stop_ids=all_stop_ids,
+        stop_index=stop_index,
+        offsets=offsets,
+        trips=trip_codes[rows].astype(np.int32),
+        stops=stop_id_column.map(stop_index).to_numpy(np.int32)[rows],
+        sequences=sequences[rows].astype(np.int32),
+        arrivals=np.nan_to_num(arrivals, nan=-1).astype(np.int32),
+        departures=np.nan_to_num(departures, nan=-1).astype(np.int32),
+    )
+
+
+def trip_service_ids(trips_df: pd.DataFrame, trip_ids: list[Any]) -> np.ndarray:
+    """Service ID of each of ``trip_ids``, in order."""
+    services = trips_df.drop_duplicates("trip_id").set_index("trip_id")["service_id"]
+    return services.reindex(trip_ids).to_numpy()
+
+
+def build_connections(
+    layout: TripLayout,
+    trips_df: pd.DataFrame,
+    frequency_templates: dict[Any, FrequencyTemplate] | None = None,
+) -> Connections:
+    """Split scheduled trips into consecutive stop-to-stop connections.
+
+    Stops without times (non-timepoints) are skipped, so their neighbors
+    are connected directly. Frequency-based template trips are left out;
+    routing expands them per query window.
+    """
+    trip_codes = layout.trips
+    arrivals = np.where(layout.arrivals < 0, layout.departures, layout.arrivals)
+    departures = np.where(layout.departures < 0, layout.arrivals, layout.departures)
+
+    keep = departures >= 0
+    if frequency_templates:
+        templates = np.zeros(len(layout.trip_ids), dtype=bool)
+        templates[[layout.trip_index[str(t)] for t in frequency_templates]] = True
+        keep &= ~templates[trip_codes]
+
+    trip_codes, stop_codes = trip_codes[keep], layout.stops[keep]
+    arrivals, departures = arrivals[keep], departures[keep]
+
+    same_trip = trip_codes[1:] == trip_codes[:-1]
+    by_departure = np.argsort(departures[:-1][same_trip], kind="stable")
+
+    return Connections(
+        stop_ids=layout.stop_ids,
+        stop_index=layout.stop_index,
+        trip_ids=layout.trip_ids,
+        trip_services=trip_service_ids(trips_df, layout.trip_ids),
+        departures=departures[:-1][same_trip][by_departure],
+        arrivals=arrivals[1:][same_trip][by_departure],
+        from_stops=stop_codes[:-1][same_trip][by_departure],
+        to_stops=stop_codes[1:][same_trip][by_departure],
+        trips=trip_codes[:-1][same_trip][by_departure],
+    )
+
+
+def normalize_route_name(name: str) -> str:
+    """Normalize a route name or headsign for catalog lookups."""
+    return " ".join(str(name).lower().replace("/", " / ").split())
+
+
+def build_route_catalog(
+    routes_df: pd.DataFrame | None,
+    trips_df: pd.DataFrame,
+    layout: TripLayout,
+) -> RouteCatalog:
+    """Index routes by name, direction and served stops.
+
+    When the feed has no routes.txt, routes are derived from the
+    ``route_id`` values in trips.txt.
+    """
+    trips = trips_df.assign(
+        route_id=trips_df["route_id"].astype(str),
+        direction_id=(
+            trips_df["direction_id"].fillna(0).astype(int)
+            if "direction_id" in trips_df.columns
+            else 0
+        ),
+    )
+
+    route_names: dict[Any, tuple[str, str]] = {}
+    if routes_df is not None:
+        for row in routes_df.itertuples(index=False):
+            short_name = getattr(row, "route_short_name", None)
+            long_name = getattr(row, "route_long_name", None)
+            route_names[str(row.route_id)] = (
+                str(short_name) if pd.notna(short_name) else "",
+                str(long_name) if pd.notna(long_name) else "",
+            )
+    for route_id in trips["route_id"].unique():
+        route_names.setdefault(route_id, (str(route_id), ""))
+
+    # The trip with the most stops represents each direction's stop order
+    stop_counts = pd.Series(np.diff(layout.offsets), index=layout.trip_index)
+    counted = trips.assign(stop_count=trips["trip_id"].astype(str).map(stop_counts))
+    counted = counted.dropna(subset=["stop_count"])
+    longest = counted.loc[
+        counted.groupby(["route_id", "direction_id"])["stop_count"].idxmax()
+    ]
+    stops: dict[Any, dict[int, list[str]]] = {}
+    for trip in longest.to_dict("records"):
+        calls = layout.calls(trip["trip_id"])
+        stops.setdefault(trip["route_id"], {})[trip["direction_id"]] = [
+            layout.stop_ids[stop] for stop in layout.stops[calls].tolist()
+        ]
+
+    trip_rows = [
+        (
+            row["trip_id"],
+            row["route_id"],
+            row["direction_id"],
+            str(row["trip_headsign"]) if pd.notna(row["trip_headsign"]) else None,
+        )
+        for row in trips.to_dict("records")
+    ]
+
+    # Distinct (stop, route) pairs, in timetable order
+    trip_routes = (
+        trips.drop_duplicates("trip_id")
+        .assign(trip_id=lambda df: df["trip_id"].astype(str))
+        .set_index("trip_id")["route_id"]
+        .reindex(list(layout.trip_index))
+    )
+    route_codes, route_ids = pd.factorize(trip_routes)
+    call_routes = route_codes[layout.trips]
+    served = call_routes >= 0
+    pairs = pd.unique(
+        layout.stops[served].astype(np.int64) * len(route_ids) + call_routes[served]
     )
+    stop_routes: dict[str, list[Any]] = {}
+    for stop, route in np.column_stack(np.divmod(pairs, len(route_ids))).tolist():
+        stop_routes.setdefault(layout.stop_ids[stop], []).append(route_ids[route])
+
+    return assemble_route_catalog(route_names, stops, trip_rows, stop_routes)
+
+
+def assemble_route_catalog(
+    route_names: dict[Any, tuple[str, str]],
+    stops: dict[Any, dict[int, list[str]]],
+    trip_rows: Iterable[tuple[Any, Any, int, str | None]],
+    stop_routes: dict[str, list[Any]],
+) -> RouteCatalog:
+    """Build a :class:`RouteCatalog` from plain rows, whatever the storage.
+
+    ``route_names`` maps route IDs to ``(short_name, long_name)``, ``stops``
+    holds each route's per-direction stop order and ``trip_rows`` are
+    ``(trip_id, route_id, direction_id, headsign)`` tuples in feed order.
+    """
+    grouped = sorted(
+        trip_rows, key=lambda row: (row[1], row[2], row[3] is None, row[3] or "")
+    )
+    headsigns: dict[Any, dict[int, list[str]]] = {}
+    trip_groups: dict[tuple[Any, str | None], list[Any]] = {}
+    previous = None
+    for trip_id, route_id, direction_id, headsign in grouped:
+        trip_groups.setdefault((route_id, None), []).append(trip_id)
+        if headsign is None:
+            continue
+        if (route_id, direction_id, headsign) != previous:
+            previous = (route_id, direction_id, headsign)
+            headsigns.setdefault(route_id, {}).setdefault(direction_id, []).append(
+                headsign
+            )
+        trip_groups.setdefault((route_id, headsign), []).append(trip_id)
+
+    routes = {
+        route_id: RouteInfo(
+            route_id=route_id,
+            short_name=short_name,
+            long_name=long_name,
+            headsigns=headsigns.get(route_id, {}),
+            stops=stops.get(route_id, {}),
+        )
+        for route_id, (short_name, long_name) in route_names.items()
+    }
+
+    names: dict[str, list[tuple[Any, str | None]]] = {}
+    searchable: set[str] = set()
+    for route in routes.values():
+        for name in dict.fromkeys(
+            (route.short_name, route.long_name, route.display_name)
+        ):
+            if name:
+                names.setdefault(normalize_route_name(name), []).append(
+                    (route.route_id, None)
+                )
+        if route.long_name:
+            searchable.add(normalize_route_name(route.long_name))
+        seen = set()
+        for direction_headsigns in route.headsigns.values():
+            for headsign in direction_headsigns:
+                if headsign in seen:
+                    continue
+                seen.add(headsign)
+                key = normalize_route_name(headsign)
+                names.setdefault(key, []).append((route.route_id, headsign))
+                searchable.add(key)
+
+    return RouteCatalog(
+        routes=routes,
+        names=names,
+        searchable=sorted(searchable),
+        trips=trip_groups,
+        stop_routes=stop_routes,
+    )
+
+
+def _parent_station_ids(parent_station: pd.Series) -> pd.Series:
+    """Parent station IDs as strings (``None`` for stops without one)."""
 
-    # Precompute mapping of station ID -> platform stop IDs
     def convert_parent_station(value: Any) -> str | None:
         if pd.isna(value):
             return None
@@ -77,30 +1250,251 @@ def load_gtfs_data() -> GTFSData:
             return str(int(value))
         return str(value)
 
-    all_stops_df["parent_station_str"] = all_stops_df["parent_station"].apply(
-        convert_parent_station
-    )
-    grouped = (
-        all_stops_df.dropna(subset=["parent_station_str"])
-        .groupby("parent_station_str")["stop_id"]
-        .apply(lambda s: s.astype(str).tolist())
-    )
-    station_to_platform = grouped.to_dict()
-
-    return GTFSData(
-        all_stops=all_stops_df,
-        stations=stations_df,
-        trips=trips_df,
-        stop_times=stop_times_df,
-        calendar=calendar_df,
-        station_to_platform_stops=station_to_platform,
-    )
+    return parent_station.apply(convert_parent_station)
+
+
+class _FeedTables:
+    """Reads the tables of a :class:`LazyGTFSData` from its feed folder."""
+
+    def __init__(self, gtfs_folder: Path) -> None:
+        self.gtfs_folder = gtfs_folder
+        self.locks = {name: threading.Lock() for name in TABLE_READERS}
+
+    def load(self, data: GTFSData, name: str) -> Any:
+        """Table ``name`` of ``data``, read on the first call only."""
+        with self.locks[name]:
+            if name not in data.__dict__:
+                data.__dict__[name] = TABLE_READERS[name](self, data)
+        return data.__dict__[name]
+
+    def read_table(self, name: str, **kwargs: Any) -> pd.DataFrame:
+        # Only the columns some query uses are loaded
+        columns = FEED_COLUMNS[name]
+        table: pd.DataFrame = pd.read_csv(
+            self.gtfs_folder / name, usecols=lambda c: c in columns, **kwargs
+        )
+        return table
+
+    def read_optional(self, name: str, **kwargs: Any) -> pd.DataFrame | None:
+        if not (self.gtfs_folder / name).exists():
+            return None
+        return self.read_table(name, **kwargs)
+
+    def read_stop_times(self, data: GTFSData) -> pd.DataFrame:
+        stop_times_df = self.read_table("stop_times.txt")
+        stop_times_df["stop_id"] = stop_times_df["stop_id"].astype(str)
+        return stop_times_df
+
+    def read_all_stops(self, data: GTFSData) -> pd.DataFrame:
+        all_stops_df = self.read_table("stops.txt")
+        # Ensure consistent data types for stop_id columns
+        all_stops_df["stop_id"] = all_stops_df["stop_id"].astype(str)
+        all_stops_df["parent_station_str"] = _parent_station_ids(
+            all_stops_df["parent_station"]
+        )
+        return all_stops_df
+
+    def build_stations(self, data: GTFSData) -> pd.DataFrame:
+        # Filter stops to only include station stops (location_type == 1)
+        all_stops_df = data.all_stops.drop(columns="parent_station_str")
+        stations_df = all_stops_df[all_stops_df["location_type"] == 1].copy()
+
+        # Create normalized station names for searching
+        stations_df["normalized_name"] = (
+            stations_df["stop_name"]
+            .str.lower()
+            .str.replace(" station", "")
+            .str.replace(" dart", "")
+        )
+        return stations_df
+
+    def build_station_platforms(self, data: GTFSData) -> dict[str, list[str]]:
+        # Precompute mapping of station ID -> platform stop IDs
+        grouped = (
+            data.all_stops.dropna(subset=["parent_station_str"])
+            .groupby("parent_station_str")["stop_id"]
+            .apply(lambda s: s.astype(str).tolist())
+        )
+        return {str(station): stops for station, stops in grouped.items()}
+
+
+# How each table of a LazyGTFSData is read, in the order load_all() reads them
+TABLE_READERS: dict[str, Callable[[_FeedTables, GTFSData], Any]] = {
+    "stop_times": _FeedTables.read_stop_times,
+    "all_stops": _FeedTables.read_all_stops,
+    "stations": _FeedTables.build_stations,
+    "station_to_platform_stops": _FeedTables.build_station_platforms,
+    "trips": lambda tables, data: tables.read_table("trips.txt"),
+    "calendar": lambda tables, data: tables.read_table("calendar.txt"),
+    "calendar_dates": lambda tables, data: tables.read_optional("calendar_dates.txt"),
+    "transfers": lambda tables, data: tables.read_optional(
+        "transfers.txt", dtype={"from_stop_id": str, "to_stop_id": str}
+    ),
+    "frequencies": lambda tables, data: tables.read_optional("frequencies.txt"),
+    "routes": lambda tables, data: tables.read_optional("routes.txt"),
+}
+# Feed file each table is read from
+TABLE_FILES = {
+    "stop_times": "stop_times.txt",
+    "all_stops": "stops.txt",
+    "stations": "stops.txt",
+    "station_to_platform_stops": "stops.txt",
+    "trips": "trips.txt",
+    "calendar": "calendar.txt",
+    "calendar_dates": "calendar_dates.txt",
+    "transfers": "transfers.txt",
+    "frequencies": "frequencies.txt",
+    "routes": "routes.txt",
+}
+
+
+class _LazyTable:
+    """A :class:`LazyGTFSData` table, read from the feed on first access."""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+        # Once read, the table is an instance attribute and shadows this
+        return instance._tables.load(instance, self.name)
+
+
+class LazyGTFSData(GTFSData):
+    """:class:`GTFSData` whose tables are read from a feed folder on first
+    access, each at most once even when several threads ask at the same
+    time.
+
+    Derived indexes declare the tables they are built from, so a process
+    that only lists stations or looks up stop names never reads
+    stop_times.txt. :meth:`load_all` loads everything up front.
+    """
+
+    all_stops = _LazyTable()
+    stations = _LazyTable()
+    trips = _LazyTable()
+    stop_times = _LazyTable()
+    calendar = _LazyTable()
+    station_to_platform_stops = _LazyTable()
+    transfers = _LazyTable()
+    frequencies = _LazyTable()
+    routes = _LazyTable()
+    calendar_dates = _LazyTable()
+
+    def __init__(
+        self,
+        gtfs_folder: Path,
+        feed_version: str | None = None,
+        file_digests: dict[str, str] | None = None,
+    ) -> None:
+        self._tables = _FeedTables(gtfs_folder)
+        self.feed_version = feed_version
+        self.file_digests = file_digests
+
+    def __repr__(self) -> str:
+        loaded = [name for name in TABLE_READERS if name in self.__dict__]
+        return f"LazyGTFSData({str(self.gtfs_folder)!r}, loaded={loaded})"
+
+    @property
+    def gtfs_folder(self) -> Path:
+        """The feed folder the tables are read from."""
+        return self._tables.gtfs_folder
+
+
+def load_gtfs_data(
+    gtfs_folder: Path | None = None,
+    timetable_dir: str | Path | None = None,
+    lazy: bool = False,
+) -> GTFSData:
+    """Load and prepare GTFS data and return a :class:`GTFSData` instance.
+
+    Reads the bundled feed unless another ``gtfs_folder`` is given. All
+    tables are read and all indexes built up front, on several threads,
+    unless ``lazy`` is set: then each table is read on first access and each
+    index built on first use (see :class:`LazyGTFSData`).
+
+    With a ``timetable_dir``, the stop times are saved there as a
+    memory-mapped timetable (see :mod:`dart_mcp.timetable`) on first load,
+    and later loads of the same feed map that file instead of reading
+    stop_times.txt.
+    """
+    from . import timetable
+
+    if gtfs_folder is None:
+        gtfs_folder = get_gtfs_folder()
+    if not gtfs_folder.exists():
+        raise FileNotFoundError(f"GTFS folder '{gtfs_folder}' not found.")
+
+    file_digests = feed_file_digests(gtfs_folder)
+    feed_version = compute_feed_version(gtfs_folder, file_digests)
+    timetable_path = None
+    if timetable_dir is not None:
+        timetable_path = timetable.timetable_path(timetable_dir, feed_version)
+
+    data = LazyGTFSData(gtfs_folder, feed_version, file_digests)
+    if timetable_path is not None:
+        if timetable_path.exists():
+            data.stop_times = None
+            timetable.attach_timetable(data, timetable_path)
+        else:
+            # Saving the timetable needs every index anyway
+            lazy = False
+
+    if not lazy:
+        data.load_all()
+    if data.__dict__.get("stop_times") is not None and timetable_path is not None:
+        timetable.save_timetable(data, timetable_path)
+        timetable.attach_timetable(data, timetable_path)
+        data.stop_times = None
+    return data
+
+
+def load_threads() -> int:
+    """Threads used to load a feed, from ``DART_MCP_LOAD_THREADS`` or the
+    number of CPUs (at most 8)."""
+    setting = os.environ.get("DART_MCP_LOAD_THREADS")
+    if setting:
+        return max(1, int(setting))
+    return min(8, os.cpu_count() or 1)
+
+
+_default_data: GTFSData | None = None
+_default_data_lock = threading.Lock()
 
 
-@lru_cache(maxsize=1)
 def get_default_data() -> GTFSData:
-    """Load GTFS data on first use and cache the result."""
-    return load_gtfs_data()
+    """Load GTFS data on first use and cache the result.
+
+    Tables are read as queries first need them; set ``DART_MCP_LAZY_LOAD=0``
+    to read everything at once instead. Set ``DART_MCP_TIMETABLE_DIR`` to
+    share a memory-mapped timetable between worker processes.
+    """
+    global _default_data
+    data = _default_data
+    if data is None:
+        with _default_data_lock:
+            if _default_data is None:
+                _default_data = load_gtfs_data(
+                    timetable_dir=os.environ.get("DART_MCP_TIMETABLE_DIR"),
+                    lazy=os.environ.get("DART_MCP_LAZY_LOAD", "1") != "0",
+                )
+            data = _default_data
+    return data
+
+
+def cached_default_data() -> GTFSData | None:
+    """The data :func:`get_default_data` returns, if it was loaded already."""
+    return _default_data
+
+
+def set_default_data(data: GTFSData | None) -> GTFSData | None:
+    """Replace the data :func:`get_default_data` returns; with ``None`` the
+    next call loads the feed again. Returns the data replaced, if any."""
+    global _default_data
+    with _default_data_lock:
+        previous, _default_data = _default_data, data
+    return previous
 
 
 def get_active_service_ids(target_date: date, data: GTFSData) -> list[str]:
@@ -200,61 +1594,100 @@ def get_platform_stops_for_station(station_id: str, data: GTFSData) -> list[str]
     return data.station_to_platform_stops.get(station_id, [])
 
 
+def get_walking_transfers(stop_id: str, data: GTFSData) -> list[tuple[str, int]]:
+    """Get ``(stop_id, walk_seconds)`` pairs for stops within walking distance."""
+    return data.footpaths.neighbors(stop_id)
+
+
+def find_trips(trip: str, data: GTFSData) -> list[Any]:
+    """Find trips by trip ID, falling back to the bus number (short name)."""
+    trip = str(trip).strip()
+    t = data.trip_layout.trip_index.get(trip)
+    if t is not None:
+        return [data.trip_layout.trip_ids[t]]
+    if "trip_short_name" not in data.trips.columns:
+        return []
+    short_names = data.trips["trip_short_name"].astype("string").str.strip()
+    return data.trips.loc[short_names.str.lower() == trip.lower(), "trip_id"].tolist()
+
+
+def find_trips_serving(stop_ids: Iterable[str], data: GTFSData) -> set[Any]:
+    """Get the IDs of every trip calling at any of ``stop_ids``."""
+    layout = data.trip_layout
+    stops = [layout.stop_index[s] for s in stop_ids if s in layout.stop_index]
+    trips = np.unique(layout.trips[np.isin(layout.stops, stops)])
+    return {layout.trip_ids[t] for t in trips.tolist()}
+
+
+def get_trip_stop_times(trip_id: Any, data: GTFSData) -> list[tuple[str, str, str]]:
+    """Get ``(stop_id, arrival_time, departure_time)`` for every call of a trip.
+
+    Reads one contiguous slice of :attr:`GTFSData.trip_layout`; untimed stops
+    have empty times.
+    """
+    layout = data.trip_layout
+    calls = layout.calls(trip_id)
+    arrivals = layout.arrivals[calls].tolist()
+    departures = layout.departures[calls].tolist()
+    return [
+        (
+            layout.stop_ids[stop],
+            seconds_to_time(arrivals[i]) if arrivals[i] >= 0 else "",
+            seconds_to_time(departures[i]) if departures[i] >= 0 else "",
+        )
+        for i, stop in enumerate(layout.stops[calls].tolist())
+    ]
+
+
 def find_stops_by_name(stop_name: str, data: GTFSData) -> list[dict]:
     """Find stops by name with fuzzy matching.
-    
+
     Args:
         stop_name: The stop name to search for
         data: GTFS data
-        
+
     Returns:
         List of stop dictionaries with stop_id and stop_name
     """
     if not stop_name:
         return []
-    
+
     stop_name_lower = stop_name.lower().strip()
-    
+
     # First try exact match
     exact_matches = data.all_stops[
         data.all_stops["stop_name"].str.lower() == stop_name_lower
     ]
-    
+
     if not exact_matches.empty:
         return [
             {"stop_id": row["stop_id"], "stop_name": row["stop_name"]}
             for _, row in exact_matches.iterrows()
         ]
-    
+
     # Try partial matches
     partial_matches = data.all_stops[
         data.all_stops["stop_name"].str.lower().str.contains(stop_name_lower, na=False)
     ]
-    
+
     if not partial_matches.empty:
         return [
             {"stop_id": row["stop_id"], "stop_name": row["stop_name"]}
             for _, row in partial_matches.iterrows()
         ]
-    
+
     # Try abbreviation matching for common terms
-    abbreviations = {
-        "dart": "dart central station",
-        "central": "dart central station", 
-        "dt": "dart central station",
-        "downtown": "dart central station"
-    }
-    
-    if stop_name_lower in abbreviations:
-        expanded_name = abbreviations[stop_name_lower]
+    if stop_name_lower in STOP_NAME_ABBREVIATIONS:
+        expanded_name = STOP_NAME_ABBREVIATIONS[stop_name_lower]
         return find_stops_by_name(expanded_name, data)
-    
+
     return []
 
 
 def time_to_seconds(time_str: str | None) -> int | None:
     """Convert HH:MM:SS to seconds since midnight."""
-    if pd.isna(time_str) or not time_str:
+    # Missing values are NaN when read by pandas, empty strings otherwise
+    if not isinstance(time_str, str) or not time_str:
         return None
 
     parts = str(time_str).split(":")
@@ -276,6 +1709,435 @@ def seconds_to_time(seconds: int) -> str:
     return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
 
+def _template_departures(
+    template: FrequencyTemplate, p: int, q: int | None, after_seconds: int
+) -> Iterator[tuple[int, FrequencyTemplate, int, int | None]]:
+    offset = template.departure_offsets[p]
+    for start in template.start_times(p, after_seconds):
+        yield start + offset, template, p, q
+
+
+def iter_frequency_departures(
+    templates: Iterable[FrequencyTemplate],
+    from_stop_ids: Iterable[str],
+    after_seconds: int,
+    to_stop_ids: Iterable[str] | None = None,
+) -> Iterator[tuple[int, FrequencyTemplate, int, int | None]]:
+    """Lazily generate departures of headway-based trips in time order.
+
+    Yields ``(departure_seconds, template, from_position, to_position)`` for
+    every trip instance leaving one of ``from_stop_ids`` at or after
+    ``after_seconds``. When ``to_stop_ids`` is given, only instances that
+    later call at one of those stops are produced and ``to_position`` is the
+    first such stop; otherwise it is ``None``.
+    """
+    origins = set(from_stop_ids)
+    destinations = set(to_stop_ids) if to_stop_ids is not None else None
+
+    streams = []
+    for template in templates:
+        for p, stop_id in enumerate(template.stop_ids):
+            if stop_id not in origins:
+                continue
+            q = None
+            if destinations is not None:
+                q = next(
+                    (
+                        j
+                        for j in range(p + 1, len(template.stop_ids))
+                        if template.stop_ids[j] in destinations
+                    ),
+                    None,
+                )
+                if q is None:
+                    continue
+            streams.append(_template_departures(template, p, q, after_seconds))
+
+    yield from heapq.merge(*streams, key=lambda departure: departure[0])
+
+
+def _template_arrivals(
+    template: FrequencyTemplate, p: int, q: int, before_seconds: int
+) -> Iterator[tuple[int, FrequencyTemplate, int, int]]:
+    offset = template.arrival_offsets[q]
+    for start in template.start_times_before(q, before_seconds):
+        yield start + offset, template, p, q
+
+
+def iter_frequency_arrivals(
+    templates: Iterable[FrequencyTemplate],
+    from_stop_ids: Iterable[str],
+    to_stop_ids: Iterable[str],
+    before_seconds: int,
+) -> Iterator[tuple[int, FrequencyTemplate, int, int]]:
+    """Lazily generate arrivals of headway-based trips, latest first.
+
+    Yields ``(arrival_seconds, template, from_position, to_position)`` for
+    every trip instance reaching one of ``to_stop_ids`` at or before
+    ``before_seconds`` after calling at one of ``from_stop_ids``;
+    ``from_position`` is the last such call before the destination.
+    """
+    origins = set(from_stop_ids)
+    destinations = set(to_stop_ids)
+
+    streams = []
+    for template in templates:
+        p = None
+        for q, stop_id in enumerate(template.stop_ids):
+            if stop_id in destinations and p is not None:
+                streams.append(_template_arrivals(template, p, q, before_seconds))
+            if stop_id in origins:
+                p = q
+
+    yield from heapq.merge(*streams, key=lambda arrival: arrival[0], reverse=True)
+
+
+def merge_frequency_arrivals(
+    scheduled: list[tuple[int, str, str, Any]],
+    templates: Iterable[FrequencyTemplate],
+    from_stop_ids: Iterable[str],
+    to_stop_ids: Iterable[str],
+    before_seconds: int,
+    limit: int,
+) -> list[tuple[int, str, str, Any]]:
+    """Merge scheduled arrivals with headway-based ones, keeping the latest
+    ``limit`` in time order.
+
+    Rows are ``(arrival_seconds, departure_time, arrival_time, trip_id)``.
+    """
+    candidates = list(scheduled)
+    # Arrivals come out latest first, so the first ``limit`` are enough
+    for arr_seconds, template, p, q in islice(
+        iter_frequency_arrivals(templates, from_stop_ids, to_stop_ids, before_seconds),
+        limit,
+    ):
+        trip_start = arr_seconds - template.arrival_offsets[q]
+        dep_time = seconds_to_time(trip_start + template.departure_offsets[p])
+        candidates.append(
+            (arr_seconds, dep_time, seconds_to_time(arr_seconds), template.trip_id)
+        )
+    return sorted(heapq.nlargest(limit, candidates, key=lambda c: c[0]))
+
+
+def merge_frequency_departures(
+    scheduled: list[tuple[int, str, str | None, Any]],
+    templates: Iterable[FrequencyTemplate],
+    from_stop_ids: Iterable[str],
+    after_seconds: int,
+    limit: int,
+    to_stop_ids: Iterable[str] | None = None,
+) -> list[tuple[int, str, str | None, Any]]:
+    """Merge scheduled departures with headway-based ones, keeping ``limit``.
+
+    Rows are ``(departure_seconds, departure_time, arrival_time, trip_id)``;
+    ``arrival_time`` is only filled in when ``to_stop_ids`` is given.
+    """
+    candidates = list(scheduled)
+    # Departures come out in time order, so the first ``limit`` are enough
+    for dep_seconds, template, p, q in islice(
+        iter_frequency_departures(templates, from_stop_ids, after_seconds, to_stop_ids),
+        limit,
+    ):
+        arr_time = None
+        if q is not None:
+            trip_start = dep_seconds - template.departure_offsets[p]
+            arr_time = seconds_to_time(trip_start + template.arrival_offsets[q])
+        candidates.append(
+            (dep_seconds, seconds_to_time(dep_seconds), arr_time, template.trip_id)
+        )
+    return heapq.nsmallest(limit, candidates, key=lambda c: c[0])
+
+
+def roll_service_days(
+    when: datetime,
+    departures_on: Callable[[date, int], list[tuple[int, str, str | None, Any]]],
+    limit: int,
+    horizon_days: int = SERVICE_DAY_HORIZON,
+) -> list[tuple[int, str, str | None, Any]]:
+    """Collect the first ``limit`` departures after ``when`` across service
+    days.
+
+    ``departures_on(day, after_seconds)`` returns the first ``limit`` rows
+    (see :func:`merge_frequency_departures`) of service day ``day`` at or
+    after ``after_seconds`` on that day's clock. Yesterday's trips still
+    running past midnight (times from 24:00:00) merge with today's, and the
+    following days are asked in turn until ``limit`` rows are found or
+    ``horizon_days`` is reached, so a day with only a bus or two left is
+    topped up from the next. Times in the rows returned are on the clock of
+    the ``when`` date, so tomorrow's 08:00 is 32:00:00.
+    """
+    today = when.date()
+    after_seconds = when.hour * 3600 + when.minute * 60 + when.second
+    upcoming: list[tuple[int, str, str | None, Any]] = []
+    for days in range(-1, horizon_days + 1):
+        offset = days * SECONDS_PER_DAY
+        # Nothing from this day on can leave before the rows already found
+        if len(upcoming) == limit and upcoming[-1][0] <= offset:
+            break
+        for dep, _, arr_time, trip_id in departures_on(
+            today + timedelta(days=days), after_seconds - offset
+        ):
+            arrival = time_to_seconds(arr_time)
+            upcoming.append(
+                (
+                    dep + offset,
+                    seconds_to_time(dep + offset),
+                    None if arrival is None else seconds_to_time(arrival + offset),
+                    trip_id,
+                )
+            )
+        upcoming = heapq.nsmallest(limit, upcoming, key=lambda c: c[0])
+    return upcoming
+
+
+def label_departures(
+    rows: Sequence[tuple[int, str, str | None, Any]],
+    labels: dict[Any, tuple[str, str]],
+) -> list[Departure]:
+    """Turn merged departure rows into :class:`Departure` records."""
+    return [
+        Departure(dep_time, arr_time, *labels.get(trip_id, (str(trip_id), "")))
+        for _, dep_time, arr_time, trip_id in rows
+    ]
+
+
+def _trip_labels(trip_ids: Iterable[Any], data: GTFSData) -> dict[Any, tuple[str, str]]:
+    """Map trip IDs to ``(train_name, headsign)`` display labels."""
+    trips = data.trips[data.trips["trip_id"].isin(list(trip_ids))]
+    labels = {}
+    for row in trips.to_dict("records"):
+        short_name = row.get("trip_short_name")
+        train_name = str(short_name) if pd.notna(short_name) else str(row["trip_id"])
+        headsign = row["trip_headsign"] if pd.notna(row["trip_headsign"]) else ""
+        labels[row["trip_id"]] = (train_name, headsign)
+    return labels
+
+
+def _scan_service_span(
+    stop_ids: list[str], trips: np.ndarray, data: GTFSData
+) -> tuple[tuple[int, int], tuple[int, int]] | None:
+    """:meth:`ServiceSpans.span` for trips that aren't whole patterns."""
+    layout = data.trip_layout
+    wanted = np.zeros(len(layout.trip_ids), dtype=bool)
+    wanted[trips] = True
+    rows = data.departures.rows_after(stop_ids)
+    rows = rows[wanted[layout.trips[rows]]]
+    firsts, lasts = [], []
+    if len(rows):
+        seconds = layout.departures[rows]
+        first, last = rows[np.argmin(seconds)], rows[np.argmax(seconds)]
+        firsts.append((int(layout.departures[first]), int(layout.trips[first])))
+        lasts.append((int(layout.departures[last]), int(layout.trips[last])))
+    for trip_id, template in data.frequency_templates.items():
+        t = layout.trip_index[str(trip_id)]
+        start_span = template.start_span()
+        offsets = [
+            template.departure_offsets[p]
+            for p, stop_id in enumerate(template.stop_ids)
+            if stop_id in stop_ids
+        ]
+        if wanted[t] and start_span is not None and offsets:
+            firsts.append((start_span[0] + min(offsets), t))
+            lasts.append((start_span[1] + max(offsets), t))
+    if not firsts:
+        return None
+    return min(firsts), max(lasts)
+
+
+def find_service_span(
+    stop_ids: list[str], trip_ids: Iterable[Any], data: GTFSData
+) -> tuple[Departure, Departure] | None:
+    """Find the first and last departure from any of ``stop_ids`` on the
+    given trips, from :attr:`GTFSData.service_spans`.
+
+    Trips usually come as whole patterns, e.g. every active trip of a route;
+    otherwise the departures of the stops are scanned instead.
+    """
+    layout = data.trip_layout
+    trips = np.unique(
+        np.array(
+            [
+                t
+                for t in map(layout.trip_index.get, map(str, trip_ids))
+                if t is not None
+            ],
+            dtype=np.int64,
+        )
+    )
+    patterns = data.service_spans.whole_patterns(trips)
+    if patterns is not None:
+        span = data.service_spans.span(stop_ids, patterns)
+    else:
+        span = _scan_service_span(stop_ids, trips, data)
+    if span is None:
+        return None
+    rows: list[tuple[int, str, str | None, Any]] = [
+        (seconds, seconds_to_time(seconds), None, layout.trip_ids[t])
+        for seconds, t in span
+    ]
+    first, last = label_departures(rows, _trip_labels([row[3] for row in rows], data))
+    return first, last
+
+
+def find_departures(
+    stop_ids: list[str],
+    trip_ids: Iterable[Any],
+    after_seconds: int,
+    data: GTFSData,
+    limit: int = 5,
+) -> list[Departure]:
+    """Find the next departures from any of ``stop_ids`` on the given trips.
+
+    Returns departures (without arrival times) sorted by time, combining
+    scheduled trips with lazily expanded frequency-based trips.
+    """
+    wanted = _trip_mask(trip_ids, data.trip_layout)
+    upcoming = _departure_rows(stop_ids, wanted, after_seconds, data, limit)
+    return label_departures(upcoming, _trip_labels((c[3] for c in upcoming), data))
+
+
+def find_upcoming_departures(
+    stop_ids: list[str],
+    trip_ids: Iterable[Any],
+    when: datetime,
+    data: GTFSData,
+    limit: int = 5,
+) -> list[Departure]:
+    """Find the next departures after ``when`` on the given trips, rolling
+    over into the following service days, see :func:`roll_service_days`.
+
+    Each service day is a lookup in the departure index restricted to the
+    trips running that day, from the cached per-service masks of
+    :meth:`Connections.active_trips`.
+    """
+    wanted = _trip_mask(trip_ids, data.trip_layout)
+
+    def departures_on(
+        day: date, after_seconds: int
+    ) -> list[tuple[int, str, str | None, Any]]:
+        service_ids = get_active_service_ids(day, data)
+        if not service_ids:
+            return []
+        active = wanted & data.connections.active_trips(service_ids)
+        return _departure_rows(stop_ids, active, after_seconds, data, limit)
+
+    upcoming = roll_service_days(when, departures_on, limit)
+    return label_departures(upcoming, _trip_labels((c[3] for c in upcoming), data))
+
+
+def _trip_mask(trip_ids: Iterable[Any], layout: TripLayout) -> np.ndarray:
+    """Boolean mask over trip indexes of ``trip_ids``."""
+    wanted = np.zeros(len(layout.trip_ids), dtype=bool)
+    wanted[
+        [t for t in map(layout.trip_index.get, map(str, trip_ids)) if t is not None]
+    ] = True
+    return wanted
+
+
+def _departure_rows(
+    stop_ids: list[str],
+    wanted: np.ndarray,
+    after_seconds: int,
+    data: GTFSData,
+    limit: int,
+) -> list[tuple[int, str, str | None, Any]]:
+    """The first ``limit`` departure rows (see merge_frequency_departures) of
+    the trips in the ``wanted`` mask."""
+    layout = data.trip_layout
+    rows = data.departures.rows_after(stop_ids, after_seconds)
+    rows = rows[wanted[layout.trips[rows]]]
+    rows = rows[np.argsort(layout.departures[rows], kind="stable")[:limit]]
+
+    scheduled_rows: list[tuple[int, str, str | None, Any]] = [
+        (dep, seconds_to_time(dep), None, layout.trip_ids[t])
+        for dep, t in np.column_stack(
+            (layout.departures[rows], layout.trips[rows])
+        ).tolist()
+    ]
+
+    templates = [
+        template
+        for trip_id, template in data.frequency_templates.items()
+        if wanted[layout.trip_index[str(trip_id)]]
+    ]
+    return merge_frequency_departures(
+        scheduled_rows, templates, stop_ids, after_seconds, limit
+    )
+
+
+def find_arrivals(
+    origin_stop_ids: list[str],
+    destination_stop_ids: list[str],
+    trip_ids: Iterable[Any],
+    before_seconds: int,
+    data: GTFSData,
+    limit: int = 5,
+) -> list[Departure]:
+    """Find the latest trips from any of ``origin_stop_ids`` reaching any of
+    ``destination_stop_ids`` by ``before_seconds``, on the given trips.
+
+    The reverse of :func:`find_departures`: arrivals at the destination are
+    read latest first from :attr:`GTFSData.arrivals` and each is traced back
+    to its trip's last call at the origin. Results come in time order.
+    """
+    trip_ids = set(trip_ids)
+    layout = data.trip_layout
+
+    wanted = np.zeros(len(layout.trip_ids), dtype=bool)
+    wanted[
+        [t for t in map(layout.trip_index.get, map(str, trip_ids)) if t is not None]
+    ] = True
+    rows = data.arrivals.rows_before(destination_stop_ids, before_seconds)
+    rows = rows[wanted[layout.trips[rows]]]
+    arrivals = np.where(
+        layout.arrivals[rows] < 0, layout.departures[rows], layout.arrivals[rows]
+    )
+    order = np.argsort(-arrivals, kind="stable")
+    rows, arrivals = rows[order], arrivals[order]
+
+    # Keep the latest arrivals whose trip called at the origin before
+    origin_stops = [
+        layout.stop_index[s] for s in origin_stop_ids if s in layout.stop_index
+    ]
+    scheduled_rows: list[tuple[int, str, str, Any]] = []
+    arrivals = arrivals.tolist()
+    for i, row in enumerate(rows.tolist()):
+        if len(scheduled_rows) == limit:
+            break
+        first_call = int(layout.offsets[layout.trips[row]])
+        earlier = slice(first_call, row)
+        matches = np.flatnonzero(
+            np.isin(layout.stops[earlier], origin_stops)
+            & (layout.departures[earlier] >= 0)
+        )
+        if not len(matches):
+            continue
+        dep = int(layout.departures[first_call + int(matches[-1])])
+        scheduled_rows.append(
+            (
+                arrivals[i],
+                seconds_to_time(dep),
+                seconds_to_time(arrivals[i]),
+                layout.trip_ids[layout.trips[row]],
+            )
+        )
+
+    templates = [
+        template
+        for trip_id, template in data.frequency_templates.items()
+        if trip_id in trip_ids
+    ]
+    latest = merge_frequency_arrivals(
+        scheduled_rows,
+        templates,
+        origin_stop_ids,
+        destination_stop_ids,
+        before_seconds,
+        limit,
+    )
+    return label_departures(latest, _trip_labels((c[3] for c in latest), data))
+
+
 def find_next_trains(
     origin_station_id: str,
     destination_station_id: str,
@@ -283,11 +2145,11 @@ def find_next_trains(
     target_date: date,
     data: GTFSData,
     limit: int = 5,
-) -> list[tuple[str, str, str, str]]:
+) -> list[Departure]:
     """Find the next trains from origin to destination."""
 
     trips_df = data.trips
-    stop_times_df = data.stop_times
+    layout = data.trip_layout
 
     # Get active service IDs for the target date
     service_ids = get_active_service_ids(target_date, data)
@@ -307,56 +2169,54 @@ def find_next_trains(
     if not origin_platforms or not dest_platforms:
         return []
 
-    # Get stop times for origin platforms
-    origin_times = stop_times_df[stop_times_df["stop_id"].isin(origin_platforms)].copy()
-
-    # Get stop times for destination platforms
-    dest_times = stop_times_df[stop_times_df["stop_id"].isin(dest_platforms)].copy()
+    # Departures from the origin after the requested time, from the stop index,
+    # on trips that are active today
+    rows = data.departures.rows_after(origin_platforms, after_seconds)
+    rows = rows[data.connections.active_trips(service_ids)[layout.trips[rows]]]
+    rows = rows[np.argsort(layout.departures[rows], kind="stable")]
 
-    # Join on trip_id to get trips that serve both stations
-    combined = origin_times.merge(
-        dest_times, on="trip_id", suffixes=("_origin", "_dest")
-    )
-
-    # Only keep trips where destination comes after origin (higher stop_sequence)
-    combined = combined[
-        combined["stop_sequence_dest"] > combined["stop_sequence_origin"]
+    # Keep the first departures whose trip later calls at the destination
+    dest_stops = [
+        layout.stop_index[s] for s in dest_platforms if s in layout.stop_index
     ]
-
-    # Only keep trips that are active today
-    combined = combined[combined["trip_id"].isin(active_trips["trip_id"])]
-
-    if combined.empty:
-        return []
-
-    # Convert departure times to seconds
-    combined["dep_seconds"] = combined["departure_time_origin"].apply(time_to_seconds)
-    combined = combined.dropna(subset=["dep_seconds"])
-
-    # Filter to departures after the specified time
-    upcoming = combined[combined["dep_seconds"] >= after_seconds]
-
-    if upcoming.empty:
-        return []
-
-    # Sort by departure time and limit results
-    upcoming = upcoming.sort_values("dep_seconds").head(limit)
-
-    # Join with trips to get trip information
-    upcoming = upcoming.merge(
-        active_trips[["trip_id", "trip_headsign", "trip_short_name"]], on="trip_id"
+    scheduled_rows: list[tuple[int, str, str | None, Any]] = []
+    for row in rows.tolist():
+        if len(scheduled_rows) == limit:
+            break
+        t = int(layout.trips[row])
+        later = layout.stops[row + 1 : int(layout.offsets[t + 1])]
+        matches = np.flatnonzero(np.isin(later, dest_stops))
+        if not len(matches):
+            continue
+        q = row + 1 + int(matches[0])
+        arrival = int(layout.arrivals[q])
+        if arrival < 0:
+            arrival = int(layout.departures[q])
+        dep = int(layout.departures[row])
+        scheduled_rows.append(
+            (
+                dep,
+                seconds_to_time(dep),
+                seconds_to_time(arrival) if arrival >= 0 else None,
+                layout.trip_ids[t],
+            )
+        )
+
+    active_ids = set(active_trips["trip_id"])
+    templates = [
+        template
+        for trip_id, template in data.frequency_templates.items()
+        if trip_id in active_ids
+    ]
+    upcoming = merge_frequency_departures(
+        scheduled_rows,
+        templates,
+        origin_platforms,
+        after_seconds,
+        limit,
+        dest_platforms,
     )
-
-    results = []
-    for _, row in upcoming.iterrows():
-        dep_time = row["departure_time_origin"]
-        arr_time = row["arrival_time_dest"]
-        train_name = row["trip_short_name"] or row["trip_id"]
-        headsign = row["trip_headsign"] or ""
-
-        results.append((dep_time, arr_time, train_name, headsign))
-
-    return results
+    return label_departures(upcoming, _trip_labels((c[3] for c in upcoming), data))
 
 
 def list_all_stations(data: GTFSData) -> list[str]:
@@ -0,0 +1,145 @@
+"""Conditional and compressed HTTP responses for feed-static payloads.
+
+Station and route listings only change when the GTFS feed does. A
+:class:`StaticPayload` holds such a response body together with its gzip
+(and, when the ``brotli`` package is installed, brotli) encodings, computed
+once per feed version. Responses carry an ``ETag`` and ``Last-Modified``
+derived from the feed, so polling clients revalidate with
+``If-None-Match`` / ``If-Modified-Since`` and get an empty ``304`` until
+the feed changes.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import time
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are sent as they are; compressing them isn't worth it
+MIN_COMPRESS_BYTES = 1024
+
+
+def feed_last_modified(gtfs_folder: Path) -> float:
+    """Modification time of the newest file in the feed folder."""
+    try:
+        return max(path.stat().st_mtime for path in gtfs_folder.glob("*.txt"))
+    except (OSError, ValueError):
+        return time.time()
+
+
+def negotiate_encoding(accept_encoding: str, available: Iterable[str]) -> str | None:
+    """Pick the preferred encoding in ``available`` that the client accepts."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    wildcard = accepted.get("*", 0.0)
+    # Brotli first: it is smaller at similar decoding cost
+    for coding in sorted(available, key=("br", "gzip").index):
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+@dataclass(frozen=True)
+class StaticPayload:
+    """A response body and its precomputed encodings for one feed version."""
+
+    feed_version: str | None
+    body: bytes
+    etag: str
+    last_modified: float
+    media_type: str = "application/json"
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def build(
+        cls,
+        body: bytes,
+        feed_version: str | None,
+        last_modified: float,
+        media_type: str = "application/json",
+    ) -> StaticPayload:
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        # Weak, so the same tag covers every encoding of the body
+        etag = f'W/"{(feed_version or "none")[:16]}-{digest}"'
+        encoded = {}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                encoded["br"] = brotli.compress(body)
+        return cls(feed_version, body, etag, last_modified, media_type, encoded)
+
+    def not_modified(self, headers: Mapping[str, str]) -> bool:
+        """Whether the request's validators match this payload."""
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+    def response(self, headers: Mapping[str, str]) -> Response:
+        """A 304 when the client is up to date, else the best encoding."""
+        response_headers = {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self.not_modified(headers):
+            return Response(status_code=304, headers=response_headers)
+
+        coding = negotiate_encoding(headers.get("accept-encoding", ""), self.encoded)
+        if coding is None:
+            return Response(
+                self.body, headers=response_headers, media_type=self.media_type
+            )
+        response_headers["Content-Encoding"] = coding
+        return Response(
+            self.encoded[coding], headers=response_headers, media_type=self.media_type
+        )
+
+
+class StaticPayloads:
+    """Named :class:`StaticPayload` objects, rebuilt when the feed changes."""
+
+    def __init__(self, last_modified: Callable[[], float] = time.time) -> None:
+        self.last_modified = last_modified
+        self._payloads: dict[str, StaticPayload] = {}
+
+    def lookup(self, name: str, feed_version: str | None) -> StaticPayload | None:
+        """The stored payload ``name``, unless it belongs to another feed."""
+        payload = self._payloads.get(name)
+        if payload is not None and payload.feed_version == feed_version:
+            return payload
+        return None
+
+    def store(self, name: str, feed_version: str | None, body: bytes) -> StaticPayload:
+        """Encode ``body`` and keep it as payload ``name`` for ``feed_version``."""
+        payload = StaticPayload.build(body, feed_version, self.last_modified())
+        self._payloads[name] = payload
+        return payload
@@ -0,0 +1,256 @@
+"""Memory accounting for loaded GTFS data.
+
+:func:`memory_report` measures the deep size of every :class:`GTFSData`
+table, of the columns derived at load time and of every derived index, along
+with how long each index took to build. Arrays backed by a memory-mapped
+timetable are counted separately: their pages live in the shared page cache
+rather than in any one worker.
+
+Run it against a feed folder with ``dart-mcp memory [FOLDER]``, or ask a
+running server for ``/debug/memory``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import mmap
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from . import gtfs
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:
+    np = None  # type: ignore[assignment]
+    pd = None  # type: ignore[assignment]
+
+# Columns added to the feed tables at load time, as (table, column)
+DERIVED_COLUMNS = (
+    ("stations", "normalized_name"),
+    ("all_stops", "parent_station_str"),
+)
+# GTFSData fields holding lookup structures rather than feed tables
+LOOKUP_FIELDS = ("station_to_platform_stops",)
+
+
+def process_rss() -> int | None:
+    """Resident set size of this process in bytes, if the OS reports it."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS, in kilobytes on Linux but bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _is_mapped(array: np.ndarray) -> bool:
+    """Whether ``array`` views a memory-mapped file."""
+    base: Any = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+class _Sizer:
+    """Deep size of objects, counting shared objects once.
+
+    Memory-mapped arrays are added to :attr:`mapped` instead of the size.
+    """
+
+    def __init__(self) -> None:
+        self.seen: set[int] = set()
+        self.mapped = 0
+
+    def size(self, obj: Any) -> int:
+        if id(obj) in self.seen:
+            return 0
+        self.seen.add(id(obj))
+
+        if pd is not None and isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+            if isinstance(obj, pd.DataFrame):
+                return int(obj.memory_usage(deep=True).sum())
+            return int(obj.memory_usage(deep=True))
+        if np is not None and isinstance(obj, np.ndarray):
+            if _is_mapped(obj):
+                self.mapped += obj.nbytes
+                return 0
+            return obj.nbytes
+
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(self.size(k) + self.size(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sum(self.size(item) for item in obj)
+        elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            total += sum(
+                self.size(getattr(obj, f.name)) for f in dataclasses.fields(obj)
+            )
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            total += self.size(vars(obj))
+        return total
+
+
+@dataclass(frozen=True)
+class MemoryReport:
+    """Deep sizes in bytes of the parts of a :class:`GTFSData`."""
+
+    feed_version: str | None
+    tables: dict[str, int]
+    derived_columns: dict[str, int]
+    indexes: dict[str, int]
+    mapped: dict[str, int]
+    build_seconds: dict[str, float]
+    rss_before: int | None = None
+    rss_after: int | None = None
+    load_seconds: float | None = None
+    # Tables not loaded and indexes not built yet
+    unbuilt: list[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        """Bytes held by the process itself, derived columns included in
+        their tables and mapped timetable arrays excluded."""
+        return sum(self.tables.values()) + sum(self.indexes.values())
+
+    def as_dict(self) -> dict[str, Any]:
+        report = dataclasses.asdict(self)
+        report["total"] = self.total
+        return report
+
+    def summary(self) -> str:
+        def mb(size: int | None) -> str:
+            return "?" if size is None else f"{size / 2**20:.1f} MB"
+
+        lines = [f"GTFS data in memory: {mb(self.total)}"]
+        if self.rss_after is not None:
+            rss = f"  process RSS: {mb(self.rss_before)} before load, "
+            lines.append(rss + f"{mb(self.rss_after)} after")
+        if self.load_seconds is not None:
+            lines.append(f"  load time: {self.load_seconds:.2f}s")
+        lines.append("  tables:")
+        for name, size in sorted(self.tables.items(), key=lambda t: -t[1]):
+            lines.append(f"    {name:<32}{mb(size):>10}")
+        lines.append("  derived columns (included in their tables):")
+        for name, size in self.derived_columns.items():
+            lines.append(f"    {name:<32}{mb(size):>10}")
+        lines.append("  indexes:")
+        for name, size in sorted(self.indexes.items(), key=lambda t: -t[1]):
+            seconds = self.build_seconds.get(name)
+            built = "" if seconds is None else f"  built in {seconds:.3f}s"
+            mapped = self.mapped.get(name)
+            shared = f"  (+{mb(mapped)} mapped)" if mapped else ""
+            lines.append(f"    {name:<32}{mb(size):>10}{built}{shared}")
+        if self.unbuilt:
+            lines.append(f"  not loaded yet: {', '.join(self.unbuilt)}")
+        return "\n".join(lines)
+
+
+def index_names() -> list[str]:
+    """Names of the derived indexes of :class:`GTFSData`."""
+    return [
+        name
+        for name, value in vars(gtfs.GTFSData).items()
+        if isinstance(value, gtfs.timed_cached_property)
+    ]
+
+
+def memory_report(
+    data: gtfs.GTFSData,
+    rss_before: int | None = None,
+    load_seconds: float | None = None,
+) -> MemoryReport:
+    """Measure ``data`` without loading any table or building any index that
+    isn't there yet."""
+    sizer = _Sizer()
+    tables = {}
+    unbuilt = []
+    for f in dataclasses.fields(data):
+        if f.name not in data.__dict__:
+            # A table of a LazyGTFSData nothing has asked for yet
+            unbuilt.append(f.name)
+        elif isinstance(data.__dict__[f.name], pd.DataFrame):
+            tables[f.name] = sizer.size(data.__dict__[f.name])
+
+    derived_columns = {}
+    for table, column in DERIVED_COLUMNS:
+        frame = data.__dict__.get(table)
+        if frame is not None and column in frame.columns:
+            usage = frame[column].memory_usage(deep=True, index=False)
+            derived_columns[f"{table}.{column}"] = int(usage)
+
+    indexes = {
+        name: sizer.size(data.__dict__[name])
+        for name in LOOKUP_FIELDS
+        if name in data.__dict__
+    }
+    mapped = {}
+    for name in index_names():
+        if name not in data.__dict__:
+            unbuilt.append(name)
+            continue
+        mapped_before = sizer.mapped
+        indexes[name] = sizer.size(data.__dict__[name])
+        if sizer.mapped > mapped_before:
+            mapped[name] = sizer.mapped - mapped_before
+
+    return MemoryReport(
+        feed_version=data.feed_version,
+        tables=tables,
+        derived_columns=derived_columns,
+        indexes=indexes,
+        mapped=mapped,
+        build_seconds={k: round(v, 6) for k, v in data.build_seconds.items()},
+        rss_before=rss_before,
+        rss_after=process_rss(),
+        load_seconds=load_seconds,
+        unbuilt=unbuilt,
+    )
+
+
+def load_and_report(
+    gtfs_folder: Path | None = None, timetable_dir: str | Path | None = None
+) -> MemoryReport:
+    """Load a feed the way the server does and report on the result."""
+    rss_before = process_rss()
+    started = time.perf_counter()
+    data = gtfs.load_gtfs_data(gtfs_folder, timetable_dir=timetable_dir)
+    load_seconds = time.perf_counter() - started
+    return memory_report(data, rss_before=rss_before, load_seconds=load_seconds)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """``dart-mcp memory``: print a memory report for a feed folder."""
+    parser = argparse.ArgumentParser(
+        prog="dart-mcp memory",
+        description="Load a GTFS feed and report the memory of each table and index.",
+    )
+    parser.add_argument(
+        "folder", nargs="?", type=Path, help="GTFS feed folder (default: bundled)"
+    )
+    parser.add_argument(
+        "--timetable-dir", help="Load through a memory-mapped timetable in this folder"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = load_and_report(args.folder, timetable_dir=args.timetable_dir)
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(report.summary())
@@ -3,61 +3,194 @@
 from __future__ import annotations
 
 import asyncio
+import json
+import os
+from collections.abc import Awaitable, Callable, Iterator
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from . import __version__
+from .admission import AdmissionControl, render_metrics
+from .engine import Engine
+from .memory import memory_report, process_rss
+from .routing import travel_minutes
+from .storage import StorageBackend
+
 try:
-    from .server import next_trains, list_stations, list_routes
+    from .serialization import dumps
+    from .server import (
+        first_bus,
+        last_bus,
+        next_trains,
+        list_stations,
+        list_routes,
+        segment_times,
+        service_frequency,
+        travel_time_rows,
+    )
 except ImportError as e:
     print(f"Warning: Could not import server functions: {e}")
+    # The exception itself is gone once the except block ends
+    _SERVER_UNAVAILABLE = f"Server functions not available - {e}"
+
     # Fallback functions for when server import fails
-    async def next_trains(origin: str, destination: str, when_iso: str = None) -> str:
-        return f"Error: Server functions not available - {e}"
+    async def next_trains(
+        origin: str,
+        destination: str,
+        when_iso: str | None = None,
+        output_format: str = "text",
+        arrive_by: bool = False,
+        backend: Any = None,
+    ) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
     
-    async def list_stations() -> str:
-        return f"Error: Server functions not available - {e}"
+    async def list_stations(backend: Any = None) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
     
-    async def list_routes() -> str:
-        return f"Error: Server functions not available - {e}"
-
-app = FastAPI(
-    title="DART MCP Server",
-    description="Model Context Protocol server for DART (Dallas Area Rapid Transit) schedules",
-    version="0.1.0"
-)
-
-@app.on_event("startup")
-async def startup_event():
-    """Startup event handler."""
-    print("🚀 DART MCP Remote Server starting up...")
-    try:
-        # Test if we can import and use the server functions
-        from . import gtfs
-        data = gtfs.get_default_data()
-        print(f"✅ GTFS data loaded successfully: {len(data.stops)} stops, {len(data.trips)} trips")
-        print("✅ Server functions imported successfully")
-    except Exception as e:
-        print(f"⚠️  Warning during startup: {e}")
-    print("🌐 FastAPI app initialized")
+    async def list_routes(backend: Any = None) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
+
+    def travel_time_rows(
+        origins: list[str],
+        destinations: list[str],
+        depart_at: str | None = None,
+        max_minutes: int = 180,
+        max_transfers: int = 2,
+        backend: StorageBackend | None = None,
+    ) -> Iterator[tuple[str, list[int | None]]]:
+        raise RuntimeError(_SERVER_UNAVAILABLE)
+
+    async def service_frequency(*args: Any, **kwargs: Any) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
+
+    async def segment_times(*args: Any, **kwargs: Any) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
+
+    async def first_bus(*args: Any, **kwargs: Any) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
+
+    async def last_bus(*args: Any, **kwargs: Any) -> str:
+        return f"Error: {_SERVER_UNAVAILABLE}"
+
+# Endpoints that never touch the feed and so never wait for warmup
+WARMUP_EXEMPT_PATHS = {"/", "/health", "/ready", "/metrics", "/test", "/mcp/tools"}
+# Admission pool of each tool endpoint; /metrics reports their state
+ADMISSION_ROUTES = {
+    "/mcp/stations": "lookup",
+    "/mcp/routes": "lookup",
+    "/mcp/next_trains": "departures",
+    "/mcp/travel_time_matrix": "routing",
+    "/mcp/service_frequency": "departures",
+    "/mcp/segment_times": "lookup",
+    "/mcp/first_bus": "lookup",
+    "/mcp/last_bus": "lookup",
+}
+
+router = APIRouter()
+
+
+def get_engine(request: Request) -> Engine:
+    """The engine of the app serving ``request``."""
+    engine: Engine = request.app.state.engine
+    return engine
+
+
+async def wait_for_warmup(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Hold requests that need the feed until warmup has finished, for at
+    most the engine's ``warmup_wait`` seconds."""
+    engine = get_engine(request)
+    if request.url.path in WARMUP_EXEMPT_PATHS or engine.warmup.finished:
+        return await call_next(request)
+    if not await engine.warmup.wait(engine.warmup_wait):
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "5"},
+            content={
+                "success": False,
+                "data": "",
+                "error": "Server is still loading GTFS data, please retry shortly",
+            },
+        )
+    return await call_next(request)
+
+
+async def _static_response(
+    request: Request,
+    engine: Engine,
+    name: str,
+    render: Callable[[], Awaitable[Any]],
+    version: str | None = None,
+) -> Response:
+    """Serve the stored payload ``name``, storing ``await render()`` first if
+    its ``version`` (default: the engine's feed version) changed since. Error
+    results are sent but never stored."""
+    if version is None:
+        version = engine.feed_version
+    payload = engine.payloads.lookup(name, version)
+    if payload is None:
+        content = await render()
+        if content.get("error") or str(content.get("data", "")).startswith("Error:"):
+            return JSONResponse(content)
+        payload = engine.payloads.store(name, version, dumps(content))
+    return payload.response(request.headers)
 
 
 class NextTrainsRequest(BaseModel):
     origin: str
     destination: str
     when_iso: Optional[str] = None
+    format: Optional[str] = "text"
+    arrive_by: bool = False
+
+
+class ServiceSpanRequest(BaseModel):
+    origin: str
+    destination: str
+    when_iso: Optional[str] = None
+    format: Optional[str] = "text"
+
+
+class TravelTimeMatrixRequest(BaseModel):
+    origins: List[str]
+    destinations: List[str]
+    depart_at: Optional[str] = None
+    max_minutes: int = 180
+    max_transfers: int = 2
+
+
+class ServiceFrequencyRequest(BaseModel):
+    day: str
+    route: Optional[str] = None
+    stop: Optional[str] = None
+    format: Optional[str] = "text"
+
+
+class SegmentTimesRequest(BaseModel):
+    route: str
+    direction: Optional[int] = None
+    hour_band: Optional[str] = None
+    format: Optional[str] = "text"
 
 
 class MCPResponse(BaseModel):
     success: bool
     data: str
     error: Optional[str] = None
+    structured: Optional[Any] = None
 
 
-@app.get("/")
-async def root():
+@router.get("/")
+async def root() -> dict[str, Any]:
     """Root endpoint with server information."""
     return {
         "name": "DART MCP Server",
@@ -66,43 +199,109 @@ async def root():
         "tools": [
             "next_trains",
             "list_stations", 
-            "list_routes"
+            "list_routes",
+            "travel_time_matrix",
+            "service_frequency",
+            "segment_times",
+            "first_bus",
+            "last_bus"
         ],
         "endpoints": {
             "next_trains": "POST /mcp/next_trains",
             "list_stations": "GET /mcp/stations",
-            "list_routes": "GET /mcp/routes"
+            "list_routes": "GET /mcp/routes",
+            "travel_time_matrix": "POST /mcp/travel_time_matrix",
+            "service_frequency": "POST /mcp/service_frequency",
+            "segment_times": "POST /mcp/segment_times",
+            "first_bus": "POST /mcp/first_bus",
+            "last_bus": "POST /mcp/last_bus"
         }
     }
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint."""
+@router.get("/health")
+async def health_check() -> dict[str, str]:
+    """Liveness check: answers as long as the process is up, loaded or not."""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
-@app.get("/test")
-async def test_endpoint():
+
+@router.get("/ready")
+async def readiness_check(engine: Engine = Depends(get_engine)) -> JSONResponse:
+    """Readiness check: 503 until the GTFS data and indexes are loaded."""
+    warmup = engine.warmup
+    return JSONResponse(
+        status_code=200 if warmup.ready else 503, content=warmup.status()
+    )
+
+@router.get("/metrics")
+async def metrics(engine: Engine = Depends(get_engine)) -> Response:
+    """Admission queue depths and shed counts in the Prometheus text format."""
+    return Response(
+        content=render_metrics(engine.pools),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@router.get("/debug/memory")
+def debug_memory(engine: Engine = Depends(get_engine)) -> dict[str, Any]:
+    """Deep size of every GTFS table and index, index build times and the
+    process RSS before and after warmup."""
+    data = getattr(engine.backend, "data", None)
+    if data is None:
+        # Tables live in the database file rather than in memory
+        return {"engine": engine.backend.name, "rss_after": process_rss()}
+    report = memory_report(
+        data,
+        rss_before=engine.warmup.details.get("rss_before"),
+        load_seconds=engine.warmup.seconds,
+    )
+    return {"engine": engine.backend.name, **report.as_dict()}
+
+
+@router.get("/test")
+async def test_endpoint() -> dict[str, str]:
     """Simple test endpoint."""
     return {"message": "DART MCP Server is running!", "status": "ok"}
 
 
-@app.post("/mcp/next_trains", response_model=MCPResponse)
-async def mcp_next_trains(request: NextTrainsRequest):
+@router.post("/mcp/next_trains", response_model=MCPResponse)
+async def mcp_next_trains(
+    request: NextTrainsRequest, engine: Engine = Depends(get_engine)
+) -> MCPResponse | Response:
     """
     Get next DART bus departures.
     
     Args:
-        request: NextTrainsRequest with origin, destination, and optional when_iso
+        request: NextTrainsRequest with origin, destination, optional when_iso,
+            format ('text' or 'json') and arrive_by (when_iso is the time to
+            arrive at the destination stop by)
         
     Returns:
-        MCPResponse with bus schedule information
+        MCPResponse with bus schedule information; with format 'json' the
+        departures are in ``structured`` and ``data`` is left empty
     """
     try:
+        if request.format == "json":
+            result = await next_trains(
+                request.origin,
+                request.destination,
+                request.when_iso,
+                output_format="json",
+                arrive_by=request.arrive_by,
+                backend=engine.backend,
+            )
+            if result.get("message"):
+                return MCPResponse(success=False, data="", error=result["message"])
+            # Encode directly: no text rendering and no response-model pass
+            body = {"success": True, "data": "", "error": None, "structured": result}
+            return Response(content=dumps(body), media_type="application/json")
+
         result = await next_trains(
             request.origin, 
             request.destination, 
-            request.when_iso
+            request.when_iso,
+            arrive_by=request.arrive_by,
+            backend=engine.backend,
         )
         return MCPResponse(success=True, data=result)
     except Exception as e:
@@ -113,52 +312,275 @@ async def mcp_next_trains(request: NextTrainsRequest):
         )
 
 
-@app.get("/mcp/stations", response_model=MCPResponse)
-async def mcp_list_stations():
+async def _service_span_response(
+    tool: Callable[..., Awaitable[Any]], request: ServiceSpanRequest, engine: Engine
+) -> MCPResponse | Response:
+    """Run first_bus() or last_bus() on the engine's backend for an endpoint."""
+    try:
+        if request.format == "json":
+            result = await tool(
+                request.origin,
+                request.destination,
+                request.when_iso,
+                output_format="json",
+                backend=engine.backend,
+            )
+            if result.get("message"):
+                return MCPResponse(success=False, data="", error=result["message"])
+            body = {"success": True, "data": "", "error": None, "structured": result}
+            return Response(content=dumps(body), media_type="application/json")
+
+        result = await tool(
+            request.origin,
+            request.destination,
+            request.when_iso,
+            backend=engine.backend,
+        )
+        if result.startswith("Error:"):
+            return MCPResponse(success=False, data="", error=result)
+        return MCPResponse(success=True, data=result)
+    except Exception as e:
+        return MCPResponse(
+            success=False,
+            data="",
+            error=f"Error getting service span: {str(e)}"
+        )
+
+
+@router.post("/mcp/first_bus", response_model=MCPResponse)
+async def mcp_first_bus(
+    request: ServiceSpanRequest, engine: Engine = Depends(get_engine)
+) -> MCPResponse | Response:
+    """
+    Get the first DART bus of a day from an origin to a route or stop.
+
+    Args:
+        request: ServiceSpanRequest with origin, destination, optional
+            when_iso (a date or datetime) and format ('text' or 'json')
+
+    Returns:
+        MCPResponse with the first departure; with format 'json' it is in
+        ``structured`` and ``data`` is empty
+    """
+    return await _service_span_response(first_bus, request, engine)
+
+
+@router.post("/mcp/last_bus", response_model=MCPResponse)
+async def mcp_last_bus(
+    request: ServiceSpanRequest, engine: Engine = Depends(get_engine)
+) -> MCPResponse | Response:
+    """
+    Get the last DART bus of a day from an origin to a route or stop.
+
+    Args:
+        request: ServiceSpanRequest with origin, destination, optional
+            when_iso (a date or datetime) and format ('text' or 'json')
+
+    Returns:
+        MCPResponse with the last departure; with format 'json' it is in
+        ``structured`` and ``data`` is empty
+    """
+    return await _service_span_response(last_bus, request, engine)
+
+
+@router.get("/mcp/stations", response_model=MCPResponse)
+async def mcp_list_stations(
+    request: Request, engine: Engine = Depends(get_engine)
+) -> Response:
     """
     List all available DART bus stops.
     
     Returns:
-        MCPResponse with list of bus stops
+        MCPResponse with list of bus stops, with validators for conditional
+        requests and compressed when the client accepts it
+    """
+    async def render() -> Any:
+        try:
+            result = await list_stations(backend=engine.backend)
+            return jsonable_encoder(MCPResponse(success=True, data=result))
+        except Exception as e:
+            return jsonable_encoder(MCPResponse(
+                success=False, 
+                data="", 
+                error=f"Error listing stations: {str(e)}"
+            ))
+
+    return await _static_response(request, engine, "stations", render)
+
+
+@router.get("/mcp/routes", response_model=MCPResponse)
+async def mcp_list_routes(
+    request: Request, engine: Engine = Depends(get_engine)
+) -> Response:
+    """
+    List all available DART bus routes.
+    
+    Returns:
+        MCPResponse with list of bus routes, with validators for conditional
+        requests and compressed when the client accepts it
+    """
+    async def render() -> Any:
+        try:
+            result = await list_routes(backend=engine.backend)
+            return jsonable_encoder(MCPResponse(success=True, data=result))
+        except Exception as e:
+            return jsonable_encoder(MCPResponse(
+                success=False, 
+                data="", 
+                error=f"Error listing routes: {str(e)}"
+            ))
+
+    return await _static_response(request, engine, "routes", render)
+
+
+@router.post("/mcp/travel_time_matrix", response_model=None)
+async def mcp_travel_time_matrix(
+    request: TravelTimeMatrixRequest, engine: Engine = Depends(get_engine)
+) -> MCPResponse | StreamingResponse:
+    """
+    Stream an origin-destination travel-time matrix.
+    
+    Args:
+        request: TravelTimeMatrixRequest with origins, destinations and an
+            optional depart_at
+        
+    Returns:
+        Newline-delimited JSON, one ``{"origin", "travel_minutes"}`` object per
+        origin, sent as soon as that origin's sweep completes
     """
     try:
-        result = await list_stations()
+        rows = travel_time_rows(
+            request.origins,
+            request.destinations,
+            request.depart_at,
+            request.max_minutes,
+            request.max_transfers,
+            backend=engine.backend,
+        )
+    except Exception as e:
+        return MCPResponse(
+            success=False,
+            data="",
+            error=f"Error computing travel times: {str(e)}"
+        )
+
+    def stream_rows() -> Iterator[bytes]:
+        for origin, seconds in rows:
+            minutes = {
+                destination: travel_minutes(seconds[i])
+                for i, destination in enumerate(request.destinations)
+            }
+            yield dumps({"origin": origin, "travel_minutes": minutes}) + b"\n"
+
+    return StreamingResponse(stream_rows(), media_type="application/x-ndjson")
+
+
+@router.post("/mcp/service_frequency", response_model=MCPResponse)
+async def mcp_service_frequency(
+    request: ServiceFrequencyRequest, engine: Engine = Depends(get_engine)
+) -> MCPResponse | Response:
+    """
+    Summarize service frequency at a stop or on a route.
+
+    Args:
+        request: ServiceFrequencyRequest with a day (ISO date or day type),
+            a route and/or a stop, and format ('text' or 'json')
+
+    Returns:
+        MCPResponse with departures per hour, headways and span of service;
+        with format 'json' they are in ``structured`` and ``data`` is empty
+    """
+    try:
+        if request.format == "json":
+            result = await service_frequency(
+                request.day,
+                request.route,
+                request.stop,
+                output_format="json",
+                backend=engine.backend,
+            )
+            if result.get("message"):
+                return MCPResponse(success=False, data="", error=result["message"])
+            body = {"success": True, "data": "", "error": None, "structured": result}
+            return Response(content=dumps(body), media_type="application/json")
+
+        result = await service_frequency(
+            request.day, request.route, request.stop, backend=engine.backend
+        )
+        if result.startswith("Error:"):
+            return MCPResponse(success=False, data="", error=result)
         return MCPResponse(success=True, data=result)
     except Exception as e:
         return MCPResponse(
-            success=False, 
-            data="", 
-            error=f"Error listing stations: {str(e)}"
+            success=False,
+            data="",
+            error=f"Error computing service frequency: {str(e)}"
         )
 
 
-@app.get("/mcp/routes", response_model=MCPResponse)
-async def mcp_list_routes():
+@router.post("/mcp/segment_times", response_model=MCPResponse)
+async def mcp_segment_times(
+    request: SegmentTimesRequest, engine: Engine = Depends(get_engine)
+) -> MCPResponse | Response:
     """
-    List all available DART bus routes.
-    
+    Scheduled run times between consecutive stops of a route.
+
+    Args:
+        request: SegmentTimesRequest with a route, an optional direction and
+            hour band, and format ('text' or 'json')
+
     Returns:
-        MCPResponse with list of bus routes
+        MCPResponse with min / median / p90 run times per segment; with
+        format 'json' they are in ``structured`` and ``data`` is empty
     """
     try:
-        result = await list_routes()
+        if request.format == "json":
+            result = await segment_times(
+                request.route,
+                request.direction,
+                request.hour_band,
+                output_format="json",
+                backend=engine.backend,
+            )
+            if result.get("message"):
+                return MCPResponse(success=False, data="", error=result["message"])
+            body = {"success": True, "data": "", "error": None, "structured": result}
+            return Response(content=dumps(body), media_type="application/json")
+
+        result = await segment_times(
+            request.route,
+            request.direction,
+            request.hour_band,
+            backend=engine.backend,
+        )
+        if result.startswith("Error:"):
+            return MCPResponse(success=False, data="", error=result)
         return MCPResponse(success=True, data=result)
     except Exception as e:
         return MCPResponse(
-            success=False, 
-            data="", 
-            error=f"Error listing routes: {str(e)}"
+            success=False,
+            data="",
+            error=f"Error computing segment times: {str(e)}"
         )
 
 
-@app.get("/mcp/tools")
-async def mcp_tools():
+@router.get("/mcp/tools")
+async def mcp_tools(
+    request: Request, engine: Engine = Depends(get_engine)
+) -> Response:
     """
     List available MCP tools and their schemas.
     
     Returns:
         Dictionary of available tools with their schemas
     """
+    # The listing doesn't depend on the feed, so it never waits for the backend
+    return await _static_response(
+        request, engine, "tools", _tools_listing, version=f"app-{__version__}"
+    )
+
+
+async def _tools_listing() -> dict[str, Any]:
     return {
         "tools": [
             {
@@ -178,6 +600,17 @@ async def mcp_tools():
                         "when_iso": {
                             "type": "string",
                             "description": "Optional ISO-8601 datetime (default: now)"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["text", "json"],
+                            "default": "text",
+                            "description": "'json' returns structured departure records"
+                        },
+                        "arrive_by": {
+                            "type": "boolean",
+                            "default": False,
+                            "description": "Treat when_iso as the time to arrive at the destination stop by"
                         }
                     },
                     "required": ["origin", "destination"]
@@ -198,11 +631,195 @@ async def mcp_tools():
                     "type": "object",
                     "properties": {}
                 }
+            },
+            {
+                "name": "travel_time_matrix",
+                "description": "Travel times in minutes between every origin and destination stop",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "origins": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Origin stop names"
+                        },
+                        "destinations": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Destination stop names"
+                        },
+                        "depart_at": {
+                            "type": "string",
+                            "description": "Optional ISO-8601 datetime (default: now)"
+                        },
+                        "max_minutes": {"type": "integer", "default": 180},
+                        "max_transfers": {"type": "integer", "default": 2}
+                    },
+                    "required": ["origins", "destinations"]
+                }
+            },
+            {
+                "name": "service_frequency",
+                "description": "Departures per hour, headways and span of service at a stop or on a route",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "day": {
+                            "type": "string",
+                            "description": "ISO date, or 'weekday', 'saturday', 'sunday' or another day name"
+                        },
+                        "route": {
+                            "type": "string",
+                            "description": "Optional route number, name or destination"
+                        },
+                        "stop": {
+                            "type": "string",
+                            "description": "Optional stop name; give a route, a stop or both"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["text", "json"],
+                            "default": "text"
+                        }
+                    },
+                    "required": ["day"]
+                }
+            },
+            {
+                "name": "segment_times",
+                "description": "Scheduled min / median / p90 run times between consecutive stops of a route",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "route": {
+                            "type": "string",
+                            "description": "Route number, name or destination"
+                        },
+                        "direction": {
+                            "type": "integer",
+                            "description": "Optional direction_id (0 or 1)"
+                        },
+                        "hour_band": {
+                            "type": "string",
+                            "enum": ["early", "am_peak", "midday", "pm_peak", "evening"],
+                            "description": "Optional band of the day"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["text", "json"],
+                            "default": "text"
+                        }
+                    },
+                    "required": ["route"]
+                }
+            },
+            {
+                "name": "first_bus",
+                "description": "First DART bus of the day from origin to a route or stop",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "origin": {
+                            "type": "string",
+                            "description": "Origin stop name (e.g., 'DART')"
+                        },
+                        "destination": {
+                            "type": "string",
+                            "description": "Destination route or stop name"
+                        },
+                        "when_iso": {
+                            "type": "string",
+                            "description": "Optional ISO-8601 date or datetime (default: today)"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["text", "json"],
+                            "default": "text"
+                        }
+                    },
+                    "required": ["origin", "destination"]
+                }
+            },
+            {
+                "name": "last_bus",
+                "description": "Last DART bus of the day from origin to a route or stop",
+                "input_schema": {
+                    "type": "object",
+                    "properties": {
+                        "origin": {
+                            "type": "string",
+                            "description": "Origin stop name (e.g., 'DART')"
+                        },
+                        "destination": {
+                            "type": "string",
+                            "description": "Destination route or stop name"
+                        },
+                        "when_iso": {
+                            "type": "string",
+                            "description": "Optional ISO-8601 date or datetime (default: today)"
+                        },
+                        "format": {
+                            "type": "string",
+                            "enum": ["text", "json"],
+                            "default": "text"
+                        }
+                    },
+                    "required": ["origin", "destination"]
+                }
             }
         ]
     }
 
 
+def create_app(engine: Engine | None = None) -> FastAPI:
+    """Build the HTTP app around ``engine`` (a new :class:`Engine` by
+    default), which every handler receives through :func:`get_engine`."""
+    engine = engine or Engine()
+    app = FastAPI(
+        title="DART MCP Server",
+        description="Model Context Protocol server for DART (Dallas Area Rapid Transit) schedules",
+        version="0.1.0"
+    )
+    app.state.engine = engine
+
+    @app.on_event("startup")
+    async def startup_event() -> None:
+        """Startup event handler."""
+        print("🚀 DART MCP Remote Server starting up...")
+        # Load in the background so liveness checks answer straight away
+        engine.start()
+        print("🌐 FastAPI app initialized")
+
+    app.middleware("http")(wait_for_warmup)
+    # Added last so it runs first: shed requests never wait for warmup
+    app.add_middleware(AdmissionControl, routes=ADMISSION_ROUTES, pools=engine.pools)
+    app.include_router(router)
+    return app
+
+
+app = create_app()
+
+
+def main() -> None:
+    """Run the HTTP server.
+
+    ``WEB_CONCURRENCY`` above 1 preloads the feed once and forks that many
+    workers, which are replaced without downtime when the feed changes (see
+    :mod:`dart_mcp.supervisor`). ``DART_MCP_FEED_POLL_SECONDS`` sets how often
+    the feed folder is checked.
+    """
+    from .supervisor import DEFAULT_POLL_SECONDS, serve
+
+    serve(
+        app,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", 8000)),
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        poll_seconds=float(
+            os.environ.get("DART_MCP_FEED_POLL_SECONDS", DEFAULT_POLL_SECONDS)
+        ),
+    )
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    main()
@@ -0,0 +1,300 @@
+"""Timetable routing (connection scan) over GTFS data for DART MCP."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+from .gtfs import (
+    GTFSData,
+    find_stops_by_name,
+    get_active_service_ids,
+    get_platform_stops_for_station,
+)
+
+INF = 2**31 - 1
+
+
+@dataclass(frozen=True)
+class Arrival:
+    """Earliest arrival at a stop found by a routing sweep."""
+
+    stop_id: str
+    arrival_seconds: int
+    transfers: int
+
+
+def expand_station_stops(stop_ids: list[str], data: GTFSData) -> list[str]:
+    """Add the platform stops of any stations in ``stop_ids``."""
+    expanded = dict.fromkeys(stop_ids)
+    for stop_id in stop_ids:
+        expanded.update(dict.fromkeys(get_platform_stops_for_station(stop_id, data)))
+    return list(expanded)
+
+
+def _window_connections(
+    data: GTFSData, service_ids: list[Any], start: int, end: int
+) -> list[list[int]]:
+    """Active connections departing in ``[start, end]``, sorted by departure.
+
+    Returns ``[departure, arrival, from_stop, to_stop, trip]`` rows. Scheduled
+    connections come from the precomputed index; headway-based trips are
+    expanded for this window only, each instance getting its own trip number
+    after the scheduled ones.
+    """
+    connections = data.connections
+    window = connections.window(start, end)
+    active = connections.active_trips(service_ids)[connections.trips[window]]
+    rows = np.column_stack(
+        (
+            connections.departures[window][active],
+            connections.arrivals[window][active],
+            connections.from_stops[window][active],
+            connections.to_stops[window][active],
+            connections.trips[window][active],
+        )
+    ).astype(np.int64)
+
+    templates = []
+    if data.frequency_templates:
+        trips = data.trips
+        active_ids = set(trips.loc[trips["service_id"].isin(service_ids), "trip_id"])
+        templates = [
+            template
+            for trip_id, template in data.frequency_templates.items()
+            if trip_id in active_ids
+        ]
+
+    extra = []
+    instance = len(connections.trip_ids)
+    for template in templates:
+        stops = [connections.stop_index.get(s, -1) for s in template.stop_ids]
+        # Start with the earliest instance still running when the window opens
+        lead = template.departure_offsets[-1]
+        for trip_start in template.start_times(0, start - lead):
+            if trip_start > end:
+                break
+            for p in range(len(stops) - 1):
+                dep = trip_start + template.departure_offsets[p]
+                if start <= dep <= end and stops[p] >= 0 and stops[p + 1] >= 0:
+                    arr = trip_start + template.arrival_offsets[p + 1]
+                    extra.append([dep, arr, stops[p], stops[p + 1], instance])
+            instance += 1
+
+    if extra:
+        rows = np.concatenate((rows, np.array(extra, dtype=np.int64)))
+        rows = rows[np.argsort(rows[:, 0], kind="stable")]
+
+    scan_rows: list[list[int]] = rows.tolist()
+    return scan_rows
+
+
+def _scan(
+    origins: list[int],
+    depart_seconds: int,
+    horizon: int,
+    rows: list[list[int]],
+    data: GTFSData,
+    max_rides: int,
+    targets: list[int] | None = None,
+) -> list[list[int]]:
+    """Run one connection scan and return the per-ride arrival labels.
+
+    ``best[k][s]`` is the earliest arrival at stop ``s`` using at most ``k``
+    rides. When ``targets`` is given the scan stops as soon as no remaining
+    connection can improve any of them.
+    """
+    footpaths = data.footpaths
+    n_stops = len(data.connections.stop_ids)
+    best = [[INF] * n_stops for _ in range(max_rides + 1)]
+    final = best[max_rides]
+
+    def walk_from(stop: int, arrival: int, rides: int) -> None:
+        if stop >= len(footpaths.stop_ids):
+            return
+        start, end = footpaths.offsets[stop], footpaths.offsets[stop + 1]
+        links = np.column_stack(
+            (footpaths.targets[start:end], footpaths.walk_seconds[start:end])
+        )
+        for target, walk in links.tolist():
+            reached = arrival + walk
+            for k in range(rides, max_rides + 1):
+                if reached >= best[k][target]:
+                    break
+                best[k][target] = reached
+
+    for origin in origins:
+        for k in range(max_rides + 1):
+            best[k][origin] = depart_seconds
+    for origin in origins:
+        walk_from(origin, depart_seconds, 0)
+
+    # Fewest rides with which each trip has been boarded so far
+    boarded: dict[int, int] = {}
+    for n, (dep, arr, u, v, trip) in enumerate(rows):
+        if targets and n % 256 == 0 and max(final[t] for t in targets) <= dep:
+            break
+        rides = boarded.get(trip, INF)
+        if rides > 1:
+            for k in range(min(rides - 1, max_rides)):
+                if best[k][u] <= dep:
+                    rides = k + 1
+                    boarded[trip] = rides
+                    break
+        if rides > max_rides or arr > horizon:
+            continue
+        if arr < best[rides][v]:
+            for k in range(rides, max_rides + 1):
+                if arr >= best[k][v]:
+                    break
+                best[k][v] = arr
+            walk_from(v, arr, rides)
+
+    return best
+
+
+def _stop_indexes(stop_ids: list[str], data: GTFSData) -> list[int]:
+    """Connection stop indexes of ``stop_ids`` and their station platforms."""
+    stop_index = data.connections.stop_index
+    return [
+        stop_index[stop_id]
+        for stop_id in expand_station_stops(stop_ids, data)
+        if stop_id in stop_index
+    ]
+
+
+def earliest_arrivals(
+    origin_stop_ids: list[str],
+    depart_seconds: int,
+    target_date: date,
+    data: GTFSData,
+    max_seconds: int = 3600,
+    max_transfers: int = 2,
+) -> list[Arrival]:
+    """Compute earliest arrivals at every reachable stop in one sweep.
+
+    Runs the connection scan algorithm over the connections departing
+    between ``depart_seconds`` and ``depart_seconds + max_seconds``, keeping
+    one arrival label per number of rides so ``max_transfers`` is honored
+    exactly. Walking transfers from :attr:`GTFSData.footpaths` are relaxed
+    whenever a stop is reached. Results are sorted by arrival time.
+    """
+    max_rides = max_transfers + 1
+    horizon = depart_seconds + max_seconds
+    service_ids = get_active_service_ids(target_date, data)
+    rows = (
+        _window_connections(data, service_ids, depart_seconds, horizon)
+        if service_ids
+        else []
+    )
+    best = _scan(
+        _stop_indexes(origin_stop_ids, data),
+        depart_seconds,
+        horizon,
+        rows,
+        data,
+        max_rides,
+    )
+
+    results = []
+    stop_ids = data.connections.stop_ids
+    for stop, arrival in enumerate(best[max_rides]):
+        if arrival > horizon:
+            continue
+        rides = next(k for k in range(max_rides + 1) if best[k][stop] == arrival)
+        results.append(
+            Arrival(
+                stop_id=stop_ids[stop],
+                arrival_seconds=arrival,
+                transfers=max(rides - 1, 0),
+            )
+        )
+    results.sort(key=lambda a: (a.arrival_seconds, a.stop_id))
+    return results
+
+
+def travel_minutes(seconds: int | None) -> int | None:
+    """A travel time in whole minutes, rounded up; ``None`` stays ``None``."""
+    return None if seconds is None else -(-seconds // 60)
+
+
+def resolve_places(names: list[str], data: GTFSData) -> list[tuple[str, list[str]]]:
+    """Resolve stop names to ``(name, stop_ids)`` pairs for routing."""
+    places = []
+    for name in names:
+        stops = find_stops_by_name(name, data)
+        if not stops:
+            raise ValueError(f"Stop not found: {name}")
+        places.append((name, [stop["stop_id"] for stop in stops]))
+    return places
+
+
+def travel_time_matrix(
+    origins: list[tuple[str, list[str]]],
+    destinations: list[tuple[str, list[str]]],
+    depart_seconds: int,
+    target_date: date,
+    data: GTFSData,
+    max_seconds: int = 3 * 3600,
+    max_transfers: int = 2,
+) -> Iterator[tuple[str, list[int | None]]]:
+    """Yield one ``(origin, travel_seconds)`` row per origin as it completes.
+
+    ``origins`` and ``destinations`` are ``(name, stop_ids)`` pairs, e.g. from
+    :func:`resolve_places`. The active connections of the window are
+    selected once and shared by every origin's sweep; each sweep stops early
+    once all destinations are settled. Travel times are ``None`` for
+    destinations not reachable within ``max_seconds``.
+    """
+    max_rides = max_transfers + 1
+    horizon = depart_seconds + max_seconds
+    service_ids = get_active_service_ids(target_date, data)
+    rows = (
+        _window_connections(data, service_ids, depart_seconds, horizon)
+        if service_ids
+        else []
+    )
+
+    # Flatten destination stops so each row is reduced with one numpy call
+    dest_stops: list[int] = []
+    dest_starts: list[int] = []
+    targets: list[int] = []
+    unknown = []
+    for _, stop_ids in destinations:
+        indexes = _stop_indexes(stop_ids, data)
+        unknown.append(not indexes)
+        dest_starts.append(len(dest_stops))
+        dest_stops.extend(indexes or [0])
+        targets.extend(indexes)
+
+    for name, stop_ids in origins:
+        best = _scan(
+            _stop_indexes(stop_ids, data),
+            depart_seconds,
+            horizon,
+            rows,
+            data,
+            max_rides,
+            targets=targets,
+        )
+        if not dest_stops:
+            yield name, []
+            continue
+        arrivals = np.minimum.reduceat(
+            np.asarray(best[max_rides], dtype=np.int64)[dest_stops], dest_starts
+        )
+        arrivals[unknown] = INF
+        yield (
+            name,
+            [
+                arrival - depart_seconds if arrival <= horizon else None
+                for arrival in arrivals.tolist()
+            ],
+        )
@@ -0,0 +1,24 @@
+"""Compact JSON encoding for structured tool output."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON.
+
+    Uses orjson when it is installed (``pip install dart-mcp[fast]``) and
+    falls back to the standard library otherwise. Named tuples such as
+    :class:`~dart_mcp.gtfs.Departure` should be converted with ``_asdict()``
+    first; both encoders would otherwise write them as plain arrays.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
@@ -2,11 +2,14 @@
 
 from __future__ import annotations
 
+import functools
+import inspect
 import os
 import sys
-from datetime import datetime
-
-import pandas as pd
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 try:
     from mcp.server.fastmcp import FastMCP
@@ -27,15 +30,194 @@ except ImportError:
             print("MCP server would run here, but MCP package not available")
             print("Available tools:", [tool.__name__ for tool in self.tools])
 
-from . import gtfs
+from . import cache, gtfs, storage
+
+if TYPE_CHECKING:
+    from . import analytics
 
 mcp = FastMCP("dart")
 
 
+@dataclass(frozen=True)
+class DepartureBoard:
+    """Structured result of a next_trains() lookup."""
+
+    origin: str
+    destination: str
+    when: datetime
+    departures: list[gtfs.Departure]
+    # Whether ``when`` is the time to arrive by rather than to leave after
+    arrive_by: bool = False
+
+    def as_dict(self) -> dict[str, Any]:
+        """Plain-JSON form used for structured tool output.
+
+        Departure and arrival times are on the clock of the board's ``date``:
+        times past "24:00:00" fall on a later day, so "32:00:00" is 08:00 the
+        next day.
+        """
+        board = {
+            "origin": self.origin,
+            "destination": self.destination,
+            "date": self.when.date().isoformat(),
+            "current_time": self.when.strftime("%H:%M:%S"),
+            "departures": [departure._asdict() for departure in self.departures],
+        }
+        if self.arrive_by:
+            del board["current_time"]
+            board["arrive_by"] = self.when.strftime("%H:%M:%S")
+        return board
+
+
+def _board_time(board: DepartureBoard, time_str: str) -> str:
+    """A time on the board's clock, naming the day when past midnight."""
+    seconds = gtfs.time_to_seconds(time_str)
+    if seconds is None or seconds < gtfs.SECONDS_PER_DAY:
+        return time_str
+    day = board.when.date() + timedelta(days=seconds // gtfs.SECONDS_PER_DAY)
+    time_of_day = gtfs.seconds_to_time(seconds % gtfs.SECONDS_PER_DAY)
+    return f"{day.strftime('%A')} {time_of_day}"
+
+
+def _format_departures(board: DepartureBoard) -> str:
+    """Render a departure board for humans."""
+    lines = []
+    for departure in board.departures:
+        line = (
+            f"• Bus {departure.train_name}:"
+            f" {_board_time(board, departure.departure_time)}"
+        )
+        if board.arrive_by and departure.arrival_time:
+            line += f" → {_board_time(board, departure.arrival_time)}"
+        if departure.headsign:
+            line += f" (to {departure.headsign})"
+        lines.append(line)
+
+    date_str = board.when.strftime("%A, %B %d, %Y")
+    current_time_str = board.when.strftime("%I:%M %p")
+    if board.arrive_by:
+        header = (
+            f"Latest DART buses from {board.origin} to {board.destination} "
+            f"arriving by {current_time_str} on {date_str}:\n\n"
+        )
+        return header + "\n".join(lines)
+    header = (
+        f"Next DART bus departures from {board.origin} to {board.destination} "
+        f"on {date_str}:\n(Current time: {current_time_str})\n\n"
+    )
+    return header + "\n".join(lines)
+
+
+def _parse_when(when_iso: str | None) -> datetime:
+    """Parse an optional ISO-8601 datetime as naive local time (default: now)."""
+    if not when_iso:
+        return datetime.now()
+    when_dt = datetime.fromisoformat(when_iso.replace("Z", "+00:00"))
+    # Convert to naive datetime assuming Central time
+    return when_dt.replace(tzinfo=None)
+
+
+def _backend(backend: storage.StorageBackend | None) -> storage.StorageBackend:
+    """``backend``, or the default storage backend when none is given."""
+    return storage.get_default_backend() if backend is None else backend
+
+
+def _feed_data(backend: storage.StorageBackend | None) -> gtfs.GTFSData:
+    """The in-memory feed of ``backend``, for tools that work on the full
+    timetable (routing and analytics)."""
+    backend = _backend(backend)
+    if not isinstance(backend, storage.PandasBackend):
+        raise ValueError(
+            f"This tool needs the in-memory storage engine, not {backend.name}"
+            " (set DART_MCP_STORAGE=pandas)"
+        )
+    return backend.data
+
+
+def _is_error(result: Any) -> bool:
+    if isinstance(result, dict):
+        result = result.get("message", "")
+    return isinstance(result, str) and result.startswith("Error:")
+
+
+def _cached_tool(
+    *time_params: str,
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Serve a tool from the persistent result cache when one is configured.
+
+    ``time_params`` name arguments that default to the current time. When
+    omitted, the cache key holds the current minute instead, so repeated
+    queries within a minute share one result; the query itself still runs at
+    the current time.
+
+    A keyword-only ``backend`` argument, the storage backend to answer from,
+    is left out of the key: results only depend on its feed version, which
+    the cache is tied to. It is also hidden from the tool's signature, since
+    callers that own a backend (the HTTP engine) pass it rather than MCP
+    clients.
+    """
+
+    def decorator(
+        func: Callable[..., Awaitable[Any]],
+    ) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                result_cache = cache.get_result_cache()
+            except Exception:
+                result_cache = None
+            if result_cache is None:
+                return await func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop("backend", None)
+            for name in time_params:
+                if not params[name]:
+                    minute = datetime.now().replace(second=0, microsecond=0)
+                    params[name] = minute.isoformat()
+
+            key = cache.make_key(func.__name__, params)
+            result = result_cache.get(key)
+            if result is None:
+                result = await func(*args, **kwargs)
+                if not _is_error(result):
+                    result_cache.put(key, result)
+            return result
+
+        wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[
+                param
+                for param in signature.parameters.values()
+                if param.name != "backend"
+            ]
+        )
+        return wrapper
+
+    return decorator
+
+
+def _route_sort_key(route: gtfs.RouteInfo) -> tuple[int, str]:
+    """Sort numbered routes numerically and named routes after them."""
+    if route.short_name.isdigit():
+        return (int(route.short_name), "")
+    return (10**6, route.display_name)
+
+
 @mcp.tool()
+@_cached_tool("when_iso")
 async def next_trains(
-    origin: str, destination: str, when_iso: str | None = None
-) -> str:
+    origin: str,
+    destination: str,
+    when_iso: str | None = None,
+    output_format: str = "text",
+    arrive_by: bool = False,
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str | dict[str, Any]:
     """Return the next few scheduled DART bus departures.
 
     Args:
@@ -46,219 +228,362 @@ async def next_trains(
                      If a route name is provided, shows buses to that route destination.
                      If a stop name is provided, finds routes that serve both origin and destination stops.
         when_iso: Optional ISO-8601 datetime (local time). Default: now.
+        output_format: 'text' (default) for a human-readable summary, or 'json'
+                       for structured departure records.
+        arrive_by: If true, destination is a stop, when_iso the time to arrive
+                   there by, and the latest departures still arriving in time
+                   are returned with their arrival times.
+
+    Departures roll over past midnight into the next days with service
+    until the board is full; their times continue the clock of the
+    requested date (tomorrow's 08:00 is 32:00:00 in JSON output).
 
     Note: The function first tries to find routes by name, then falls back to finding
     routes that serve both origin and destination stops.
     """
     try:
-        # Parse the target time
-        if when_iso:
-            try:
-                when_dt = datetime.fromisoformat(when_iso.replace("Z", "+00:00"))
-                # Convert to local time if needed
-                if when_dt.tzinfo is not None:
-                    # Convert to naive datetime assuming Central time
-                    when_dt = when_dt.replace(tzinfo=None)
-            except ValueError:
-                return (
-                    f"Invalid datetime format: {when_iso}. Please use ISO-8601 format."
-                )
-        else:
-            when_dt = datetime.now()
+        result = _next_departures(
+            origin, destination, when_iso, arrive_by, _backend(backend)
+        )
+    except Exception as e:
+        result = f"Error: {str(e)}"
+
+    if output_format == "json":
+        if isinstance(result, DepartureBoard):
+            return result.as_dict()
+        return {"message": result, "departures": []}
+    if isinstance(result, DepartureBoard):
+        return _format_departures(result)
+    return result
+
 
-        target_date = when_dt.date()
-        seconds_since_midnight = (
-            when_dt.hour * 3600 + when_dt.minute * 60 + when_dt.second
+def _no_service_message(target_date: date, backend: storage.StorageBackend) -> str:
+    """Explain why nothing runs on ``target_date``, calling out a stale feed."""
+    message = f"No service available on {target_date.strftime('%A, %B %d, %Y')}."
+    service_end = backend.service_end
+    if service_end is None:
+        return message + " The GTFS feed does not define any running service."
+    if target_date > service_end:
+        return message + (
+            f" The GTFS feed only covers service until"
+            f" {service_end.strftime('%B %d, %Y')}; it needs to be updated."
         )
+    return message
 
-        # Load GTFS data
-        data = gtfs.get_default_data()
-        
-        # Find origin stop(s)
-        origin_stops = gtfs.find_stops_by_name(origin, data)
-        if not origin_stops:
-            available_stations = gtfs.list_all_stations(data)
-            close_matches = [
-                s for s in available_stations
-                if origin.lower() in s.lower() or s.lower().startswith(origin.lower()[:3])
-            ]
-            error_msg = f"Origin stop '{origin}' not found."
-            if close_matches:
-                error_msg += f" Did you mean one of these? {', '.join(close_matches[:5])}"
-            else:
-                error_msg += " Use list_stations() to see all available stops."
-            return error_msg
-
-        # Get origin name for display
-        origin_name = origin_stops[0]["stop_name"] if origin_stops else origin
-        origin_stop_ids = [stop["stop_id"] for stop in origin_stops]
-
-        # Try to find routes by name first (original logic)
-        available_routes = data.trips["trip_headsign"].dropna().unique()
-        matching_routes = [
-            route for route in available_routes
-            if destination.lower() in route.lower()
-        ]
-        
-        if matching_routes:
-            # Use original route-based logic
-            route_trips = data.trips[data.trips["trip_headsign"].isin(matching_routes)]
-            
-            # Get active service IDs for the target date
-            service_ids = gtfs.get_active_service_ids(target_date, data)
-            if not service_ids:
-                return f"No service available on {target_date.strftime('%A, %B %d, %Y')}."
-
-            # Filter to active trips
-            active_trips = route_trips[route_trips["service_id"].isin(service_ids)]
-            if active_trips.empty:
-                return f"No active buses for route '{destination}' on {target_date.strftime('%A, %B %d, %Y')}."
-
-            # Get stop times for these trips from the origin
-            stop_times = data.stop_times[
-                (data.stop_times["trip_id"].isin(active_trips["trip_id"])) &
-                (data.stop_times["stop_id"].isin(origin_stop_ids))
-            ].copy()
-
-            if stop_times.empty:
-                return f"No departures found from {origin_name} for route '{destination}'."
-
-            # Convert departure times to seconds and filter
-            stop_times["dep_seconds"] = stop_times["departure_time"].apply(gtfs.time_to_seconds)
-            stop_times = stop_times.dropna(subset=["dep_seconds"])
-            
-            # Filter to departures after the specified time
-            upcoming = stop_times[stop_times["dep_seconds"] >= seconds_since_midnight]
-            
-            if upcoming.empty:
-                return f"No more buses today from {origin_name} to {destination}."
-
-            # Sort by departure time and limit results
-            upcoming = upcoming.sort_values("dep_seconds").head(5)
-
-            # Join with trips to get trip information
-            upcoming = upcoming.merge(
-                active_trips[["trip_id", "trip_headsign", "trip_short_name"]], on="trip_id"
-            )
 
-            # Format results
-            lines = []
-            for _, row in upcoming.iterrows():
-                dep_time = row["departure_time"]
-                train_name = row["trip_short_name"] if pd.notna(row["trip_short_name"]) else row["trip_id"]
-                headsign = row["trip_headsign"] or ""
-                
-                line = f"• Bus {train_name}: {dep_time}"
-                if headsign:
-                    line += f" (to {headsign})"
-                lines.append(line)
+@dataclass(frozen=True)
+class _Journey:
+    """Origin stops and the trips taking them to a route or a stop."""
 
-            date_str = target_date.strftime("%A, %B %d, %Y")
-            current_time_str = when_dt.strftime("%I:%M %p")
-            header = (
-                f"Next DART bus departures from {origin_name} to {destination} "
-                f"on {date_str}:\n(Current time: {current_time_str})\n\n"
-            )
-            return header + "\n".join(lines)
-
-        # If no routes found by name, try to find by stops
-        destination_stops = gtfs.find_stops_by_name(destination, data)
-        if not destination_stops:
-            available_stations = gtfs.list_all_stations(data)
-            close_matches = [
-                s for s in available_stations
-                if destination.lower() in s.lower() or s.lower().startswith(destination.lower()[:3])
-            ]
-            error_msg = f"Destination '{destination}' not found as route or stop."
-            if close_matches:
-                error_msg += f" Did you mean one of these stops? {', '.join(close_matches[:5])}"
-            else:
-                error_msg += " Use list_routes() to see available routes or list_stations() to see available stops."
-            return error_msg
-
-        # Find routes that serve both stops
-        destination_name = destination_stops[0]["stop_name"] if destination_stops else destination
-        destination_stop_ids = [stop["stop_id"] for stop in destination_stops]
-        
-        # Get trips that serve the origin stops
-        origin_trips = data.stop_times[data.stop_times["stop_id"].isin(origin_stop_ids)]["trip_id"].unique()
-        
-        # Get trips that serve the destination stops
-        destination_trips = data.stop_times[data.stop_times["stop_id"].isin(destination_stop_ids)]["trip_id"].unique()
-        
-        # Find trips that serve both stops
-        common_trips = set(origin_trips) & set(destination_trips)
-        
-        if not common_trips:
-            return f"No direct routes found from {origin_name} to {destination_name}. You may need to transfer."
+    origin_name: str
+    destination_name: str
+    origin_stop_ids: list[str]
+    trip_ids: Iterable[Any]
+    # Whether the destination named a route rather than a stop
+    by_route: bool
+    destination_stop_ids: list[str] = field(default_factory=list)
 
-        # Get active service IDs for the target date
-        service_ids = gtfs.get_active_service_ids(target_date, data)
+    def active_trips(
+        self, target_date: date, backend: storage.StorageBackend
+    ) -> list[Any] | str:
+        """The trips running on ``target_date``, or a message why none does."""
+        service_ids = backend.get_active_service_ids(target_date)
         if not service_ids:
-            return f"No service available on {target_date.strftime('%A, %B %d, %Y')}."
+            return _no_service_message(target_date, backend)
+        active_trips = backend.active_trip_ids(self.trip_ids, service_ids)
+        if not active_trips:
+            date_str = target_date.strftime("%A, %B %d, %Y")
+            if self.by_route:
+                return f"No active buses for route '{self.destination_name}' on {date_str}."
+            return f"No active buses from {self.origin_name} to {self.destination_name} on {date_str}."
+        return active_trips
 
-        # Filter to active trips that serve both stops
-        active_trips = data.trips[
-            (data.trips["trip_id"].isin(common_trips)) &
-            (data.trips["service_id"].isin(service_ids))
-        ]
-        
-        if active_trips.empty:
-            return f"No active buses from {origin_name} to {destination_name} on {target_date.strftime('%A, %B %d, %Y')}."
+    @property
+    def no_departures(self) -> str:
+        if self.by_route:
+            return f"No departures found from {self.origin_name} for route '{self.destination_name}'."
+        return f"No departures found from {self.origin_name} to {self.destination_name}."
 
-        # Get stop times for these trips from the origin
-        stop_times = data.stop_times[
-            (data.stop_times["trip_id"].isin(active_trips["trip_id"])) &
-            (data.stop_times["stop_id"].isin(origin_stop_ids))
-        ].copy()
 
-        if stop_times.empty:
-            return f"No departures found from {origin_name} to {destination_name}."
+def _with_platforms(
+    stops: list[dict[str, Any]], backend: storage.StorageBackend
+) -> list[str]:
+    """IDs of ``stops`` followed by the platforms of those that are stations."""
+    stop_ids = [stop["stop_id"] for stop in stops]
+    platforms = [
+        platform
+        for stop_id in stop_ids
+        for platform in backend.get_platform_stops_for_station(stop_id)
+    ]
+    return list(dict.fromkeys(stop_ids + platforms))
 
-        # Convert departure times to seconds and filter
-        stop_times["dep_seconds"] = stop_times["departure_time"].apply(gtfs.time_to_seconds)
-        stop_times = stop_times.dropna(subset=["dep_seconds"])
-        
-        # Filter to departures after the specified time
-        upcoming = stop_times[stop_times["dep_seconds"] >= seconds_since_midnight]
-        
-        if upcoming.empty:
-            return f"No more buses today from {origin_name} to {destination_name}."
 
-        # Sort by departure time and limit results
-        upcoming = upcoming.sort_values("dep_seconds").head(5)
+def _resolve_journey(
+    origin: str,
+    destination: str,
+    backend: storage.StorageBackend,
+    routes: bool = True,
+) -> _Journey | str:
+    """Find the origin stops and the trips to ``destination``, a route name or
+    a stop name (only a stop name unless ``routes``); plain strings are
+    messages."""
+    # Find origin stop(s)
+    origin_stops = backend.find_stops_by_name(origin)
+    if not origin_stops:
+        available_stations = backend.list_all_stations()
+        close_matches = [
+            s for s in available_stations
+            if origin.lower() in s.lower() or s.lower().startswith(origin.lower()[:3])
+        ]
+        error_msg = f"Origin stop '{origin}' not found."
+        if close_matches:
+            error_msg += f" Did you mean one of these? {', '.join(close_matches[:5])}"
+        else:
+            error_msg += " Use list_stations() to see all available stops."
+        return error_msg
 
-        # Join with trips to get trip information
-        upcoming = upcoming.merge(
-            active_trips[["trip_id", "trip_headsign", "trip_short_name"]], on="trip_id"
+    # Get origin name for display
+    origin_name = origin_stops[0]["stop_name"] if origin_stops else origin
+    origin_stop_ids = _with_platforms(origin_stops, backend)
+
+    # Try to find routes by name first, through the route catalog
+    route_trip_ids = backend.route_catalog.trip_ids(destination) if routes else []
+    if route_trip_ids:
+        return _Journey(
+            origin_name, destination, origin_stop_ids, route_trip_ids, by_route=True
         )
 
-        # Format results
-        lines = []
-        for _, row in upcoming.iterrows():
-            dep_time = row["departure_time"]
-            train_name = row["trip_short_name"] if pd.notna(row["trip_short_name"]) else row["trip_id"]
-            headsign = row["trip_headsign"] or ""
-            
-            line = f"• Bus {train_name}: {dep_time}"
-            if headsign:
-                line += f" (to {headsign})"
-            lines.append(line)
+    # If no routes found by name, try to find by stops
+    destination_stops = backend.find_stops_by_name(destination)
+    if not destination_stops:
+        available_stations = backend.list_all_stations()
+        close_matches = [
+            s for s in available_stations
+            if destination.lower() in s.lower() or s.lower().startswith(destination.lower()[:3])
+        ]
+        error_msg = f"Destination '{destination}' not found as route or stop."
+        if close_matches:
+            error_msg += f" Did you mean one of these stops? {', '.join(close_matches[:5])}"
+        else:
+            error_msg += " Use list_routes() to see available routes or list_stations() to see available stops."
+        return error_msg
 
-        date_str = target_date.strftime("%A, %B %d, %Y")
-        current_time_str = when_dt.strftime("%I:%M %p")
-        header = (
-            f"Next DART bus departures from {origin_name} to {destination_name} "
-            f"on {date_str}:\n(Current time: {current_time_str})\n\n"
+    # Find routes that serve both stops
+    destination_name = destination_stops[0]["stop_name"] if destination_stops else destination
+    destination_stop_ids = _with_platforms(destination_stops, backend)
+    
+    # Get trips that serve the origin stops
+    origin_trips = backend.trips_serving(origin_stop_ids)
+    
+    # Get trips that serve the destination stops
+    destination_trips = backend.trips_serving(destination_stop_ids)
+    
+    # Find trips that serve both stops
+    common_trips = origin_trips & destination_trips
+    
+    if not common_trips:
+        return f"No direct routes found from {origin_name} to {destination_name}. You may need to transfer."
+
+    return _Journey(
+        origin_name,
+        destination_name,
+        origin_stop_ids,
+        common_trips,
+        by_route=False,
+        destination_stop_ids=destination_stop_ids,
+    )
+
+
+def _next_departures(
+    origin: str,
+    destination: str,
+    when_iso: str | None,
+    arrive_by: bool,
+    backend: storage.StorageBackend,
+) -> DepartureBoard | str:
+    """Look up departures for next_trains(); plain strings are messages."""
+    # Parse the target time
+    try:
+        when_dt = _parse_when(when_iso)
+    except ValueError:
+        return f"Invalid datetime format: {when_iso}. Please use ISO-8601 format."
+
+    target_date = when_dt.date()
+    seconds_since_midnight = (
+        when_dt.hour * 3600 + when_dt.minute * 60 + when_dt.second
+    )
+
+    # Arriving by a time only makes sense at a destination stop
+    journey = _resolve_journey(origin, destination, backend, routes=not arrive_by)
+    if isinstance(journey, str):
+        return journey
+
+    if arrive_by:
+        active_trips = journey.active_trips(target_date, backend)
+        if isinstance(active_trips, str):
+            return active_trips
+        # Reverse search from the arrivals at the destination
+        departures = backend.find_arrivals(
+            journey.origin_stop_ids,
+            journey.destination_stop_ids,
+            active_trips,
+            seconds_since_midnight,
         )
-        return header + "\n".join(lines)
+        if not departures:
+            return (
+                f"No buses from {journey.origin_name} to {journey.destination_name}"
+                f" arrive by {when_dt.strftime('%I:%M %p')} on"
+                f" {target_date.strftime('%A, %B %d, %Y')}."
+            )
+        return DepartureBoard(
+            journey.origin_name,
+            journey.destination_name,
+            when_dt,
+            departures,
+            arrive_by=True,
+        )
+
+    # Look up departures from the origin, including headway-based trips,
+    # yesterday's trips running past midnight and the next service days
+    departures = backend.find_upcoming_departures(
+        journey.origin_stop_ids, journey.trip_ids, when_dt
+    )
+    if not departures:
+        active_trips = journey.active_trips(target_date, backend)
+        if isinstance(active_trips, str):
+            return active_trips
+        # The service span table tells whether the day had any at all
+        if backend.service_span(journey.origin_stop_ids, active_trips) is None:
+            return journey.no_departures
+        return (
+            f"No more buses from {journey.origin_name} to"
+            f" {journey.destination_name} in the next"
+            f" {gtfs.SERVICE_DAY_HORIZON} days."
+        )
+
+    return DepartureBoard(
+        journey.origin_name, journey.destination_name, when_dt, departures
+    )
+
 
+def _service_span_departure(
+    origin: str,
+    destination: str,
+    when_iso: str | None,
+    last: bool,
+    backend: storage.StorageBackend,
+) -> tuple[_Journey, date, gtfs.Departure] | str:
+    """Look up the first or last departure of a day for first_bus() and
+    last_bus(); plain strings are messages."""
+    try:
+        target_date = _parse_when(when_iso).date()
+    except ValueError:
+        return f"Invalid datetime format: {when_iso}. Please use ISO-8601 format."
+
+    journey = _resolve_journey(origin, destination, backend)
+    if isinstance(journey, str):
+        return journey
+    active_trips = journey.active_trips(target_date, backend)
+    if isinstance(active_trips, str):
+        return active_trips
+    span = backend.service_span(journey.origin_stop_ids, active_trips)
+    if span is None:
+        return journey.no_departures
+    return journey, target_date, span[1] if last else span[0]
+
+
+def _service_span_result(
+    origin: str,
+    destination: str,
+    when_iso: str | None,
+    output_format: str,
+    last: bool,
+    backend: storage.StorageBackend | None,
+) -> str | dict[str, Any]:
+    try:
+        result = _service_span_departure(
+            origin, destination, when_iso, last, _backend(backend)
+        )
     except Exception as e:
-        return f"Error: {str(e)}"
+        result = f"Error: {str(e)}"
+
+    if isinstance(result, str):
+        if output_format == "json":
+            return {"message": result, "departure": None}
+        return result
+    journey, target_date, departure = result
+    if output_format == "json":
+        return {
+            "origin": journey.origin_name,
+            "destination": journey.destination_name,
+            "date": target_date.isoformat(),
+            "departure": departure._asdict(),
+        }
+    line = (
+        f"{'Last' if last else 'First'} DART bus from {journey.origin_name} to"
+        f" {journey.destination_name} on {target_date.strftime('%A, %B %d, %Y')}:"
+        f" Bus {departure.train_name} at {departure.departure_time}"
+    )
+    if departure.headsign:
+        line += f" (to {departure.headsign})"
+    return line + "."
+
+
+@mcp.tool()
+@_cached_tool("when_iso")
+async def first_bus(
+    origin: str,
+    destination: str,
+    when_iso: str | None = None,
+    output_format: str = "text",
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str | dict[str, Any]:
+    """Return the first DART bus of the day from a stop to a route or stop.
+
+    Args:
+        origin: Stop name (e.g. 'DART Central Station').
+        destination: Route name or stop name, as for next_trains().
+        when_iso: Optional ISO-8601 date or datetime (local time). Default: today.
+        output_format: 'text' (default) or 'json' for a structured record.
+
+    Answered from a precomputed service span table rather than a scan of the
+    day's departures.
+    """
+    return _service_span_result(
+        origin, destination, when_iso, output_format, False, backend
+    )
+
+
+@mcp.tool()
+@_cached_tool("when_iso")
+async def last_bus(
+    origin: str,
+    destination: str,
+    when_iso: str | None = None,
+    output_format: str = "text",
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str | dict[str, Any]:
+    """Return the last DART bus of the day from a stop to a route or stop.
+
+    Args:
+        origin: Stop name (e.g. 'DART Central Station').
+        destination: Route name or stop name, as for next_trains().
+        when_iso: Optional ISO-8601 date or datetime (local time). Default: today.
+        output_format: 'text' (default) or 'json' for a structured record.
+
+    Answered from a precomputed service span table rather than a scan of the
+    day's departures.
+    """
+    return _service_span_result(
+        origin, destination, when_iso, output_format, True, backend
+    )
 
 
 @mcp.tool()
-async def list_stations() -> str:
+@_cached_tool()
+async def list_stations(*, backend: storage.StorageBackend | None = None) -> str:
     """List all available DART bus stops.
 
     This tool is useful when you need to find the exact stop names, especially if
@@ -269,7 +594,7 @@ async def list_stations() -> str:
     or destination in the next_trains() tool.
     """
     try:
-        stations = gtfs.list_all_stations(gtfs.get_default_data())
+        stations = _backend(backend).list_all_stations()
         stations_list = "\n".join([f"• {station}" for station in stations])
         return f"Available DART bus stops:\n{stations_list}\n\nNote: Stop names support common abbreviations like 'DART' for DART Central Station and 'DT' for downtown."
     except Exception as e:
@@ -277,7 +602,8 @@ async def list_stations() -> str:
 
 
 @mcp.tool()
-async def list_routes() -> str:
+@_cached_tool()
+async def list_routes(*, backend: storage.StorageBackend | None = None) -> str:
     """List all available DART bus routes.
 
     This tool shows all the bus routes available in the DART system.
@@ -286,16 +612,401 @@ async def list_routes() -> str:
     Returns a formatted list of all DART bus routes.
     """
     try:
-        data = gtfs.get_default_data()
-        routes = data.trips["trip_headsign"].dropna().unique()
-        routes_list = "\n".join([f"• {route}" for route in sorted(routes)])
-        return f"Available DART bus routes:\n{routes_list}\n\nNote: Use these route names as destinations in the next_trains() tool."
+        catalog = _backend(backend).route_catalog
+        lines = []
+        for route in sorted(catalog.routes.values(), key=_route_sort_key):
+            headsigns = list(
+                dict.fromkeys(
+                    headsign
+                    for direction in sorted(route.headsigns)
+                    for headsign in route.headsigns[direction]
+                )
+            )
+            line = f"• {route.display_name}"
+            if headsigns:
+                line += f" (to {' / '.join(headsigns)})"
+            lines.append(line)
+        routes_list = "\n".join(lines)
+        return f"Available DART bus routes:\n{routes_list}\n\nNote: Use these route names or destinations in the next_trains() tool."
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@_cached_tool()
+async def route_stops(
+    route: str, *, backend: storage.StorageBackend | None = None
+) -> str:
+    """List the stops of a DART bus route in order, for each direction.
+
+    Args:
+        route: Route number, route name or destination (e.g. '3', 'University').
+               Use list_routes() to see all available routes.
+    """
+    try:
+        backend = _backend(backend)
+        routes = backend.route_catalog.resolve(route)
+        if not routes:
+            return f"Route '{route}' not found. Use list_routes() to see available routes."
+
+        sections = []
+        for info in routes:
+            for direction in sorted(info.stops):
+                headsigns = info.headsigns.get(direction, [])
+                title = f"Route {info.display_name}"
+                if headsigns:
+                    title += f" to {' / '.join(headsigns)}"
+                stops_list = "\n".join(
+                    f"{n}. {backend.stop_name(stop_id)}"
+                    for n, stop_id in enumerate(info.stops[direction], start=1)
+                )
+                sections.append(f"{title}:\n{stops_list}")
+        return "\n\n".join(sections)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@_cached_tool("depart_at")
+async def reachable_stops(
+    origin: str,
+    depart_at: str | None = None,
+    max_minutes: int = 30,
+    max_transfers: int = 1,
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str:
+    """List every DART stop reachable from an origin within a time budget.
+
+    Args:
+        origin: Stop name (e.g. 'DART Central Station'). Use list_stations() to
+                see all available options.
+        depart_at: Optional ISO-8601 departure datetime (local time). Default: now.
+        max_minutes: Travel time budget in minutes, including waiting and walking.
+        max_transfers: Maximum number of bus-to-bus transfers.
+
+    Earliest arrivals at all stops are computed in a single sweep over the
+    timetable, using walking transfers between nearby stops.
+    """
+    try:
+        try:
+            when_dt = _parse_when(depart_at)
+        except ValueError:
+            return f"Invalid datetime format: {depart_at}. Please use ISO-8601 format."
+
+        from . import routing
+
+        data = _feed_data(backend)
+        origin_stops = gtfs.find_stops_by_name(origin, data)
+        if not origin_stops:
+            return f"Origin stop '{origin}' not found. Use list_stations() to see all available stops."
+
+        depart_seconds = when_dt.hour * 3600 + when_dt.minute * 60 + when_dt.second
+        arrivals = routing.earliest_arrivals(
+            [stop["stop_id"] for stop in origin_stops],
+            depart_seconds,
+            when_dt.date(),
+            data,
+            max_seconds=max_minutes * 60,
+            max_transfers=max_transfers,
+        )
+
+        origin_name = origin_stops[0]["stop_name"]
+        header = (
+            f"Stops reachable from {origin_name} within {max_minutes} minutes, "
+            f"leaving {when_dt.strftime('%A, %B %d, %Y at %I:%M %p')}:\n\n"
+        )
+        lines = []
+        for arrival in arrivals:
+            line = (
+                f"• {data.stop_names.get(arrival.stop_id, arrival.stop_id)}: "
+                f"{gtfs.seconds_to_time(arrival.arrival_seconds)}"
+            )
+            if arrival.transfers:
+                plural = "s" if arrival.transfers > 1 else ""
+                line += f" ({arrival.transfers} transfer{plural})"
+            lines.append(line)
+        return header + "\n".join(lines)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+@mcp.tool()
+@_cached_tool()
+async def trip_details(
+    trip: str, *, backend: storage.StorageBackend | None = None
+) -> str:
+    """Show every stop and scheduled time of one DART bus trip.
+
+    Args:
+        trip: Trip ID, or the bus number shown by next_trains() (e.g. 'Bus 153').
+    """
+    try:
+        data = _feed_data(backend)
+        name = trip.strip()
+        if name.lower().startswith("bus "):
+            name = name[4:].strip()
+        trip_ids = gtfs.find_trips(name, data)
+        if not trip_ids:
+            return f"Trip '{trip}' not found. Use next_trains() to find bus numbers."
+
+        catalog = data.route_catalog
+        labels = gtfs._trip_labels(trip_ids, data)
+        sections = []
+        for trip_id in trip_ids:
+            title = f"Trip {trip_id}"
+            route = catalog.routes.get(catalog.trip_routes.get(trip_id))
+            if route is not None:
+                title += f" on route {route.display_name}"
+            _, headsign = labels.get(trip_id, ("", ""))
+            if headsign:
+                title += f" (to {headsign})"
+            template = data.frequency_templates.get(trip_id)
+            if template is not None:
+                windows = ", ".join(
+                    f"every {headway // 60} min {gtfs.seconds_to_time(start)}"
+                    f"-{gtfs.seconds_to_time(end)}"
+                    for start, end, headway in sorted(template.windows)
+                )
+                title += f", repeating {windows}"
+            lines = []
+            for n, (stop_id, arr_time, dep_time) in enumerate(
+                gtfs.get_trip_stop_times(trip_id, data), start=1
+            ):
+                times = dep_time or arr_time or "--:--:--"
+                if arr_time and dep_time and arr_time != dep_time:
+                    times = f"{arr_time} - {dep_time}"
+                stop_name = data.stop_names.get(stop_id, stop_id)
+                lines.append(f"{n}. {times}  {stop_name}")
+            sections.append(f"{title}:\n" + "\n".join(lines))
+        return "\n\n".join(sections)
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+
+def travel_time_rows(
+    origins: list[str],
+    destinations: list[str],
+    depart_at: str | None = None,
+    max_minutes: int = 180,
+    max_transfers: int = 2,
+    backend: storage.StorageBackend | None = None,
+) -> Iterator[tuple[str, list[int | None]]]:
+    """Resolve stop names and stream travel-time matrix rows in seconds.
+
+    Raises ``ValueError`` for an invalid ``depart_at`` or unknown stop name
+    before any row is produced.
+    """
+    from . import routing
+
+    when_dt = _parse_when(depart_at)
+    data = _feed_data(backend)
+    origin_places = routing.resolve_places(origins, data)
+    destination_places = routing.resolve_places(destinations, data)
+    return routing.travel_time_matrix(
+        origin_places,
+        destination_places,
+        when_dt.hour * 3600 + when_dt.minute * 60 + when_dt.second,
+        when_dt.date(),
+        data,
+        max_seconds=max_minutes * 60,
+        max_transfers=max_transfers,
+    )
+
+
+@mcp.tool()
+@_cached_tool("depart_at")
+async def travel_time_matrix(
+    origins: list[str],
+    destinations: list[str],
+    depart_at: str | None = None,
+    max_minutes: int = 180,
+    max_transfers: int = 2,
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str:
+    """Compute travel times in minutes between every origin and destination.
+
+    Args:
+        origins: Stop names to travel from (e.g. ['DART Central Station']).
+        destinations: Stop names to travel to.
+        depart_at: Optional ISO-8601 departure datetime (local time). Default: now.
+        max_minutes: Travel times above this many minutes are reported as '-'.
+        max_transfers: Maximum number of bus-to-bus transfers.
+
+    Each origin is answered with one sweep over the timetable, shared
+    across all destinations.
+    """
+    from . import routing
+
+    try:
+        rows = travel_time_rows(
+            origins, destinations, depart_at, max_minutes, max_transfers, backend
+        )
+        lines = [" | ".join(["Origin", *destinations])]
+        for origin, seconds in rows:
+            minutes = [routing.travel_minutes(s) for s in seconds]
+            cells = ["-" if m is None else str(m) for m in minutes]
+            lines.append(" | ".join([origin, *cells]))
+        return "Travel times in minutes:\n\n" + "\n".join(lines)
     except Exception as e:
         return f"Error: {str(e)}"
 
 
+def _format_service_frequency(
+    day: str, results: list[analytics.ServiceFrequency]
+) -> str:
+    """Render service frequency summaries as text tables."""
+
+    def minutes(value: float | None) -> str:
+        return "-" if value is None else f"{value:g} min"
+
+    sections = []
+    for result in results:
+        if not result.departures:
+            sections.append(f"{result.label}: no departures on {day}.")
+            continue
+        lines = [
+            f"{result.label} on {day}:",
+            f"Span of service: {result.first_departure} - {result.last_departure}"
+            f" ({result.departures} departures)",
+            f"Headway: mean {minutes(result.mean_headway_minutes)},"
+            f" longest {minutes(result.max_headway_minutes)}",
+            "",
+            "Hour   Departures  Mean headway  Longest headway",
+        ]
+        for hour in result.hours:
+            lines.append(
+                f"{hour.hour:02d}:00  {hour.departures:>10}"
+                f"  {minutes(hour.mean_headway_minutes):>12}"
+                f"  {minutes(hour.max_headway_minutes):>15}"
+            )
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections)
+
+
+@mcp.tool()
+@_cached_tool()
+async def service_frequency(
+    day: str,
+    route: str | None = None,
+    stop: str | None = None,
+    output_format: str = "text",
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str | dict[str, Any]:
+    """Summarize how often DART buses run: departures per hour, mean and
+    longest headway and span of service.
+
+    Args:
+        day: ISO date (e.g. '2025-06-02') or day type: 'weekday', 'saturday',
+             'sunday' or any other day name.
+        route: Optional route number, name or destination (e.g. '1').
+        stop: Optional stop name (e.g. 'DART Central Station'). Give a route,
+              a stop or both; a route alone is summarized per direction from
+              where its trips start.
+        output_format: 'text' (default) for tables, or 'json' for structured
+                       records.
+
+    Works on the in-memory timetable, so it needs the in-memory storage
+    engine (DART_MCP_STORAGE=pandas).
+    """
+    from . import analytics
+
+    try:
+        results = analytics.service_frequency(
+            _feed_data(backend), analytics.parse_day(day), route, stop
+        )
+        if not results:
+            result: str = f"No service on {day}."
+        elif output_format == "json":
+            return {"day": day, "series": [r.as_dict() for r in results]}
+        else:
+            result = _format_service_frequency(day, results)
+    except Exception as e:
+        result = f"Error: {str(e)}"
+    if output_format == "json":
+        return {"message": result, "series": []}
+    return result
+
+
+
+def _format_segment_times(route: str, rows: list[dict[str, Any]]) -> str:
+    """Render segment run times as one table per direction and hour band."""
+    sections: dict[tuple[str, str], list[str]] = {}
+    for row in rows:
+        key = (row["direction"], row["hour_band"])
+        if key not in sections:
+            sections[key] = [
+                f"{row['direction']}, {row['hour_band']}:",
+                "Segment  Trips  Min / median / p90 (min)",
+            ]
+        sections[key].append(
+            f"{row['from_stop']} -> {row['to_stop']}  {row['trips']}"
+            f"  {row['min_minutes']:g} / {row['median_minutes']:g}"
+            f" / {row['p90_minutes']:g}"
+        )
+    return f"Scheduled run times for route {route}:\n\n" + "\n\n".join(
+        "\n".join(lines) for lines in sections.values()
+    )
+
+
+@mcp.tool()
+@_cached_tool()
+async def segment_times(
+    route: str,
+    direction: int | None = None,
+    hour_band: str | None = None,
+    output_format: str = "text",
+    *,
+    backend: storage.StorageBackend | None = None,
+) -> str | dict[str, Any]:
+    """Show scheduled run times between consecutive stops of a DART route,
+    to spot schedule padding and slow segments.
+
+    Args:
+        route: Route number, name or destination (e.g. '1').
+        direction: Optional direction_id (0 or 1).
+        hour_band: Optional band of the day: 'early' (before 6am), 'am_peak'
+                   (6-9am), 'midday' (9am-3pm), 'pm_peak' (3-7pm) or
+                   'evening' (after 7pm).
+        output_format: 'text' (default) for tables, or 'json' for structured
+                       records.
+
+    Works on the in-memory timetable, so it needs the in-memory storage
+    engine (DART_MCP_STORAGE=pandas).
+    """
+    from . import analytics
+
+    try:
+        rows = analytics.route_segment_times(
+            _feed_data(backend), route, direction, hour_band
+        )
+        if not rows:
+            result: str = f"No scheduled segments for route {route}."
+        elif output_format == "json":
+            return {"route": route, "segments": rows}
+        else:
+            result = _format_segment_times(route, rows)
+    except Exception as e:
+        result = f"Error: {str(e)}"
+    if output_format == "json":
+        return {"message": result, "segments": []}
+    return result
+
+
 def main() -> None:
-    """Main entry point for the MCP server."""
+    """Main entry point for the MCP server.
+
+    ``dart-mcp memory [FOLDER]`` prints a memory report for a feed instead
+    (see :mod:`dart_mcp.memory`).
+    """
+    if sys.argv[1:2] == ["memory"]:
+        from . import memory
+
+        memory.main(sys.argv[2:])
+        return
+
     # Only load GTFS data when not in test mode
     if os.getenv("PYTEST_CURRENT_TEST") is None and "pytest" not in sys.modules:
         try:
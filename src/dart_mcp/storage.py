@@ -0,0 +1,1042 @@
+"""Storage backends serving GTFS queries for DART MCP.
+
+The server's lookups go through a :class:`StorageBackend`. Two engines exist:
+
+* ``pandas`` (default) keeps every table and index in memory, see
+  :class:`~dart_mcp.gtfs.GTFSData`.
+* ``sqlite`` builds an indexed SQLite database from the feed once and serves
+  queries from disk pages, for deployments with little memory. It runs
+  without pandas and numpy, which only the in-memory engine and the routing
+  and analytics tools import.
+
+Pick the engine with the ``DART_MCP_STORAGE`` environment variable. The
+SQLite database lives at ``DART_MCP_SQLITE_PATH`` (default: a ``dart-mcp``
+folder in the temp directory) and is rebuilt when the feed changes.
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import cached_property, lru_cache
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Protocol
+
+from . import gtfs
+from .gtfs import (
+    STOP_NAME_ABBREVIATIONS,
+    Departure,
+    FrequencyTemplate,
+    GTFSData,
+    RouteCatalog,
+)
+
+WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+# Page cache per SQLite connection, in KiB; the OS page cache does the rest
+SQLITE_CACHE_KIB = 8 * 1024
+# Bump whenever the SQLite schema changes, so older databases get rebuilt
+SQLITE_FORMAT = 4
+
+
+class StorageBackend(Protocol):
+    """Queries the server needs from a loaded GTFS feed."""
+
+    name: str
+
+    @property
+    def feed_version(self) -> str | None: ...
+
+    @property
+    def route_catalog(self) -> RouteCatalog: ...
+
+    @property
+    def service_end(self) -> date | None: ...
+
+    def find_stops_by_name(self, stop_name: str) -> list[dict[str, Any]]: ...
+
+    def list_all_stations(self) -> list[str]: ...
+
+    def stop_name(self, stop_id: str) -> str: ...
+
+    def get_platform_stops_for_station(self, station_id: str) -> list[str]: ...
+
+    def get_active_service_ids(self, target_date: date) -> list[str]: ...
+
+    def trips_serving(self, stop_ids: list[str]) -> set[Any]: ...
+
+    def active_trip_ids(
+        self, trip_ids: Iterable[Any], service_ids: list[str]
+    ) -> list[Any]: ...
+
+    def find_departures(
+        self,
+        stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        after_seconds: int,
+        limit: int = 5,
+    ) -> list[Departure]: ...
+
+    def find_upcoming_departures(
+        self,
+        stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        when: datetime,
+        limit: int = 5,
+    ) -> list[Departure]: ...
+
+    def find_arrivals(
+        self,
+        origin_stop_ids: list[str],
+        destination_stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        before_seconds: int,
+        limit: int = 5,
+    ) -> list[Departure]: ...
+
+    def service_span(
+        self, stop_ids: list[str], trip_ids: Iterable[Any]
+    ) -> tuple[Departure, Departure] | None: ...
+
+    def find_next_trains(
+        self,
+        origin_station_id: str,
+        destination_station_id: str,
+        after_seconds: int,
+        target_date: date,
+        limit: int = 5,
+    ) -> list[Departure]: ...
+
+
+@dataclass(frozen=True)
+class PandasBackend:
+    """In-memory engine backed by :class:`~dart_mcp.gtfs.GTFSData`."""
+
+    data: GTFSData
+    name = "pandas"
+
+    @property
+    def feed_version(self) -> str | None:
+        return self.data.feed_version
+
+    @property
+    def route_catalog(self) -> RouteCatalog:
+        return self.data.route_catalog
+
+    @property
+    def service_end(self) -> date | None:
+        return self.data.service_end
+
+    def find_stops_by_name(self, stop_name: str) -> list[dict[str, Any]]:
+        return gtfs.find_stops_by_name(stop_name, self.data)
+
+    def list_all_stations(self) -> list[str]:
+        return gtfs.list_all_stations(self.data)
+
+    def stop_name(self, stop_id: str) -> str:
+        return self.data.stop_names.get(stop_id, stop_id)
+
+    def get_platform_stops_for_station(self, station_id: str) -> list[str]:
+        return gtfs.get_platform_stops_for_station(station_id, self.data)
+
+    def get_active_service_ids(self, target_date: date) -> list[str]:
+        return gtfs.get_active_service_ids(target_date, self.data)
+
+    def trips_serving(self, stop_ids: list[str]) -> set[Any]:
+        return gtfs.find_trips_serving(stop_ids, self.data)
+
+    def active_trip_ids(
+        self, trip_ids: Iterable[Any], service_ids: list[str]
+    ) -> list[Any]:
+        trips = self.data.trips
+        active = trips["trip_id"].isin(list(trip_ids)) & trips["service_id"].isin(
+            service_ids
+        )
+        return trips.loc[active, "trip_id"].tolist()
+
+    def find_departures(
+        self,
+        stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        after_seconds: int,
+        limit: int = 5,
+    ) -> list[Departure]:
+        return gtfs.find_departures(stop_ids, trip_ids, after_seconds, self.data, limit)
+
+    def find_upcoming_departures(
+        self,
+        stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        when: datetime,
+        limit: int = 5,
+    ) -> list[Departure]:
+        return gtfs.find_upcoming_departures(stop_ids, trip_ids, when, self.data, limit)
+
+    def find_arrivals(
+        self,
+        origin_stop_ids: list[str],
+        destination_stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        before_seconds: int,
+        limit: int = 5,
+    ) -> list[Departure]:
+        return gtfs.find_arrivals(
+            origin_stop_ids,
+            destination_stop_ids,
+            trip_ids,
+            before_seconds,
+            self.data,
+            limit,
+        )
+
+    def service_span(
+        self, stop_ids: list[str], trip_ids: Iterable[Any]
+    ) -> tuple[Departure, Departure] | None:
+        return gtfs.find_service_span(stop_ids, trip_ids, self.data)
+
+    def find_next_trains(
+        self,
+        origin_station_id: str,
+        destination_station_id: str,
+        after_seconds: int,
+        target_date: date,
+        limit: int = 5,
+    ) -> list[Departure]:
+        return gtfs.find_next_trains(
+            origin_station_id,
+            destination_station_id,
+            after_seconds,
+            target_date,
+            self.data,
+            limit,
+        )
+
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE stops (
+    stop_id TEXT,
+    stop_name TEXT,
+    name_lower TEXT,
+    location_type INTEGER,
+    parent_station TEXT
+);
+CREATE TABLE trips (
+    trip_id TEXT,
+    route_id TEXT,
+    service_id TEXT,
+    direction_id INTEGER,
+    trip_headsign TEXT,
+    trip_short_name TEXT
+);
+CREATE TABLE stop_times (
+    trip_id TEXT,
+    stop_id TEXT,
+    stop_sequence INTEGER,
+    arrival_time TEXT,
+    departure_time TEXT,
+    departure_seconds INTEGER,
+    arrival_seconds INTEGER
+);
+CREATE TABLE calendar (
+    service_id TEXT,
+    monday INTEGER,
+    tuesday INTEGER,
+    wednesday INTEGER,
+    thursday INTEGER,
+    friday INTEGER,
+    saturday INTEGER,
+    sunday INTEGER,
+    start_date INTEGER,
+    end_date INTEGER
+);
+CREATE TABLE calendar_dates (service_id TEXT, date INTEGER, exception_type INTEGER);
+CREATE TABLE routes (route_id TEXT, route_short_name TEXT, route_long_name TEXT);
+CREATE TABLE frequencies (
+    trip_id TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    headway_secs INTEGER
+);
+CREATE TABLE trip_patterns (trip_id TEXT, pattern INTEGER);
+CREATE TABLE service_spans (
+    stop_id TEXT,
+    pattern INTEGER,
+    first_seconds INTEGER,
+    first_trip TEXT,
+    last_seconds INTEGER,
+    last_trip TEXT
+);
+"""
+
+_INDEXES = """
+CREATE INDEX stops_by_id ON stops (stop_id);
+CREATE INDEX stops_by_name ON stops (name_lower);
+CREATE INDEX stops_by_parent ON stops (parent_station);
+CREATE INDEX trips_by_id ON trips (trip_id);
+CREATE INDEX trips_by_service ON trips (service_id);
+CREATE INDEX stop_times_by_stop ON stop_times (stop_id, departure_seconds);
+CREATE INDEX stop_times_by_arrival ON stop_times (stop_id, arrival_seconds);
+CREATE INDEX stop_times_by_trip ON stop_times (trip_id, stop_sequence);
+CREATE INDEX service_spans_by_stop ON service_spans (stop_id);
+ANALYZE;
+"""
+
+
+def _read_rows(path: Path) -> Iterator[dict[str, str]]:
+    if not path.exists():
+        return
+    with path.open(newline="", encoding="utf-8-sig") as f:
+        yield from csv.DictReader(f)
+
+
+def _text(value: str | None) -> str | None:
+    """Empty CSV cells become NULL."""
+    return value if value else None
+
+
+def _int(value: str | None, default: int | None = None) -> int | None:
+    try:
+        return int(float(value)) if value else default
+    except ValueError:
+        return default
+
+
+def build_sqlite_database(gtfs_folder: Path, path: Path) -> None:
+    """Load the feed in ``gtfs_folder`` into a new SQLite database at ``path``.
+
+    The database is written next to ``path`` and moved into place when
+    complete, so concurrent workers never open a half-built file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(_SCHEMA)
+            _load_tables(conn, gtfs_folder)
+            _load_service_spans(conn)
+            conn.execute(
+                "INSERT INTO meta VALUES ('feed_version', ?)",
+                (gtfs.compute_feed_version(gtfs_folder),),
+            )
+            conn.execute("INSERT INTO meta VALUES ('format', ?)", (str(SQLITE_FORMAT),))
+            conn.commit()
+            conn.executescript(_INDEXES)
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _load_tables(conn: sqlite3.Connection, gtfs_folder: Path) -> None:
+    conn.executemany(
+        "INSERT INTO stops VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                row["stop_id"],
+                row["stop_name"],
+                row["stop_name"].lower().strip(),
+                _int(row.get("location_type"), 0),
+                _text(row.get("parent_station")),
+            )
+            for row in _read_rows(gtfs_folder / "stops.txt")
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO trips VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (
+                row["trip_id"],
+                row["route_id"],
+                row["service_id"],
+                _int(row.get("direction_id"), 0),
+                _text(row.get("trip_headsign")),
+                _text(row.get("trip_short_name")),
+            )
+            for row in _read_rows(gtfs_folder / "trips.txt")
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO stop_times VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                row["trip_id"],
+                row["stop_id"],
+                _int(row["stop_sequence"]),
+                _text(row.get("arrival_time")),
+                _text(row.get("departure_time")),
+                gtfs.time_to_seconds(row.get("departure_time")),
+                _first_time(row.get("arrival_time"), row.get("departure_time")),
+            )
+            for row in _read_rows(gtfs_folder / "stop_times.txt")
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO calendar VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                row["service_id"],
+                *(_int(row.get(day), 0) for day in WEEKDAYS),
+                _int(row["start_date"]),
+                _int(row["end_date"]),
+            )
+            for row in _read_rows(gtfs_folder / "calendar.txt")
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO calendar_dates VALUES (?, ?, ?)",
+        (
+            (row["service_id"], _int(row["date"]), _int(row["exception_type"]))
+            for row in _read_rows(gtfs_folder / "calendar_dates.txt")
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO routes VALUES (?, ?, ?)",
+        (
+            (
+                row["route_id"],
+                _text(row.get("route_short_name")),
+                _text(row.get("route_long_name")),
+            )
+            for row in _read_rows(gtfs_folder / "routes.txt")
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO frequencies VALUES (?, ?, ?, ?)",
+        (
+            (
+                row["trip_id"],
+                row["start_time"],
+                row["end_time"],
+                _int(row["headway_secs"], 0),
+            )
+            for row in _read_rows(gtfs_folder / "frequencies.txt")
+        ),
+    )
+
+
+def _first_time(*times: str | None) -> int | None:
+    for time_str in times:
+        seconds = gtfs.time_to_seconds(time_str)
+        if seconds is not None:
+            return seconds
+    return None
+
+
+def _read_frequency_templates(conn: sqlite3.Connection) -> dict[Any, FrequencyTemplate]:
+    """Headway-based trips keyed by trip ID, as
+    :func:`dart_mcp.gtfs.build_frequency_templates` builds them."""
+    windows: dict[Any, list[tuple[int, int, int]]] = {}
+    for trip_id, start_time, end_time, headway in conn.execute(
+        "SELECT trip_id, start_time, end_time, headway_secs FROM frequencies"
+        " ORDER BY rowid"
+    ):
+        start = gtfs.time_to_seconds(start_time)
+        end = gtfs.time_to_seconds(end_time)
+        if start is None or end is None or headway <= 0:
+            continue
+        windows.setdefault(trip_id, []).append((start, end, headway))
+
+    templates = {}
+    for trip_id, trip_windows in windows.items():
+        rows = conn.execute(
+            "SELECT stop_id, stop_sequence, arrival_time, departure_time"
+            " FROM stop_times WHERE trip_id = ? ORDER BY stop_sequence",
+            (trip_id,),
+        ).fetchall()
+        # Non-timepoint stops have no times, fall back to the other column
+        arr = [t for t in (_first_time(a, d) for _, _, a, d in rows) if t is not None]
+        dep = [t for t in (_first_time(d, a) for _, _, a, d in rows) if t is not None]
+        if not rows or len(arr) < len(rows) or len(dep) < len(rows):
+            continue
+        templates[trip_id] = FrequencyTemplate(
+            trip_id=trip_id,
+            stop_ids=[row[0] for row in rows],
+            stop_sequences=[row[1] for row in rows],
+            arrival_offsets=[a - dep[0] for a in arr],
+            departure_offsets=[d - dep[0] for d in dep],
+            windows=trip_windows,
+        )
+    return templates
+
+
+def _load_service_spans(conn: sqlite3.Connection) -> None:
+    """Group trips into patterns and record each pattern's first and last
+    departure at every stop it calls at, headway-based trips included.
+
+    Trips of one route, headsign and service calling at the same stops in
+    the same order form a pattern, as in
+    :func:`dart_mcp.gtfs.build_service_spans`. The stop times are read
+    once, trip by trip.
+    """
+    trip_keys = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT trip_id, route_id, trip_headsign, service_id FROM trips"
+        )
+    }
+    templates = _read_frequency_templates(conn)
+    patterns: dict[tuple[Any, ...], int] = {}
+    trip_patterns = []
+    # (first, last) departure as (seconds, trip_id), by stop and pattern
+    spans: dict[tuple[str, int], tuple[tuple[int, str], tuple[int, str]]] = {}
+
+    def add(stop_id: str, pattern: int, first: int, last: int, trip_id: str) -> None:
+        span = spans.get((stop_id, pattern))
+        if span is not None:
+            first_call = min(span[0], (first, trip_id))
+            last_call = max(span[1], (last, trip_id))
+        else:
+            first_call, last_call = (first, trip_id), (last, trip_id)
+        spans[stop_id, pattern] = (first_call, last_call)
+
+    calls = conn.execute(
+        "SELECT trip_id, stop_id, departure_seconds FROM stop_times"
+        " ORDER BY trip_id, stop_sequence"
+    )
+    for trip_id, trip_calls in groupby(calls, key=itemgetter(0)):
+        stops = [(stop_id, seconds) for _, stop_id, seconds in trip_calls]
+        key = (
+            *trip_keys.get(trip_id, (None, None, None)),
+            tuple(stop_id for stop_id, _ in stops),
+        )
+        pattern = patterns.setdefault(key, len(patterns))
+        trip_patterns.append((trip_id, pattern))
+        template = templates.get(trip_id)
+        if template is None:
+            for stop_id, seconds in stops:
+                if seconds is not None:
+                    add(stop_id, pattern, seconds, seconds, trip_id)
+            continue
+        start_span = template.start_span()
+        if start_span is None:
+            continue
+        for p, stop_id in enumerate(template.stop_ids):
+            offset = template.departure_offsets[p]
+            add(
+                stop_id,
+                pattern,
+                start_span[0] + offset,
+                start_span[1] + offset,
+                trip_id,
+            )
+
+    conn.executemany("INSERT INTO trip_patterns VALUES (?, ?)", trip_patterns)
+    conn.executemany(
+        "INSERT INTO service_spans VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (stop_id, pattern, *first, *last)
+            for (stop_id, pattern), (first, last) in spans.items()
+        ),
+    )
+
+
+def _placeholders(values: list[Any]) -> str:
+    return ",".join("?" * len(values))
+
+
+class SQLiteBackend:
+    """Disk-backed engine serving queries from an indexed SQLite database.
+
+    Only small derived structures (the route catalog, headway templates and
+    the pattern of each trip) are kept in memory; timetable rows and the
+    service spans built with the database are read through the indexes on
+    demand.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+
+    @classmethod
+    def from_feed(cls, gtfs_folder: Path, path: str | Path) -> SQLiteBackend:
+        """Open the database at ``path``, (re)building it if it is missing or
+        was built from a different feed or by a different schema."""
+        path = Path(path)
+        if path.exists():
+            backend = cls(path)
+            if backend.format == SQLITE_FORMAT and (
+                backend.feed_version == gtfs.compute_feed_version(gtfs_folder)
+            ):
+                return backend
+            backend.close()
+        build_sqlite_database(gtfs_folder, path)
+        return cls(path)
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> list[tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def _first_rows(
+        self,
+        sql: str,
+        params: Iterable[Any],
+        keep: Callable[[tuple[Any, ...]], bool],
+        limit: int,
+    ) -> list[tuple[Any, ...]]:
+        """Return the first ``limit`` rows accepted by ``keep``, reading the
+        result in batches so ordered scans stop early."""
+        rows: list[tuple[Any, ...]] = []
+        with self._lock:
+            cursor = self._conn.execute(sql, tuple(params))
+            while len(rows) < limit:
+                batch = cursor.fetchmany(64)
+                if not batch:
+                    break
+                rows.extend(row for row in batch if keep(row))
+        return rows[:limit]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @cached_property
+    def feed_version(self) -> str | None:
+        rows = self._query("SELECT value FROM meta WHERE key = 'feed_version'")
+        return rows[0][0] if rows else None
+
+    @cached_property
+    def format(self) -> int:
+        rows = self._query("SELECT value FROM meta WHERE key = 'format'")
+        return int(rows[0][0]) if rows else 1
+
+    @cached_property
+    def service_end(self) -> date | None:
+        # The rule of gtfs.last_service_dates: calendar rows running on some
+        # weekday count up to their end date, added dates extend them
+        runs = " OR ".join(f"{day} = 1" for day in WEEKDAYS)
+        ((end,),) = self._query(
+            "SELECT MAX(last) FROM ("
+            f" SELECT MAX(end_date) AS last FROM calendar WHERE ({runs})"
+            " AND start_date <= end_date"
+            " UNION ALL"
+            " SELECT MAX(date) FROM calendar_dates WHERE exception_type = 1)"
+        )
+        return None if end is None else gtfs.parse_gtfs_date(end)
+
+    @cached_property
+    def route_catalog(self) -> RouteCatalog:
+        route_names = {
+            route_id: (short_name or "", long_name or "")
+            for route_id, short_name, long_name in self._query(
+                "SELECT route_id, route_short_name, route_long_name FROM routes"
+                " ORDER BY rowid"
+            )
+        }
+        trip_rows = self._query(
+            "SELECT trip_id, route_id, direction_id, trip_headsign FROM trips"
+            " ORDER BY rowid"
+        )
+        for _, route_id, _, _ in trip_rows:
+            route_names.setdefault(route_id, (route_id, ""))
+
+        # The trip with the most stops represents each direction's stop order
+        counts = dict(
+            self._query("SELECT trip_id, COUNT(*) FROM stop_times GROUP BY trip_id")
+        )
+        longest: dict[tuple[Any, int], tuple[int, Any]] = {}
+        for trip_id, route_id, direction_id, _ in trip_rows:
+            count = counts.get(trip_id)
+            best = longest.get((route_id, direction_id))
+            if count is not None and (best is None or count > best[0]):
+                longest[(route_id, direction_id)] = (count, trip_id)
+        stops: dict[Any, dict[int, list[str]]] = {}
+        for (route_id, direction_id), (_, trip_id) in longest.items():
+            stops.setdefault(route_id, {})[direction_id] = [
+                stop_id
+                for (stop_id,) in self._query(
+                    "SELECT stop_id FROM stop_times WHERE trip_id = ?"
+                    " ORDER BY stop_sequence",
+                    (trip_id,),
+                )
+            ]
+
+        stop_routes: dict[str, list[Any]] = {}
+        for stop_id, route_id in self._query(
+            "SELECT st.stop_id, t.route_id FROM stop_times st"
+            " JOIN trips t ON t.trip_id = st.trip_id"
+            " GROUP BY st.stop_id, t.route_id ORDER BY MIN(st.rowid)"
+        ):
+            stop_routes.setdefault(stop_id, []).append(route_id)
+
+        return gtfs.assemble_route_catalog(route_names, stops, trip_rows, stop_routes)
+
+    @cached_property
+    def frequency_templates(self) -> dict[Any, FrequencyTemplate]:
+        with self._lock:
+            return _read_frequency_templates(self._conn)
+
+    @cached_property
+    def trip_patterns(self) -> dict[Any, int]:
+        """The pattern of each trip, see :func:`_load_service_spans`."""
+        return dict(self._query("SELECT trip_id, pattern FROM trip_patterns"))
+
+    @cached_property
+    def pattern_sizes(self) -> Counter[int]:
+        return Counter(self.trip_patterns.values())
+
+    def find_stops_by_name(self, stop_name: str) -> list[dict[str, Any]]:
+        if not stop_name:
+            return []
+        stop_name_lower = stop_name.lower().strip()
+        for condition in ("name_lower = ?", "instr(name_lower, ?) > 0"):
+            rows = self._query(
+                f"SELECT stop_id, stop_name FROM stops WHERE {condition}"
+                " ORDER BY rowid",
+                (stop_name_lower,),
+            )
+            if rows:
+                return [
+                    {"stop_id": stop_id, "stop_name": name} for stop_id, name in rows
+                ]
+        if stop_name_lower in STOP_NAME_ABBREVIATIONS:
+            return self.find_stops_by_name(STOP_NAME_ABBREVIATIONS[stop_name_lower])
+        return []
+
+    def list_all_stations(self) -> list[str]:
+        return [
+            name
+            for (name,) in self._query(
+                "SELECT stop_name FROM stops WHERE location_type = 1 ORDER BY stop_name"
+            )
+        ]
+
+    def stop_name(self, stop_id: str) -> str:
+        rows = self._query("SELECT stop_name FROM stops WHERE stop_id = ?", (stop_id,))
+        return rows[0][0] if rows else stop_id
+
+    def get_platform_stops_for_station(self, station_id: str) -> list[str]:
+        return [
+            stop_id
+            for (stop_id,) in self._query(
+                "SELECT stop_id FROM stops WHERE parent_station = ? ORDER BY rowid",
+                (station_id,),
+            )
+        ]
+
+    def get_active_service_ids(self, target_date: date) -> list[str]:
+        day_name = WEEKDAYS[target_date.weekday()]
+        day = int(target_date.strftime("%Y%m%d"))
+        return [
+            service_id
+            for (service_id,) in self._query(
+                f"SELECT service_id FROM calendar WHERE {day_name} = 1"
+                " AND start_date <= ? AND end_date >= ? ORDER BY rowid",
+                (day, day),
+            )
+        ]
+
+    def trips_serving(self, stop_ids: list[str]) -> set[Any]:
+        return {
+            trip_id
+            for (trip_id,) in self._query(
+                "SELECT DISTINCT trip_id FROM stop_times"
+                f" WHERE stop_id IN ({_placeholders(stop_ids)})",
+                stop_ids,
+            )
+        }
+
+    def active_trip_ids(
+        self, trip_ids: Iterable[Any], service_ids: list[str]
+    ) -> list[Any]:
+        wanted = set(trip_ids)
+        return [
+            trip_id
+            for (trip_id,) in self._query(
+                "SELECT trip_id FROM trips"
+                f" WHERE service_id IN ({_placeholders(service_ids)}) ORDER BY rowid",
+                service_ids,
+            )
+            if trip_id in wanted
+        ]
+
+    def _trip_labels(self, trip_ids: list[Any]) -> dict[Any, tuple[str, str]]:
+        return {
+            trip_id: (short_name or trip_id, headsign or "")
+            for trip_id, short_name, headsign in self._query(
+                "SELECT trip_id, trip_short_name, trip_headsign FROM trips"
+                f" WHERE trip_id IN ({_placeholders(trip_ids)})",
+                trip_ids,
+            )
+        }
+
+    def find_departures(
+        self,
+        stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        after_seconds: int,
+        limit: int = 5,
+    ) -> list[Departure]:
+        upcoming = self._departure_rows(stop_ids, set(trip_ids), after_seconds, limit)
+        labels = self._trip_labels([row[3] for row in upcoming])
+        return gtfs.label_departures(upcoming, labels)
+
+    def find_upcoming_departures(
+        self,
+        stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        when: datetime,
+        limit: int = 5,
+    ) -> list[Departure]:
+        trip_ids = set(trip_ids)
+
+        def departures_on(
+            day: date, after_seconds: int
+        ) -> list[tuple[int, str, str | None, Any]]:
+            service_ids = self.get_active_service_ids(day)
+            if not service_ids:
+                return []
+            active = set(self.active_trip_ids(trip_ids, service_ids))
+            return self._departure_rows(stop_ids, active, after_seconds, limit)
+
+        upcoming = gtfs.roll_service_days(when, departures_on, limit)
+        labels = self._trip_labels([row[3] for row in upcoming])
+        return gtfs.label_departures(upcoming, labels)
+
+    def _departure_rows(
+        self, stop_ids: list[str], trip_ids: set[Any], after_seconds: int, limit: int
+    ) -> list[tuple[int, str, str | None, Any]]:
+        templates = self.frequency_templates
+        scheduled = self._first_rows(
+            "SELECT departure_seconds, departure_time, NULL, trip_id FROM stop_times"
+            f" WHERE stop_id IN ({_placeholders(stop_ids)})"
+            " AND departure_seconds >= ? ORDER BY departure_seconds",
+            [*stop_ids, after_seconds],
+            lambda row: row[3] in trip_ids and row[3] not in templates,
+            limit,
+        )
+
+        return gtfs.merge_frequency_departures(
+            scheduled,
+            [
+                template
+                for trip_id, template in templates.items()
+                if trip_id in trip_ids
+            ],
+            stop_ids,
+            after_seconds,
+            limit,
+        )
+
+    def find_arrivals(
+        self,
+        origin_stop_ids: list[str],
+        destination_stop_ids: list[str],
+        trip_ids: Iterable[Any],
+        before_seconds: int,
+        limit: int = 5,
+    ) -> list[Departure]:
+        trip_ids = set(trip_ids)
+        templates = self.frequency_templates
+
+        # Latest arrivals first, each with its trip's last call at the origin
+        scheduled = self._first_rows(
+            "SELECT d.arrival_seconds,"
+            " (SELECT o.departure_time FROM stop_times o"
+            "  WHERE o.trip_id = d.trip_id AND o.stop_sequence < d.stop_sequence"
+            f"  AND o.stop_id IN ({_placeholders(origin_stop_ids)})"
+            "  AND o.departure_seconds IS NOT NULL"
+            "  ORDER BY o.stop_sequence DESC LIMIT 1),"
+            " COALESCE(d.arrival_time, d.departure_time), d.trip_id"
+            " FROM stop_times d"
+            f" WHERE d.stop_id IN ({_placeholders(destination_stop_ids)})"
+            " AND d.arrival_seconds <= ? ORDER BY d.arrival_seconds DESC",
+            [*origin_stop_ids, *destination_stop_ids, before_seconds],
+            lambda row: (
+                row[1] is not None and row[3] in trip_ids and row[3] not in templates
+            ),
+            limit,
+        )
+
+        latest = gtfs.merge_frequency_arrivals(
+            scheduled,
+            [
+                template
+                for trip_id, template in templates.items()
+                if trip_id in trip_ids
+            ],
+            origin_stop_ids,
+            destination_stop_ids,
+            before_seconds,
+            limit,
+        )
+        labels = self._trip_labels([row[3] for row in latest])
+        return gtfs.label_departures(latest, labels)
+
+    def _whole_patterns(self, trip_ids: set[Any]) -> set[int] | None:
+        """The patterns ``trip_ids`` make up, or ``None`` if they hold only
+        some trips of a pattern."""
+        counts = Counter(
+            self.trip_patterns[t] for t in trip_ids if t in self.trip_patterns
+        )
+        if any(n < self.pattern_sizes[p] for p, n in counts.items()):
+            return None
+        return set(counts)
+
+    def _scan_service_span(
+        self, stop_ids: list[str], trip_ids: set[Any]
+    ) -> list[tuple[tuple[int, str], tuple[int, str]]]:
+        """First and last departure of each of ``trip_ids`` calling at
+        ``stop_ids``, for trips that aren't whole patterns."""
+        templates = self.frequency_templates
+        spans = [
+            ((first_seconds, trip_id), (last_seconds, trip_id))
+            for trip_id, first_seconds, last_seconds in self._query(
+                "SELECT trip_id, MIN(departure_seconds), MAX(departure_seconds)"
+                f" FROM stop_times WHERE stop_id IN ({_placeholders(stop_ids)})"
+                " AND departure_seconds IS NOT NULL GROUP BY trip_id",
+                stop_ids,
+            )
+            if trip_id in trip_ids and trip_id not in templates
+        ]
+        for trip_id, template in templates.items():
+            start_span = template.start_span()
+            if trip_id not in trip_ids or start_span is None:
+                continue
+            offsets = [
+                template.departure_offsets[p]
+                for p, stop_id in enumerate(template.stop_ids)
+                if stop_id in stop_ids
+            ]
+            if offsets:
+                first_start, last_start = start_span
+                spans.append(
+                    (
+                        (first_start + min(offsets), trip_id),
+                        (last_start + max(offsets), trip_id),
+                    )
+                )
+        return spans
+
+    def service_span(
+        self, stop_ids: list[str], trip_ids: Iterable[Any]
+    ) -> tuple[Departure, Departure] | None:
+        trip_ids = set(trip_ids)
+        patterns = self._whole_patterns(trip_ids)
+        if patterns is None:
+            spans = self._scan_service_span(stop_ids, trip_ids)
+        else:
+            spans = [
+                ((first_seconds, first_trip), (last_seconds, last_trip))
+                for pattern, first_seconds, first_trip, last_seconds, last_trip in (
+                    self._query(
+                        "SELECT pattern, first_seconds, first_trip, last_seconds,"
+                        " last_trip FROM service_spans"
+                        f" WHERE stop_id IN ({_placeholders(stop_ids)})",
+                        stop_ids,
+                    )
+                )
+                if pattern in patterns
+            ]
+        if not spans:
+            return None
+        rows: list[tuple[int, str, str | None, Any]] = [
+            (seconds, gtfs.seconds_to_time(seconds), None, trip_id)
+            for seconds, trip_id in (
+                min(first for first, _ in spans),
+                max(last for _, last in spans),
+            )
+        ]
+        labels = self._trip_labels([row[3] for row in rows])
+        earliest, latest = gtfs.label_departures(rows, labels)
+        return earliest, latest
+
+    def find_next_trains(
+        self,
+        origin_station_id: str,
+        destination_station_id: str,
+        after_seconds: int,
+        target_date: date,
+        limit: int = 5,
+    ) -> list[Departure]:
+        service_ids = self.get_active_service_ids(target_date)
+        origin_platforms = self.get_platform_stops_for_station(origin_station_id)
+        dest_platforms = self.get_platform_stops_for_station(destination_station_id)
+        if not service_ids or not origin_platforms or not dest_platforms:
+            return []
+
+        templates = self.frequency_templates
+        scheduled = self._first_rows(
+            "SELECT o.departure_seconds, o.departure_time, d.arrival_time, o.trip_id"
+            " FROM stop_times o"
+            " JOIN stop_times d ON d.trip_id = o.trip_id"
+            " AND d.stop_sequence > o.stop_sequence"
+            " JOIN trips t ON t.trip_id = o.trip_id"
+            f" WHERE o.stop_id IN ({_placeholders(origin_platforms)})"
+            " AND o.departure_seconds >= ?"
+            f" AND d.stop_id IN ({_placeholders(dest_platforms)})"
+            f" AND t.service_id IN ({_placeholders(service_ids)})"
+            " ORDER BY o.departure_seconds",
+            [*origin_platforms, after_seconds, *dest_platforms, *service_ids],
+            lambda row: row[3] not in templates,
+            limit,
+        )
+
+        active_ids = set(self.active_trip_ids(templates, service_ids))
+        upcoming = gtfs.merge_frequency_departures(
+            scheduled,
+            [
+                template
+                for trip_id, template in templates.items()
+                if trip_id in active_ids
+            ],
+            origin_platforms,
+            after_seconds,
+            limit,
+            dest_platforms,
+        )
+        labels = self._trip_labels([row[3] for row in upcoming])
+        return gtfs.label_departures(upcoming, labels)
+
+
+def get_sqlite_path() -> Path:
+    """Location of the SQLite engine's database."""
+    path = os.environ.get("DART_MCP_SQLITE_PATH")
+    if path:
+        return Path(path)
+    return Path(tempfile.gettempdir()) / "dart-mcp" / "gtfs.sqlite"
+
+
+@lru_cache(maxsize=1)
+def get_sqlite_backend() -> SQLiteBackend:
+    """Open the SQLite engine for the bundled feed, building it on first use."""
+    return SQLiteBackend.from_feed(gtfs.get_gtfs_folder(), get_sqlite_path())
+
+
+def get_default_backend() -> StorageBackend:
+    """Return the storage engine selected by ``DART_MCP_STORAGE``."""
+    engine = os.environ.get("DART_MCP_STORAGE", "pandas").lower()
+    if engine == "sqlite":
+        return get_sqlite_backend()
+    if engine != "pandas":
+        raise ValueError(f"Unknown storage engine: {engine}")
+    return PandasBackend(gtfs.get_default_data())
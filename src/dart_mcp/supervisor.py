@@ -0,0 +1,316 @@
+"""Preload-and-fork supervisor for running the HTTP server on several cores.
+
+The parent process loads and indexes the GTFS feed once, binds the listening
+socket and then forks the workers, which inherit the loaded timetable as
+copy-on-write pages instead of each building their own copy.
+
+The parent then watches the feed folder. When the feed changes (or on
+``SIGHUP``) it loads the new feed, forks a fresh generation of workers on
+the same socket and only then asks the old generation to stop with
+``SIGTERM``. Uvicorn stops accepting on ``SIGTERM`` and finishes the
+requests in flight, while the new workers already accept connections, so no
+request is dropped during a rollover.
+
+Fork is only available on POSIX systems; elsewhere :func:`serve` runs a
+single uvicorn process.
+"""
+
+from __future__ import annotations
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from . import cache, feed_update, gtfs, storage
+
+# How often the parent checks the feed folder for changes
+DEFAULT_POLL_SECONDS = 60.0
+# How long a draining worker may take to finish its requests before SIGKILL
+DEFAULT_DRAIN_SECONDS = 30.0
+
+
+def _log(message: str) -> None:
+    print(f"[supervisor {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def feed_signature(gtfs_folder: Path) -> tuple[tuple[str, int, int], ...]:
+    """Cheap change marker for a feed folder: name, size and mtime of each
+    file."""
+    return tuple(
+        (path.name, stat.st_size, stat.st_mtime_ns)
+        for path in sorted(gtfs_folder.glob("*.txt"))
+        for stat in (path.stat(),)
+    )
+
+
+def watch_feed(gtfs_folder: Path) -> Callable[[], str]:
+    """Return a callable giving the current version of the feed in
+    ``gtfs_folder``. The files are only hashed again when their
+    :func:`feed_signature` changes, so touching a file doesn't trigger a
+    rollover but polling stays cheap."""
+    last: dict[tuple[tuple[str, int, int], ...], str] = {}
+
+    def version() -> str:
+        signature = feed_signature(gtfs_folder)
+        if signature not in last:
+            last.clear()
+            last[signature] = gtfs.compute_feed_version(gtfs_folder)
+        return last[signature]
+
+    return version
+
+
+def preload_feed() -> str | None:
+    """Load the feed for the configured storage engine in this process.
+
+    The in-memory engine loads every table and index, lazy loading
+    notwithstanding, so that all workers share them. When a previous feed is
+    loaded, only what changed since is read and indexed again (see
+    :mod:`dart_mcp.feed_update`). Result caches from a previous feed are
+    dropped. SQLite connections must not cross a fork, so for that engine
+    the database is only built here and every worker opens its own
+    connection. Returns the loaded feed version.
+    """
+    storage.get_sqlite_backend.cache_clear()
+    cache.get_result_cache.cache_clear()
+    diff = feed_update.refresh_default_data()
+    if diff is not None:
+        _log(diff.summary())
+
+    backend = storage.get_default_backend()
+    feed_version = backend.feed_version
+    if isinstance(backend, storage.PandasBackend):
+        # Load everything the workers might need before they share it
+        backend.data.load_all()
+    elif isinstance(backend, storage.SQLiteBackend):
+        backend.close()
+        storage.get_sqlite_backend.cache_clear()
+
+    # Move the loaded objects out of the collector's reach so that garbage
+    # collections in the workers don't dirty the shared pages
+    gc.collect()
+    gc.freeze()
+    return feed_version
+
+
+class Supervisor:
+    """Fork and supervise generations of worker processes.
+
+    ``target`` is run in each forked worker. ``load`` is called in the
+    parent before each generation is forked, and a new generation is started
+    whenever ``signature`` returns a different value (see :func:`watch_feed`).
+    """
+
+    def __init__(
+        self,
+        target: Callable[[], Any],
+        workers: int = 2,
+        load: Callable[[], Any] = preload_feed,
+        signature: Callable[[], Any] | None = None,
+        poll_seconds: float = DEFAULT_POLL_SECONDS,
+        drain_seconds: float = DEFAULT_DRAIN_SECONDS,
+    ) -> None:
+        self.target = target
+        self.workers = workers
+        self.load = load
+        self.signature = signature
+        self.poll_seconds = poll_seconds
+        self.drain_seconds = drain_seconds
+        self.generation = 0
+        self.current: set[int] = set()
+        # Old-generation worker pids mapped to the time they get killed
+        self.draining: dict[int, float] = {}
+        self._seen_signature: Any = None
+        self._reload_requested = False
+        self._stopping = False
+
+    def spawn(self) -> int:
+        """Fork one worker of the current generation."""
+        pid = os.fork()
+        if pid == 0:
+            # The worker must never return into the supervisor loop
+            code = 0
+            try:
+                for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                    signal.signal(sig, signal.SIG_DFL)
+                self.target()
+            except BaseException:
+                code = 1
+                import traceback
+
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        self.current.add(pid)
+        return pid
+
+    def start(self) -> None:
+        """Load the feed and fork the first generation.
+
+        A feed that fails to load is reported but doesn't stop the workers
+        from starting; they load it on demand like a single process would.
+        """
+        self._seen_signature = self.signature() if self.signature else None
+        try:
+            self.load()
+        except Exception as e:
+            _log(f"could not preload the feed: {e}")
+        self._fork_generation()
+
+    def _fork_generation(self) -> None:
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        _log(f"generation {self.generation}: workers {sorted(self.current)}")
+
+    def rollover(self) -> bool:
+        """Load the feed again and replace the workers with a new generation.
+
+        The old workers are only signalled once the new ones are forked, and
+        they get ``drain_seconds`` to finish before being killed. If loading
+        fails the current generation keeps serving and ``False`` is returned.
+        """
+        try:
+            self.load()
+        except Exception as e:
+            _log(f"feed reload failed, keeping generation {self.generation}: {e}")
+            return False
+
+        old = self.current
+        self.current = set()
+        self._fork_generation()
+
+        deadline = time.monotonic() + self.drain_seconds
+        for pid in old:
+            self._signal(pid, signal.SIGTERM)
+            self.draining[pid] = deadline
+        return True
+
+    def poll(self, check_feed: bool = True) -> None:
+        """Reap exited workers, replace crashed ones and, with
+        ``check_feed``, roll over to a changed feed. Called periodically by
+        :meth:`run`."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.draining.pop(pid, None) is not None:
+                continue
+            if pid in self.current:
+                self.current.discard(pid)
+                if not self._stopping:
+                    _log(f"worker {pid} exited with status {status}, respawning")
+                    self.spawn()
+
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now >= deadline:
+                self._signal(pid, signal.SIGKILL)
+
+        if self._stopping:
+            return
+        if self._reload_requested:
+            self._reload_requested = False
+            self.rollover()
+        elif check_feed and self.signature is not None:
+            seen = self.signature()
+            if seen != self._seen_signature and self.rollover():
+                self._seen_signature = seen
+
+    def stop(self) -> None:
+        """Stop every worker, giving them ``drain_seconds`` to finish."""
+        self._stopping = True
+        deadline = time.monotonic() + self.drain_seconds
+        for pid in self.current:
+            self._signal(pid, signal.SIGTERM)
+            self.draining[pid] = deadline
+        self.current = set()
+        while self.draining:
+            self.poll()
+            time.sleep(0.05)
+
+    def run(self) -> None:
+        """Start the workers and supervise them until SIGTERM or SIGINT."""
+
+        def request_stop(signum: int, frame: Any) -> None:
+            self._stopping = True
+
+        def request_reload(signum: int, frame: Any) -> None:
+            self._reload_requested = True
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGHUP, request_reload)
+
+        self.start()
+        next_check = time.monotonic() + self.poll_seconds
+        try:
+            while not self._stopping:
+                time.sleep(0.5)
+                check_feed = time.monotonic() >= next_check
+                self.poll(check_feed)
+                if check_feed:
+                    next_check = time.monotonic() + self.poll_seconds
+        finally:
+            self.stop()
+
+    @staticmethod
+    def _signal(pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Bind the listening socket shared by every worker generation."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(
+    app: Any,
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: int = 1,
+    poll_seconds: float = DEFAULT_POLL_SECONDS,
+    drain_seconds: float = DEFAULT_DRAIN_SECONDS,
+) -> None:
+    """Serve ``app`` with ``workers`` preloaded, forked uvicorn workers."""
+    import uvicorn
+
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(app, host=host, port=port)
+        return
+
+    sock = bind_socket(host, port)
+    config = uvicorn.Config(
+        app, timeout_graceful_shutdown=int(drain_seconds), log_level="info"
+    )
+
+    def worker() -> None:
+        uvicorn.Server(config).run(sockets=[sock])
+
+    supervisor = Supervisor(
+        worker,
+        workers=workers,
+        signature=watch_feed(gtfs.get_gtfs_folder()),
+        poll_seconds=poll_seconds,
+        drain_seconds=drain_seconds,
+    )
+    _log(f"serving on {host}:{port} with {workers} workers")
+    supervisor.run()
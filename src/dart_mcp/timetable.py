@@ -0,0 +1,133 @@
+"""Columnar timetable files shared zero-copy between server processes.
+
+The hot per-call arrays of a feed (:class:`~dart_mcp.gtfs.TripLayout`, the
+:class:`~dart_mcp.gtfs.DepartureIndex` and the
+:class:`~dart_mcp.gtfs.Connections`) are written once as ``.npy`` files and
+memory-mapped read-only by every worker. The operating system then keeps a
+single copy of them in the page cache however many workers are running, and
+a restarted worker skips parsing stop_times.txt altogether.
+
+A timetable directory is named after the format and feed version, so a new
+feed or a layout change simply writes a new directory next to the old one.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from . import gtfs
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment]
+
+# Bump whenever the arrays written below change meaning or dtype
+TIMETABLE_FORMAT = 1
+
+_LAYOUT_ARRAYS = ("offsets", "trips", "stops", "sequences", "arrivals", "departures")
+_DEPARTURE_ARRAYS = ("offsets", "seconds", "rows")
+_CONNECTION_ARRAYS = ("departures", "arrivals", "from_stops", "to_stops", "trips")
+
+
+def timetable_path(root: str | Path, feed_version: str) -> Path:
+    """Directory holding the timetable of ``feed_version`` under ``root``."""
+    return Path(root) / f"timetable-v{TIMETABLE_FORMAT}-{feed_version}"
+
+
+def _json_default(value: Any) -> Any:
+    # IDs read by pandas may be numpy scalars
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__} in a timetable")
+
+
+def save_timetable(data: gtfs.GTFSData, path: str | Path) -> Path:
+    """Write the timetable arrays of ``data`` to the directory ``path``.
+
+    The files are written to a temporary directory that is renamed into
+    place, so readers never see a partial timetable. When several workers
+    race to save the same feed, the first rename wins and the others discard
+    their copy.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    layout, departures, connections = (
+        data.trip_layout,
+        data.departures,
+        data.connections,
+    )
+
+    staging = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        for name in _LAYOUT_ARRAYS:
+            np.save(staging / f"layout_{name}.npy", getattr(layout, name))
+        for name in _DEPARTURE_ARRAYS:
+            np.save(staging / f"departures_{name}.npy", getattr(departures, name))
+        for name in _CONNECTION_ARRAYS:
+            np.save(staging / f"connections_{name}.npy", getattr(connections, name))
+
+        ids = {
+            "trip_ids": layout.trip_ids,
+            "stop_ids": layout.stop_ids,
+            "departure_stops": sorted(
+                departures.index, key=departures.index.__getitem__
+            ),
+        }
+        with open(staging / "ids.json", "w") as f:
+            json.dump(ids, f, default=_json_default)
+
+        try:
+            os.rename(staging, path)
+        except OSError:
+            if not path.exists():
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return path
+
+
+def attach_timetable(data: gtfs.GTFSData, path: str | Path) -> None:
+    """Replace the timetable arrays of ``data`` with memory maps of ``path``.
+
+    The arrays are mapped read-only; only the ID lists and lookup dicts are
+    rebuilt in process memory.
+    """
+    path = Path(path)
+
+    def load(name: str) -> np.ndarray:
+        array: np.ndarray = np.load(path / f"{name}.npy", mmap_mode="r")
+        return array
+
+    with open(path / "ids.json") as f:
+        ids = json.load(f)
+    trip_ids, stop_ids = ids["trip_ids"], ids["stop_ids"]
+    stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+
+    layout = gtfs.TripLayout(
+        trip_ids=trip_ids,
+        trip_index={str(trip_id): t for t, trip_id in enumerate(trip_ids)},
+        stop_ids=stop_ids,
+        stop_index=stop_index,
+        **{name: load(f"layout_{name}") for name in _LAYOUT_ARRAYS},
+    )
+    departures = gtfs.DepartureIndex(
+        index={stop_id: i for i, stop_id in enumerate(ids["departure_stops"])},
+        **{name: load(f"departures_{name}") for name in _DEPARTURE_ARRAYS},
+    )
+    connections = gtfs.Connections(
+        stop_ids=stop_ids,
+        stop_index=stop_index,
+        trip_ids=trip_ids,
+        trip_services=gtfs.trip_service_ids(data.trips, trip_ids),
+        **{name: load(f"connections_{name}") for name in _CONNECTION_ARRAYS},
+    )
+
+    data.trip_layout = layout
+    data.departures = departures
+    data.connections = connections
@@ -0,0 +1,117 @@
+"""Background warmup of the GTFS data, indexes and caches.
+
+The HTTP server starts answering liveness checks straight away while a
+:class:`Warmup` loads the feed in a background thread. Readiness is reported
+separately, so load balancers only route traffic to warm workers, and
+requests that arrive during warmup wait for it instead of each starting a
+load of their own.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from . import cache, storage
+from .memory import process_rss
+
+# How long a request waits for warmup before being turned away
+DEFAULT_WAIT_SECONDS = 30.0
+
+
+def warm_backend(
+    load_backend: Callable[[], storage.StorageBackend] = storage.get_default_backend,
+) -> dict[str, Any]:
+    """Load a storage engine (default: the one ``DART_MCP_STORAGE`` selects),
+    build its indexes and open the result cache. The in-memory engine loads
+    every table and index, lazy loading notwithstanding, so the first query
+    after warmup doesn't pay for them. Returns a few counts describing what
+    was loaded, and the process RSS in bytes before and after."""
+    rss_before = process_rss()
+    backend = load_backend()
+    if isinstance(backend, storage.PandasBackend):
+        backend.data.load_all()
+    stations = backend.list_all_stations()
+    catalog = backend.route_catalog
+    cache.get_result_cache()
+    return {
+        "engine": backend.name,
+        "feed_version": backend.feed_version,
+        "stations": len(stations),
+        "routes": len(catalog.routes),
+        "rss_before": rss_before,
+        "rss_after": process_rss(),
+    }
+
+
+class Warmup:
+    """Run ``load`` once in a background thread and track its progress.
+
+    :meth:`start` is idempotent, so both the startup hook and the first
+    request may call it.
+    """
+
+    def __init__(self, load: Callable[[], dict[str, Any]] = warm_backend):
+        self.load = load
+        self.state = "pending"
+        self.error: str | None = None
+        self.details: dict[str, Any] = {}
+        self.seconds: float | None = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    @property
+    def finished(self) -> bool:
+        """Whether warmup ended, successfully or not."""
+        return self._done.is_set()
+
+    def start(self) -> None:
+        """Start warming up in the background, unless already started."""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.state = "warming"
+        threading.Thread(target=self._run, name="dart-mcp-warmup", daemon=True).start()
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.details = self.load() or {}
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            print(f"⚠️  Warmup failed: {e}", file=sys.stderr)
+        finally:
+            self.seconds = round(time.perf_counter() - started, 3)
+            self._done.set()
+        if self.ready:
+            print(
+                f"✅ Warmup finished in {self.seconds}s: {self.details}",
+                file=sys.stderr,
+            )
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for warmup to finish without
+        blocking the event loop. Returns whether it has finished."""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while not self._done.is_set() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self._done.is_set()
+
+    def status(self) -> dict[str, Any]:
+        """Readiness report for the ``/ready`` endpoint."""
+        report: dict[str, Any] = {"status": self.state, "seconds": self.seconds}
+        if self.error:
+            report["error"] = self.error
+        report.update(self.details)
+        return report
@@ -15,20 +15,20 @@ def main():
     print(f"🌐 Environment: {os.environ.get('RAILWAY_ENVIRONMENT', 'local')}")
     
     try:
-        # Try to import and start the simple server
-        from dart_mcp.simple_server import app
-        print("✅ Successfully imported simple server")
+        # The app built by the shared factory, around one preloaded engine
+        from dart_mcp.remote_server import app
+        print("✅ Successfully imported server app")
         
-        import uvicorn
-        print("✅ Successfully imported uvicorn")
+        from dart_mcp.supervisor import serve
+        print("✅ Successfully imported supervisor")
         
-        print(f"🎯 Starting server on {host}:{port}")
-        uvicorn.run(
+        workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+        print(f"🎯 Starting server on {host}:{port} with {workers} worker(s)")
+        serve(
             app, 
             host=host, 
             port=int(port), 
-            workers=1,
-            log_level="info"
+            workers=workers,
         )
         
     except ImportError as e:
@@ -69,3 +69,100 @@ T1,08:50:00,08:50:00,UNI1,2
 
     monkeypatch.setattr(gtfs, "get_default_data", lambda: data)
     return data
+
+
+@pytest.fixture
+def network_gtfs():
+    """A small two-route network with a walkable transfer between C and D.
+
+    Route R1 runs A -> B -> C, route R2 runs D -> E; C and D are ~30m apart.
+    """
+    stops_csv = """stop_id,stop_name,location_type,parent_station,stop_lat,stop_lon
+A,Stop A,0,,41.6000,-93.6000
+B,Stop B,0,,41.6000,-93.5900
+C,Stop C,0,,41.6000,-93.5800
+D,Stop D,0,,41.6003,-93.5800
+E,Stop E,0,,41.6000,-93.5600
+"""
+    all_stops_df = pd.read_csv(StringIO(stops_csv))
+    all_stops_df["stop_id"] = all_stops_df["stop_id"].astype(str)
+    all_stops_df["parent_station_str"] = None
+
+    cal_csv = """service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date
+WEEKDAY,1,1,1,1,1,0,0,20250101,20251231
+"""
+    trips_csv = """route_id,service_id,trip_id,trip_headsign,trip_short_name,direction_id
+R1,WEEKDAY,R1a,Stop C,,0
+R1,WEEKDAY,R1b,Stop C,,0
+R2,WEEKDAY,R2a,Stop E,,0
+R2,WEEKDAY,R2b,Stop E,,0
+R3,WEEKDAY,R3a,Stop E,,0
+"""
+    st_csv = """trip_id,arrival_time,departure_time,stop_id,stop_sequence
+R1a,08:00:00,08:00:00,A,1
+R1a,08:10:00,08:10:00,B,2
+R1a,08:20:00,08:20:00,C,3
+R1b,08:30:00,08:30:00,A,1
+R1b,08:40:00,08:40:00,B,2
+R1b,08:50:00,08:50:00,C,3
+R2a,08:25:00,08:25:00,D,1
+R2a,08:40:00,08:40:00,E,2
+R2b,08:05:00,08:05:00,D,1
+R2b,08:20:00,08:20:00,E,2
+R3a,09:30:00,09:30:00,B,1
+R3a,09:45:00,09:45:00,E,2
+"""
+    stop_times_df = pd.read_csv(StringIO(st_csv))
+    stop_times_df["stop_id"] = stop_times_df["stop_id"].astype(str)
+
+    return gtfs.GTFSData(
+        all_stops=all_stops_df,
+        stations=all_stops_df[all_stops_df.location_type == 1].copy(),
+        trips=pd.read_csv(StringIO(trips_csv)),
+        stop_times=stop_times_df,
+        calendar=pd.read_csv(StringIO(cal_csv)),
+        station_to_platform_stops={},
+    )
+
+
+# A small feed on disk, for tests that exercise the loaders
+FEED = {
+    "stops.txt": """stop_id,stop_name,location_type,parent_station
+DCS,DART CENTRAL STATION,1,
+DCS1,DART CENTRAL STATION Platform 1,0,DCS
+UNI,University,1,
+UNI1,University Platform 1,0,UNI
+""",
+    "routes.txt": """route_id,route_short_name,route_long_name
+1,1,University
+""",
+    "trips.txt": """route_id,service_id,trip_id,trip_headsign,trip_short_name
+1,WEEKDAY,T1,University,UNI
+1,WEEKDAY,T2,University,
+1,WEEKDAY,F1,University,
+""",
+    "stop_times.txt": """trip_id,arrival_time,departure_time,stop_id,stop_sequence
+T1,08:00:00,08:00:00,DCS1,1
+T1,08:50:00,08:50:00,UNI1,2
+T2,11:00:00,11:00:00,DCS1,1
+T2,11:40:00,11:40:00,UNI1,2
+F1,06:00:00,06:00:00,DCS1,1
+F1,06:20:00,06:20:00,UNI1,2
+""",
+    "calendar.txt": """service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date
+WEEKDAY,1,1,1,1,1,0,0,20250101,20251231
+""",
+    "frequencies.txt": """trip_id,start_time,end_time,headway_secs
+F1,09:00:00,09:30:00,600
+""",
+}
+
+
+@pytest.fixture
+def feed_folder(tmp_path):
+    """Write :data:`FEED` to a temporary GTFS folder."""
+    folder = tmp_path / "feed"
+    folder.mkdir()
+    for name, text in FEED.items():
+        (folder / name).write_text(text)
+    return folder
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from dart_mcp import remote_server
+from dart_mcp.admission import Overloaded, Pool
+
+
+@pytest.mark.asyncio
+async def test_pool_queues_then_sheds():
+    pool = Pool("test", concurrency=1, queue_size=1, max_wait=5)
+    await pool.acquire()
+
+    waiting = asyncio.ensure_future(pool.acquire())
+    await asyncio.sleep(0)
+    assert pool.queued == 1
+
+    with pytest.raises(Overloaded, match="queue_full"):
+        await pool.acquire()
+
+    # Releasing hands the slot straight to the queued request
+    pool.release()
+    await waiting
+    assert (pool.active, pool.queued, pool.admitted) == (1, 0, 2)
+    pool.release()
+    assert pool.active == 0
+    assert pool.shed == {"queue_full": 1}
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_is_bounded():
+    pool = Pool("test", concurrency=1, queue_size=4, max_wait=0.05)
+    await pool.acquire()
+
+    with pytest.raises(Overloaded, match="timeout"):
+        await pool.acquire()
+    assert pool.queued == 0
+    assert pool.shed == {"timeout": 1}
+
+
+def test_busy_endpoint_is_shed(monkeypatch):
+    client = TestClient(remote_server.app)
+    routing = remote_server.app.state.engine.pools["routing"]
+    monkeypatch.setattr(routing, "concurrency", 0)
+    monkeypatch.setattr(routing, "queue_size", 0)
+
+    response = client.post(
+        "/mcp/travel_time_matrix", json={"origins": ["A"], "destinations": ["B"]}
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert response.json()["success"] is False
+
+    # Cheap lookups have their own pool and still get through
+    assert client.get("/mcp/stations").status_code == 200
+
+    metrics = client.get("/metrics").text
+    assert (
+        'dart_mcp_admission_shed_total{pool="routing",reason="queue_full"}' in metrics
+    )
+    assert 'dart_mcp_admission_queued{pool="lookup"} 0' in metrics
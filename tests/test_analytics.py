@@ -0,0 +1,70 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from dart_mcp import analytics, gtfs
+
+
+def test_summarize_departures():
+    seconds = np.array([8 * 3600 + 1800, 7 * 3600, 8 * 3600, 8 * 3600 + 3000])
+    result = analytics.summarize_departures("Stop", seconds)
+    assert (result.first_departure, result.last_departure) == ("07:00:00", "08:50:00")
+    assert result.departures == 4
+    assert (result.mean_headway_minutes, result.max_headway_minutes) == (36.7, 60.0)
+    assert [(h.hour, h.departures) for h in result.hours] == [(7, 1), (8, 3)]
+    # Headways count toward the hour of the departure ending them
+    assert result.hours[0].mean_headway_minutes is None
+    assert result.hours[1].mean_headway_minutes == 36.7
+    assert result.hours[1].max_headway_minutes == 60.0
+
+
+def test_service_frequency_counts_headway_based_trips(feed_folder):
+    data = gtfs.load_gtfs_data(feed_folder)
+    (at_stop,) = analytics.service_frequency(data, "weekday", stop="DART Central")
+    # T1 at 08:00, F1 every 10 minutes from 09:00 to 09:30, T2 at 11:00
+    assert at_stop.departures == 5
+    assert [(h.hour, h.departures) for h in at_stop.hours] == [(8, 1), (9, 3), (11, 1)]
+    assert at_stop.max_headway_minutes == 100.0
+
+    (by_route,) = analytics.service_frequency(data, date(2025, 1, 1), route="1")
+    assert by_route.label == "Route 1, direction 0 (to University)"
+    assert by_route.first_departure == "08:00:00"
+    assert by_route.departures == 5
+
+    assert analytics.service_frequency(data, "saturday", route="1") == []
+    again = analytics.service_frequency(data, "weekday", stop="DART Central")
+    assert again == [at_stop]
+
+    with pytest.raises(ValueError, match="Unknown day"):
+        analytics.service_frequency(data, "someday", route="1")
+    with pytest.raises(ValueError, match="not found"):
+        analytics.service_frequency(data, "weekday", stop="Narnia")
+
+
+def test_segment_times_by_hour_band(feed_folder):
+    data = gtfs.load_gtfs_data(feed_folder)
+    # Built with the other indexes at load time
+    assert "segment_times" in data.build_seconds
+
+    rows = analytics.route_segment_times(data, "1")
+    assert [(r["hour_band"], r["trips"]) for r in rows] == [
+        ("am_peak", 1),
+        ("midday", 4),
+    ]
+    midday = rows[1]
+    assert (midday["from_stop_id"], midday["to_stop_id"]) == ("DCS1", "UNI1")
+    assert midday["to_stop"] == "University Platform 1"
+    # T2 takes 40 minutes, each of the three F1 instances 20
+    assert (
+        midday["min_minutes"],
+        midday["median_minutes"],
+        midday["p90_minutes"],
+    ) == (20.0, 20.0, 34.0)
+
+    assert analytics.route_segment_times(data, "1", hour_band="evening") == []
+    assert analytics.route_segment_times(data, "1", direction=1) == []
+    with pytest.raises(ValueError, match="Unknown hour band"):
+        analytics.route_segment_times(data, "1", hour_band="rush")
+    with pytest.raises(ValueError, match="not found"):
+        analytics.route_segment_times(data, "99")
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import pytest
+
+from dart_mcp import cache, gtfs, server
+
+
+@pytest.fixture
+def result_cache(tmp_path, monkeypatch):
+    """Enable the persistent cache for one test"""
+    monkeypatch.setenv("DART_MCP_CACHE", str(tmp_path / "results.db"))
+    cache.get_result_cache.cache_clear()
+    yield cache.get_result_cache()
+    cache.get_result_cache().close()
+    cache.get_result_cache.cache_clear()
+
+
+def test_make_key_normalizes_queries():
+    key = cache.make_key("next_trains", {"origin": " DART ", "destination": "Uni"})
+    assert key == cache.make_key(
+        "next_trains", {"destination": "Uni", "origin": "DART"}
+    )
+    assert key != cache.make_key("next_trains", {"origin": "DART", "destination": "X"})
+
+
+def test_results_are_shared_and_tied_to_the_feed(tmp_path):
+    path = tmp_path / "results.db"
+    first = cache.ResultCache(path, "v1")
+    first.put("k", {"departures": ["08:00:00"]})
+
+    # Another process opening the same file sees the entry
+    second = cache.ResultCache(path, "v1")
+    assert second.get("k") == {"departures": ["08:00:00"]}
+    assert second.get("missing") is None
+
+    # A new feed version invalidates everything computed for the old one
+    third = cache.ResultCache(path, "v2")
+    assert third.get("k") is None
+    assert len(third) == 0
+    for c in (first, second, third):
+        c.close()
+
+
+def test_cache_is_size_bounded(tmp_path):
+    results = cache.ResultCache(tmp_path / "results.db", "v1", max_entries=10)
+    for n in range(25):
+        results.put(f"k{n}", n)
+    assert len(results) <= 10
+    assert results.get("k24") == 24
+    assert results.get("k0") is None
+    results.close()
+
+
+@pytest.mark.asyncio
+async def test_tools_consult_the_cache(result_cache, monkeypatch):
+    msg = await server.next_trains("DART", "University", "2025-01-01T07:00:00")
+    assert "08:00:00" in msg
+    assert len(result_cache) == 1
+
+    # A warm cache answers without touching the timetable
+    def fail():
+        raise AssertionError("GTFS data should not be needed")
+
+    monkeypatch.setattr(gtfs, "get_default_data", fail)
+    assert await server.next_trains("DART", "University", "2025-01-01T07:00:00") == msg
+
+    # Errors are never cached
+    assert (await server.list_stations()).startswith("Error:")
+    assert len(result_cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_now_is_truncated_only_in_the_key(result_cache, monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls(2025, 1, 1, 7, 59, 30)
+
+    monkeypatch.setattr(server, "datetime", FrozenDatetime)
+    board = await server.next_trains("DART", "University", output_format="json")
+    assert board["current_time"] == "07:59:30"
+    assert len(result_cache) == 1
+    key = cache.make_key(
+        "next_trains",
+        {
+            "origin": "DART",
+            "destination": "University",
+            "when_iso": "2025-01-01T07:59:00",
+            "output_format": "json",
+            "arrive_by": False,
+        },
+    )
+    assert result_cache.get(key) == board
@@ -0,0 +1,57 @@
+from datetime import date
+
+from dart_mcp import gtfs
+from dart_mcp.compaction import compact_feed
+
+
+def test_compact_feed(feed_folder, tmp_path):
+    with open(feed_folder / "calendar.txt", "a") as f:
+        f.write("OLD,1,1,1,1,1,0,0,20240101,20241231\n")
+        f.write("NEVER,0,0,0,0,0,0,0,20250101,20251231\n")
+    with open(feed_folder / "trips.txt", "a") as f:
+        f.write("1,OLD,X1,University,\n2,NEVER,X2,Altoona,\n")
+    with open(feed_folder / "stop_times.txt", "a") as f:
+        f.write("X1,07:00:00,07:00:00,DCS2,1\nX1,07:30:00,07:30:00,UNI1,2\n")
+        f.write("X2,07:00:00,07:00:00,ALT1,1\n")
+    with open(feed_folder / "stops.txt", "a") as f:
+        f.write("DCS2,DART CENTRAL STATION Platform 1,0,DCS\nALT1,Altoona,0,\n")
+    with open(feed_folder / "routes.txt", "a") as f:
+        f.write("2,2,Altoona\n")
+    (feed_folder / "shapes.txt").write_text("shape_id,shape_pt_lat\nS1,41.5\n")
+
+    out = tmp_path / "compact"
+    report = compact_feed(feed_folder, out, as_of=date(2025, 6, 1))
+
+    assert report.dropped_services == ["NEVER", "OLD"]
+    assert report.dropped_files == ["shapes.txt"]
+    assert report.rows_after["trips.txt"] == 3
+    assert report.rows_after["routes.txt"] == 1
+    assert report.rows_after["stop_times.txt"] == 6
+    assert report.service_end == date(2025, 12, 31)
+    assert not report.expired
+    assert report.bytes_after < report.bytes_before
+    assert "stop_times.txt: 9 -> 6 rows" in report.summary()
+    assert not (out / "shapes.txt").exists()
+    # DCS2 duplicated DCS1 and ALT1 was only served by the dropped trip
+    assert (out / "stops.txt").read_text().splitlines()[1:] == [
+        "DCS,DART CENTRAL STATION,1,",
+        "DCS1,DART CENTRAL STATION Platform 1,0,DCS",
+        "UNI,University,1,",
+        "UNI1,University Platform 1,0,UNI",
+    ]
+    assert report.merged_stops == 1
+
+    data = gtfs.load_gtfs_data(out)
+    assert gtfs.find_trips_serving(["DCS1"], data) == {"T1", "T2", "F1"}
+    assert data.service_end == date(2025, 12, 31)
+
+
+def test_expired_feed_is_kept_and_reported(feed_folder, tmp_path):
+    report = compact_feed(feed_folder, tmp_path / "compact", as_of=date(2026, 3, 1))
+
+    assert report.expired
+    assert report.dropped_services == []
+    assert report.rows_after["trips.txt"] == 3
+    assert "WARNING: feed expired, its last service day was 2025-12-31" in (
+        report.summary()
+    )
@@ -0,0 +1,125 @@
+from datetime import date
+
+import numpy as np
+
+from dart_mcp import feed_update, gtfs, storage, timetable
+
+
+def edit(folder, name, old="", new="", append=""):
+    path = folder / name
+    path.write_text(path.read_text().replace(old, new) + append)
+
+
+def engine_results(data):
+    engine = storage.PandasBackend(data)
+    wednesday = date(2025, 1, 1)
+    return [
+        (
+            engine.find_departures(["DCS1"], ["T1", "T2", "T3", "F1"], after),
+            engine.find_next_trains("DCS", "UNI", after, wednesday),
+            engine.trips_serving(["UNI1"]),
+        )
+        for after in (0, 9 * 3600, 11 * 3600)
+    ]
+
+
+def stop_calls(index, layout):
+    """The (time, trip ID) calls of ``index`` per stop, independent of how
+    the trip layout numbers its rows."""
+    calls = {}
+    for stop_id, slot in index.index.items():
+        start, end = index.offsets[slot], index.offsets[slot + 1]
+        trips = layout.trips[index.rows[start:end]]
+        seconds = index.seconds[start:end].tolist()
+        if seconds:
+            calls[stop_id] = [
+                (seconds[i], str(layout.trip_ids[trips[i]])) for i in range(end - start)
+            ]
+    return calls
+
+
+def test_update_patches_changed_trips(feed_folder, monkeypatch):
+    data = gtfs.load_gtfs_data(feed_folder)
+    before = engine_results(data)
+    # T2 arrives later, T3 is new, nothing else changes
+    edit(
+        feed_folder,
+        "stop_times.txt",
+        "T2,11:40:00,11:40:00",
+        "T2,11:45:00,11:45:00",
+        append="T3,12:00:00,12:00:00,DCS1,1\nT3,12:30:00,12:30:00,UNI1,2\n",
+    )
+    edit(feed_folder, "trips.txt", append="1,WEEKDAY,T3,University,\n")
+
+    read = []
+    read_csv = gtfs.pd.read_csv
+    monkeypatch.setattr(
+        gtfs.pd,
+        "read_csv",
+        lambda path, **kw: read.append(path.name) or read_csv(path, **kw),
+    )
+    updated, diff = feed_update.update_gtfs_data(data)
+    assert sorted(read) == ["stop_times.txt", "trips.txt"]
+    assert diff.files == ("stop_times.txt", "trips.txt")
+    assert diff.trips == feed_update.KeyDiff(added=frozenset({"T3"}))
+    assert diff.stop_times == feed_update.KeyDiff(
+        added=frozenset({"T3"}), changed=frozenset({"T2"})
+    )
+    assert not diff.stops and not diff.services
+    assert diff.patched == ("trip_layout", "departures", "arrivals")
+    assert "departures" not in diff.rebuilt
+    assert "footpaths" in diff.kept
+    assert updated.footpaths is data.footpaths
+    assert updated.feed_version == gtfs.compute_feed_version(feed_folder)
+
+    # The patched data answers like a fresh load; the old data is untouched
+    fresh = gtfs.load_gtfs_data(feed_folder)
+    assert engine_results(updated) == engine_results(fresh)
+    assert engine_results(data) == before
+    layout = updated.trip_layout
+    assert layout.arrivals[layout.calls("T2")].tolist() == [39600, 42300]
+    for name in ("departures", "arrivals"):
+        assert stop_calls(getattr(updated, name), layout) == stop_calls(
+            getattr(fresh, name), fresh.trip_layout
+        )
+    assert stop_calls(updated.arrivals, layout)["UNI1"][-2:] == [
+        (42300, "T2"),
+        (45000, "T3"),
+    ]
+
+    again, diff = feed_update.update_gtfs_data(updated)
+    assert again is updated and not diff.files
+    assert "up to date" in diff.summary()
+
+
+def test_calendar_update_keeps_timetable(feed_folder, tmp_path):
+    data = gtfs.load_gtfs_data(feed_folder, timetable_dir=tmp_path / "tt")
+    assert data.service_end == date(2025, 12, 31)
+    edit(feed_folder, "calendar.txt", "20251231", "20260630")
+
+    updated, diff = feed_update.update_gtfs_data(data, timetable_dir=tmp_path / "tt")
+    assert diff.services == feed_update.KeyDiff(changed=frozenset({"WEEKDAY"}))
+    assert "service_end" in diff.rebuilt
+    assert {"trip_layout", "departures", "connections"} <= set(diff.kept)
+    assert updated.service_end == date(2026, 6, 30)
+    assert data.service_end == date(2025, 12, 31)
+    # The new feed version gets its own mapped timetable
+    path = timetable.timetable_path(tmp_path / "tt", updated.feed_version)
+    assert (path / "ids.json").exists()
+    assert isinstance(updated.trip_layout.departures, np.memmap)
+
+
+def test_refresh_default_data(feed_folder, monkeypatch):
+    monkeypatch.undo()
+    assert feed_update.refresh_default_data() is None
+
+    data = gtfs.load_gtfs_data(feed_folder)
+    gtfs.set_default_data(data)
+    try:
+        edit(feed_folder, "stops.txt", "University,1", "UNT Dallas,1")
+        diff = feed_update.refresh_default_data()
+        assert diff.files == ("stops.txt",)
+        assert diff.stops == feed_update.KeyDiff(changed=frozenset({"UNI"}))
+        assert gtfs.get_default_data().stop_names["UNI"] == "UNT Dallas"
+    finally:
+        gtfs.set_default_data(None)
@@ -1,5 +1,9 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 from datetime import date
 
+import pandas as pd
 import pytest
 
 from dart_mcp import gtfs
@@ -82,3 +86,208 @@ def test_find_next_trains_edge_cases(fake_gtfs):
     # Nonexistent stations (should return empty due to no platforms)
     trains = gtfs.find_next_trains("999", "UNI", 0, date(2025, 1, 1), fake_gtfs)
     assert trains == []
+
+
+def test_build_footpaths_grid_and_transfers():
+    """Nearby stops get walking links; transfers.txt overrides and removes them"""
+    stops = pd.DataFrame(
+        {
+            "stop_id": ["A", "B", "C", "D"],
+            "stop_lat": [41.5800, 41.5810, 41.6000, 41.5805],
+            "stop_lon": [-93.6000, -93.6000, -93.6000, -93.6001],
+            "location_type": [0, 0, 0, 0],
+        }
+    )
+    transfers = pd.DataFrame(
+        {
+            "from_stop_id": ["A", "A", "C"],
+            "to_stop_id": ["B", "D", "A"],
+            "transfer_type": [2, 3, 2],
+            "min_transfer_time": [300, None, 600],
+        }
+    )
+
+    footpaths = gtfs.build_footpaths(stops, transfers)
+
+    walks = dict(footpaths.neighbors("B"))
+    assert set(walks) == {"A", "D"}  # C is ~2km away
+    assert 80 <= walks["A"] <= 90  # ~111m at 1.3 m/s
+    assert dict(footpaths.neighbors("A")) == {"B": 300}  # A->D forbidden
+    assert dict(footpaths.neighbors("C")) == {"A": 600}  # explicit transfer
+    assert footpaths.neighbors("missing") == []
+
+
+def test_footpaths_without_coordinates(fake_gtfs):
+    """Feeds without stop coordinates produce an empty walking graph"""
+    assert len(fake_gtfs.footpaths) == 0
+    assert gtfs.get_walking_transfers("DCS1", fake_gtfs) == []
+
+
+def _with_frequency_trip(data):
+    """Add a headway-based trip F1 (DCS1 -> UNI1, every 10 min 09:00-10:00)"""
+    trips = pd.concat(
+        [
+            data.trips,
+            pd.DataFrame(
+                [["1", "WEEKDAY", "F1", "University", None]],
+                columns=data.trips.columns,
+            ),
+        ],
+        ignore_index=True,
+    )
+    stop_times = pd.concat(
+        [
+            data.stop_times,
+            pd.DataFrame(
+                [
+                    ["F1", "06:00:00", "06:00:00", "DCS1", 1],
+                    ["F1", "06:20:00", "06:20:00", "UNI1", 2],
+                ],
+                columns=data.stop_times.columns,
+            ),
+        ],
+        ignore_index=True,
+    )
+    frequencies = pd.DataFrame(
+        {
+            "trip_id": ["F1"],
+            "start_time": ["09:00:00"],
+            "end_time": ["10:00:00"],
+            "headway_secs": [600],
+        }
+    )
+    return replace(data, trips=trips, stop_times=stop_times, frequencies=frequencies)
+
+
+def test_frequency_trips_expand_lazily(fake_gtfs):
+    """Headway trips are kept as templates and expanded per query window"""
+    data = _with_frequency_trip(fake_gtfs)
+
+    template = data.frequency_templates["F1"]
+    assert template.departure_offsets == [0, 1200]
+    assert template.windows == [(32400, 36000, 600)]
+    # The template's own stop times never show up as scheduled departures
+    assert len(data.departures.rows_after(["DCS1"])) == 1
+
+    trains = gtfs.find_next_trains("DCS", "UNI", 34000, date(2025, 1, 1), data, limit=3)
+    assert trains == [
+        ("09:30:00", "09:50:00", "F1", "University"),
+        ("09:40:00", "10:00:00", "F1", "University"),
+        ("09:50:00", "10:10:00", "F1", "University"),
+    ]
+
+    # Scheduled and headway departures are merged in time order
+    departures = gtfs.find_departures(["DCS1"], ["T1", "F1"], 0, data, limit=2)
+    assert departures == [
+        ("08:00:00", None, "UNI", "University"),
+        ("09:00:00", None, "F1", "University"),
+    ]
+
+    # Nothing is generated past the end of the headway window
+    assert gtfs.find_departures(["DCS1"], ["F1"], 36000, data) == []
+
+
+def test_route_catalog_from_trips(fake_gtfs):
+    """Without routes.txt the catalog is derived from trips.txt"""
+    catalog = fake_gtfs.route_catalog
+
+    route = catalog.routes["1"]
+    assert route.headsigns == {0: ["University"]}
+    assert route.stops == {0: ["DCS1", "UNI1"]}
+    assert catalog.routes_at("UNI1") == [route]
+    assert catalog.trip_ids("university") == ["T1"]
+    assert catalog.trip_ids("1") == ["T1"]
+
+
+def test_route_catalog_lookup(fake_gtfs):
+    """Names from routes.txt resolve exactly; long names also by substring"""
+    routes = pd.DataFrame(
+        {
+            "route_id": [1],
+            "route_short_name": [3],
+            "route_long_name": ["UNIVERSITY / INGERSOLL"],
+        }
+    )
+    catalog = replace(fake_gtfs, routes=routes).route_catalog
+
+    assert catalog.routes["1"].display_name == "3 UNIVERSITY / INGERSOLL"
+    assert [r.route_id for r in catalog.resolve("3")] == ["1"]
+    assert [r.route_id for r in catalog.resolve("university/ingersoll")] == ["1"]
+    assert [r.route_id for r in catalog.resolve("ingersoll")] == ["1"]
+    assert catalog.lookup("university") == [("1", "University")]
+    assert catalog.resolve("33") == []
+
+
+def test_trip_layout_slices(fake_gtfs):
+    """Each trip's calls form one contiguous, sequence-ordered slice"""
+    layout = fake_gtfs.trip_layout
+    calls = layout.calls("T1")
+    assert calls == slice(0, 2)
+    assert [layout.stop_ids[s] for s in layout.stops[calls]] == ["DCS1", "UNI1"]
+    assert layout.calls("missing") == slice(0, 0)
+
+    after = layout.calls_after("T1", "DCS1")
+    assert [layout.stop_ids[s] for s in layout.stops[after]] == ["UNI1"]
+
+    assert gtfs.get_trip_stop_times("T1", fake_gtfs) == [
+        ("DCS1", "08:00:00", "08:00:00"),
+        ("UNI1", "08:50:00", "08:50:00"),
+    ]
+
+
+def test_find_trips(fake_gtfs):
+    assert gtfs.find_trips("T1", fake_gtfs) == ["T1"]  # trip ID
+    assert gtfs.find_trips("uni", fake_gtfs) == ["T1"]  # bus number
+    assert gtfs.find_trips("999", fake_gtfs) == []
+
+
+def test_parallel_load_matches_serial_load(feed_folder, monkeypatch):
+    """Loading on several threads builds the same tables and indexes"""
+    monkeypatch.setenv("DART_MCP_LOAD_THREADS", "1")
+    serial = gtfs.load_gtfs_data(feed_folder)
+    monkeypatch.setenv("DART_MCP_LOAD_THREADS", "4")
+    parallel = gtfs.load_gtfs_data(feed_folder)
+
+    assert parallel.station_to_platform_stops == serial.station_to_platform_stops
+    assert parallel.all_stops.equals(serial.all_stops)
+    assert parallel.stations.equals(serial.stations)
+    assert parallel.stop_times.equals(serial.stop_times)
+    assert parallel.route_catalog == serial.route_catalog
+    assert parallel.trip_layout.trip_ids == serial.trip_layout.trip_ids
+    assert (parallel.departures.seconds == serial.departures.seconds).all()
+    assert (parallel.connections.departures == serial.connections.departures).all()
+    # Every stage was built during the load
+    assert {name for stage in gtfs.INDEX_STAGES for name in stage} <= set(
+        parallel.build_seconds
+    )
+
+
+def test_lazy_load_reads_tables_on_first_use(feed_folder, monkeypatch):
+    """Listings read stops.txt only; indexes read the tables they declare"""
+    read = []
+    read_csv = gtfs.pd.read_csv
+
+    def spy(path, **kwargs):
+        time.sleep(0.01)  # give concurrent readers a chance to race
+        read.append(path.name)
+        return read_csv(path, **kwargs)
+
+    monkeypatch.setattr(gtfs.pd, "read_csv", spy)
+    data = gtfs.load_gtfs_data(feed_folder, lazy=True)
+    assert read == []
+
+    stations = gtfs.list_all_stations(data)
+    assert gtfs.find_stops_by_name("University", data)
+    assert read == ["stops.txt"]
+
+    # Tables are read once, however many threads ask at the same time
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: data.route_catalog, range(8)))
+    assert sorted(read) == ["routes.txt", "stop_times.txt", "stops.txt", "trips.txt"]
+    assert "calendar" not in data.__dict__
+    assert data.route_catalog.resolve("University")
+
+    eager = gtfs.load_gtfs_data(feed_folder)
+    assert stations == gtfs.list_all_stations(eager)
+    assert data.stations.equals(eager.stations)
+    assert data.route_catalog == eager.route_catalog
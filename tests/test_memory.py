@@ -0,0 +1,49 @@
+import json
+import sys
+
+from fastapi.testclient import TestClient
+
+from dart_mcp import gtfs, memory, remote_server, server, storage
+
+
+def test_report_covers_tables_indexes_and_build_times(feed_folder, tmp_path):
+    report = memory.load_and_report(feed_folder)
+    assert report.tables["stop_times"] > 0
+    assert set(report.derived_columns) == {
+        "stations.normalized_name",
+        "all_stops.parent_station_str",
+    }
+    assert {"trip_layout", "departures", "station_to_platform_stops"} <= set(
+        report.indexes
+    )
+    assert "stop_names" in report.unbuilt
+    # Every index load_gtfs_data built has its build time
+    assert report.build_seconds["trip_layout"] >= 0
+    assert set(report.build_seconds) == set(report.indexes) - {
+        "station_to_platform_stops"
+    }
+    assert report.rss_after and report.load_seconds is not None
+    assert report.mapped == {}
+
+    # Arrays of a memory-mapped timetable are reported apart
+    gtfs.load_gtfs_data(feed_folder, timetable_dir=tmp_path / "tt")
+    mapped = memory.load_and_report(feed_folder, timetable_dir=tmp_path / "tt")
+    assert "stop_times" not in mapped.tables
+    assert mapped.mapped["trip_layout"] > 0
+    assert "trip_layout" in mapped.summary()
+
+
+def test_memory_endpoint_and_cli(feed_folder, monkeypatch, capsys):
+    data = gtfs.load_gtfs_data(feed_folder)
+    monkeypatch.setattr(
+        storage, "get_default_backend", lambda: storage.PandasBackend(data)
+    )
+    body = TestClient(remote_server.app).get("/debug/memory").json()
+    assert body["engine"] == "pandas"
+    assert body["tables"]["trips"] > 0
+    assert body["total"] >= sum(body["indexes"].values())
+
+    monkeypatch.setattr(sys, "argv", ["dart-mcp", "memory", str(feed_folder), "--json"])
+    server.main()
+    report = json.loads(capsys.readouterr().out)
+    assert report["feed_version"] == data.feed_version
@@ -0,0 +1,284 @@
+import json
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from dart_mcp import gtfs, remote_server, storage
+from dart_mcp.engine import Engine
+from dart_mcp.warmup import Warmup
+
+
+def engine_client(data):
+    """A client of an app whose engine serves ``data``."""
+    engine = Engine(load_backend=lambda: storage.PandasBackend(data))
+    return TestClient(remote_server.create_app(engine))
+
+
+@pytest.fixture
+def client(fake_gtfs):
+    return engine_client(fake_gtfs)
+
+
+def test_next_trains_json_format(client):
+    """format=json skips text rendering and returns structured departures"""
+    response = client.post(
+        "/mcp/next_trains",
+        json={
+            "origin": "DART",
+            "destination": "University",
+            "when_iso": "2025-01-01T07:00:00",
+            "format": "json",
+        },
+    )
+
+    body = response.json()
+    assert body["success"] is True
+    assert body["data"] == ""
+    assert [d["departure_time"] for d in body["structured"]["departures"]] == [
+        "08:00:00",
+        "32:00:00",
+        "56:00:00",
+        "128:00:00",
+        "152:00:00",
+    ]
+
+
+def test_next_trains_json_error(client):
+    """format=json reports an unknown stop as a failure, like the text format"""
+    response = client.post(
+        "/mcp/next_trains",
+        json={"origin": "Nowhere", "destination": "University", "format": "json"},
+    )
+
+    body = response.json()
+    assert body["success"] is False
+    assert "'Nowhere' not found" in body["error"]
+    assert body["structured"] is None
+
+
+def test_travel_time_matrix_streams_rows(network_gtfs):
+    """The matrix endpoint streams one JSON line per origin"""
+    client = engine_client(network_gtfs)
+
+    response = client.post(
+        "/mcp/travel_time_matrix",
+        json={
+            "origins": ["Stop A", "Stop B"],
+            "destinations": ["Stop C", "Stop E"],
+            "depart_at": "2025-01-01T07:55:00",
+            "max_minutes": 60,
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [
+        {"origin": "Stop A", "travel_minutes": {"Stop C": 25, "Stop E": 45}},
+        {"origin": "Stop B", "travel_minutes": {"Stop C": 25, "Stop E": 45}},
+    ]
+
+    # Minutes are rounded up to whole ones, as by the travel_time_matrix tool
+    response = client.post(
+        "/mcp/travel_time_matrix",
+        json={
+            "origins": ["Stop A"],
+            "destinations": ["Stop C"],
+            "depart_at": "2025-01-01T07:55:30",
+        },
+    )
+    assert json.loads(response.text)["travel_minutes"] == {"Stop C": 25}
+
+
+def test_travel_time_matrix_unknown_stop(network_gtfs):
+    client = engine_client(network_gtfs)
+
+    response = client.post(
+        "/mcp/travel_time_matrix",
+        json={"origins": ["Nowhere"], "destinations": ["Stop E"]},
+    )
+
+    body = response.json()
+    assert body["success"] is False
+    assert "Stop not found: Nowhere" in body["error"]
+
+
+def test_readiness_waits_for_warmup():
+    """/health answers at once; /ready and feed requests wait for warmup"""
+    release = threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        release.wait(5)
+        return {"stations": 2}
+
+    opened = []
+
+    def load_backend():
+        opened.append(1)
+        return storage.get_default_backend()
+
+    engine = Engine(warmup=Warmup(load), warmup_wait=0.1, load_backend=load_backend)
+    client = TestClient(remote_server.create_app(engine))
+    engine.start()
+
+    assert client.get("/health").status_code == 200
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "warming"
+
+    response = client.get("/mcp/stations")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+    # The tools listing answers without touching the backend being loaded
+    response = client.get("/mcp/tools")
+    assert response.status_code == 200
+    assert opened == []
+
+    release.set()
+    engine.warmup_wait = 5.0
+    assert client.get("/mcp/stations").json()["success"] is True
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["stations"] == 2
+    assert loads == [1]
+
+
+def test_readiness_waits_for_lazy_indexes(feed_folder):
+    """A lazily loaded feed is only ready once its query indexes are built"""
+    data = gtfs.load_gtfs_data(feed_folder, lazy=True)
+    engine = Engine(load_backend=lambda: storage.PandasBackend(data), warmup_wait=5.0)
+    client = TestClient(remote_server.create_app(engine))
+    assert "departures" not in data.__dict__
+
+    engine.start()
+    assert client.get("/mcp/stations").json()["success"] is True
+    response = client.get("/ready")
+    assert response.status_code == 200
+    for name in ("departures", "arrivals", "connections", "service_spans"):
+        assert name in data.__dict__
+
+
+def test_static_listings_are_conditional_and_compressed(monkeypatch):
+    """Listings carry feed validators, answer 304 and are sent gzipped"""
+    feed_version = "a" * 64
+    engine = Engine()
+    engine.payloads.last_modified = lambda: 0
+    monkeypatch.setattr(Engine, "feed_version", property(lambda _: feed_version))
+    client = TestClient(remote_server.create_app(engine))
+
+    response = client.get("/mcp/stations")
+    assert response.json()["success"] is True
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"aaaa')
+    assert response.headers["last-modified"] == "Thu, 01 Jan 1970 00:00:00 GMT"
+
+    response = client.get("/mcp/stations", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    response = client.get(
+        "/mcp/stations",
+        headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"},
+    )
+    assert response.status_code == 304
+
+    response = client.get("/mcp/tools", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert [t["name"] for t in response.json()["tools"]][0] == "next_trains"
+    response = client.get("/mcp/tools", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+    # A new feed invalidates the stored payloads
+    feed_version = "b" * 64
+    response = client.get("/mcp/stations", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_handlers_share_the_app_engine(fake_gtfs, monkeypatch):
+    """Each app serves from its own engine, injected into every handler"""
+    engine = Engine(
+        warmup=Warmup(lambda: {"stations": 7}),
+        load_backend=lambda: storage.PandasBackend(fake_gtfs),
+    )
+    app = remote_server.create_app(engine)
+    assert app.state.engine is engine
+
+    # Handlers answer from the engine's backend, never the default data
+    def fail():
+        raise AssertionError("the default data should not be needed")
+
+    monkeypatch.setattr(gtfs, "get_default_data", fail)
+    with TestClient(app) as client:
+        # The startup hook warms the engine the app was built around
+        assert client.get("/mcp/stations").json()["success"] is True
+        assert client.get("/ready").json()["stations"] == 7
+        response = client.post(
+            "/mcp/next_trains",
+            json={
+                "origin": "DART",
+                "destination": "University",
+                "when_iso": "2025-01-01T07:00:00",
+            },
+        )
+        assert "• Bus UNI: 08:00:00" in response.json()["data"]
+    assert engine.pools["lookup"].admitted == 1
+
+
+def test_service_frequency_endpoint(client):
+    response = client.post(
+        "/mcp/service_frequency",
+        json={"day": "weekday", "stop": "DART", "format": "json"},
+    )
+    body = response.json()
+    assert body["success"] is True
+    (series,) = body["structured"]["series"]
+    assert series["first_departure"] == "08:00:00"
+    assert series["hours"] == [
+        {
+            "hour": 8,
+            "departures": 1,
+            "mean_headway_minutes": None,
+            "max_headway_minutes": None,
+        }
+    ]
+
+    response = client.post("/mcp/service_frequency", json={"day": "weekday"})
+    assert response.json()["success"] is False
+    assert "Give a route, a stop or both" in response.json()["error"]
+
+
+def test_segment_times_endpoint(client):
+    response = client.post("/mcp/segment_times", json={"route": "1", "format": "json"})
+    body = response.json()
+    assert body["success"] is True
+    (segment,) = body["structured"]["segments"]
+    assert segment["hour_band"] == "am_peak"
+    assert segment["median_minutes"] == 50.0
+
+    data = client.post("/mcp/segment_times", json={"route": "1"}).json()["data"]
+    assert "DART CENTRAL STATION Platform 1 -> University Platform 1" in data
+
+
+def test_last_bus_endpoint(client):
+    response = client.post(
+        "/mcp/last_bus",
+        json={
+            "origin": "DART",
+            "destination": "University",
+            "when_iso": "2025-01-01",
+            "format": "json",
+        },
+    )
+    departure = response.json()["structured"]["departure"]
+    assert (departure["departure_time"], departure["train_name"]) == ("08:00:00", "UNI")
+
+    response = client.post(
+        "/mcp/first_bus",
+        json={"origin": "DART", "destination": "University", "when_iso": "2025-01-04"},
+    )
+    assert "No service available on Saturday" in response.json()["data"]
@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+from dart_mcp import routing
+
+WEDNESDAY = date(2025, 1, 1)
+
+
+def _arrivals(result):
+    return {a.stop_id: (a.arrival_seconds, a.transfers) for a in result}
+
+
+def test_earliest_arrivals_with_walking_transfer(network_gtfs):
+    """One sweep reaches E by riding R1, walking C -> D and riding R2"""
+    result = routing.earliest_arrivals(
+        ["A"], 7 * 3600 + 55 * 60, WEDNESDAY, network_gtfs, max_seconds=3600
+    )
+    arrivals = _arrivals(result)
+
+    assert arrivals["A"] == (28500, 0)
+    assert arrivals["B"] == (29400, 0)
+    assert arrivals["C"] == (30000, 0)
+    assert 30000 < arrivals["D"][0] < 30060  # short walk from C
+    assert arrivals["E"] == (31200, 1)
+    assert [a.stop_id for a in result] == ["A", "B", "C", "D", "E"]
+
+
+def test_earliest_arrivals_respects_limits(network_gtfs):
+    """Transfers and the time budget both bound the reachable set"""
+    no_transfers = routing.earliest_arrivals(
+        ["A"], 28500, WEDNESDAY, network_gtfs, max_seconds=3600, max_transfers=0
+    )
+    assert "E" not in _arrivals(no_transfers)
+
+    short_budget = routing.earliest_arrivals(
+        ["A"], 28500, WEDNESDAY, network_gtfs, max_seconds=20 * 60
+    )
+    assert set(_arrivals(short_budget)) == {"A", "B"}
+
+    # No service on Saturday: only the origin itself is "reachable"
+    weekend = routing.earliest_arrivals(["A"], 28500, date(2025, 1, 4), network_gtfs)
+    assert _arrivals(weekend) == {"A": (28500, 0)}
+
+
+def test_travel_time_matrix_rows(network_gtfs):
+    """Each origin yields a row of travel seconds, None when out of reach"""
+    origins = routing.resolve_places(["Stop A", "Stop D"], network_gtfs)
+    destinations = routing.resolve_places(["Stop C", "Stop E"], network_gtfs)
+
+    rows = routing.travel_time_matrix(
+        origins, destinations, 28500, WEDNESDAY, network_gtfs, max_seconds=3600
+    )
+
+    assert next(rows) == ("Stop A", [1500, 2700])
+    name, (to_c, to_e) = next(rows)
+    assert name == "Stop D"
+    assert to_c < 60  # a short walk
+    assert to_e == 1500  # the 08:05 R2 trip
+    assert list(rows) == []
+
+    # Destinations beyond the time budget are None
+    rows = routing.travel_time_matrix(
+        origins[:1], destinations, 28500, WEDNESDAY, network_gtfs, max_seconds=1800
+    )
+    assert list(rows) == [("Stop A", [1500, None])]
+
+
+def test_resolve_places_unknown_stop(network_gtfs):
+    with pytest.raises(ValueError, match="Stop not found: Nowhere"):
+        routing.resolve_places(["Nowhere"], network_gtfs)
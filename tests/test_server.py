@@ -1,6 +1,8 @@
+import inspect
+
 import pytest
 
-from dart_mcp import server
+from dart_mcp import gtfs, server
 
 
 @pytest.mark.asyncio
@@ -11,6 +13,36 @@ async def test_next_trains_basic():
     # Should contain departure times for DART
 
 
+@pytest.mark.asyncio
+async def test_next_trains_json_output():
+    """Structured output returns departure records instead of text"""
+    board = await server.next_trains(
+        "DART", "University", "2025-01-01T07:00:00", output_format="json"
+    )
+    assert board["origin"] == "DART CENTRAL STATION"
+    assert board["date"] == "2025-01-01"
+    assert board["departures"][0] == {
+        "departure_time": "08:00:00",
+        "arrival_time": None,
+        "train_name": "UNI",
+        "headsign": "University",
+    }
+    # The board is filled up from the following service days
+    assert [d["departure_time"] for d in board["departures"]] == [
+        "08:00:00",
+        "32:00:00",
+        "56:00:00",
+        "128:00:00",
+        "152:00:00",
+    ]
+
+    board = await server.next_trains(
+        "Nonexistent Station", "University", output_format="json"
+    )
+    assert board["departures"] == []
+    assert "not found" in board["message"]
+
+
 @pytest.mark.asyncio
 async def test_next_trains_error_cases():
     """Test error handling in next_trains function"""
@@ -22,9 +54,65 @@ async def test_next_trains_error_cases():
     msg = await server.next_trains("Nonexistent Station", "University")
     assert "not found" in msg
 
-    # Test no trains available (weekend)
+    # No buses at the weekend: the board rolls over to Monday
     msg = await server.next_trains("DART", "University", "2025-01-04T07:00:00")  # Saturday
-    assert "No more trains today" in msg
+    assert "• Bus UNI: Monday 08:00:00 (to University)" in msg
+
+
+@pytest.mark.asyncio
+async def test_first_and_last_bus():
+    msg = await server.last_bus("DART", "University", "2025-01-01")
+    assert msg == (
+        "Last DART bus from DART CENTRAL STATION to University on Wednesday,"
+        " January 01, 2025: Bus UNI at 08:00:00 (to University)."
+    )
+    record = await server.first_bus(
+        "DART", "University", "2025-01-01T23:00:00", output_format="json"
+    )
+    assert record["departure"]["departure_time"] == "08:00:00"
+    record = await server.first_bus("DART", "Narnia", output_format="json")
+    assert record["departure"] is None and "not found" in record["message"]
+
+    # Friday after the last bus: the board carries on from Monday
+    msg = await server.next_trains("DART", "University", "2025-01-03T09:00:00")
+    assert msg == (
+        "Next DART bus departures from DART CENTRAL STATION to University on"
+        " Friday, January 03, 2025:\n(Current time: 09:00 AM)\n\n"
+        "• Bus UNI: Monday 08:00:00 (to University)\n"
+        "• Bus UNI: Tuesday 08:00:00 (to University)\n"
+        "• Bus UNI: Wednesday 08:00:00 (to University)\n"
+        "• Bus UNI: Thursday 08:00:00 (to University)\n"
+        "• Bus UNI: Friday 08:00:00 (to University)"
+    )
+    record = await server.next_trains(
+        "DART", "University", "2025-01-03T09:00:00", output_format="json"
+    )
+    assert record["departures"][0]["departure_time"] == "80:00:00"
+
+
+@pytest.mark.asyncio
+async def test_next_trains_arrive_by():
+    msg = await server.next_trains(
+        "DART", "University", "2025-01-01T09:00:00", arrive_by=True
+    )
+    assert "arriving by 09:00 AM on Wednesday, January 01, 2025" in msg
+    assert "• Bus UNI: 08:00:00 → 08:50:00 (to University)" in msg
+
+    board = await server.next_trains(
+        "DART", "University", "2025-01-01T08:49:00", output_format="json", arrive_by=True
+    )
+    assert board["departures"] == []
+    assert "No buses from DART CENTRAL STATION to University arrive by 08:49 AM" in (
+        board["message"]
+    )
+
+
+@pytest.mark.asyncio
+async def test_next_trains_stale_feed():
+    """Dates past the end of the feed say so instead of looking like a day off"""
+    msg = await server.next_trains("DART", "University", "2026-03-04T07:00:00")
+    assert "No service available on Wednesday, March 04, 2026." in msg
+    assert "only covers service until December 31, 2025" in msg
 
 
 @pytest.mark.asyncio
@@ -44,3 +132,66 @@ async def test_list_stations():
     assert "Available DART bus stops:" in msg
     assert "DART CENTRAL STATION" in msg
     # Should be sorted alphabetically
+
+
+@pytest.mark.asyncio
+async def test_list_routes_and_route_stops():
+    """Routes are listed from the catalog and their stops shown in order"""
+    msg = await server.list_routes()
+    assert "• 1 (to University)" in msg
+
+    msg = await server.route_stops("University")
+    assert msg.splitlines() == [
+        "Route 1 to University:",
+        "1. DART CENTRAL STATION Platform 1",
+        "2. University Platform 1",
+    ]
+
+    msg = await server.route_stops("nowhere")
+    assert "not found" in msg
+
+
+@pytest.mark.asyncio
+async def test_reachable_stops(monkeypatch, network_gtfs):
+    """Reachable stops are listed with arrival times and transfers"""
+    monkeypatch.setattr(gtfs, "get_default_data", lambda: network_gtfs)
+
+    msg = await server.reachable_stops("Stop A", "2025-01-01T07:55:00", 60)
+    assert "Stops reachable from Stop A within 60 minutes" in msg
+    assert "• Stop B: 08:10:00" in msg
+    assert "• Stop E: 08:40:00 (1 transfer)" in msg
+
+    msg = await server.reachable_stops("Nowhere")
+    assert "not found" in msg
+
+
+@pytest.mark.asyncio
+async def test_travel_time_matrix(monkeypatch, network_gtfs):
+    monkeypatch.setattr(gtfs, "get_default_data", lambda: network_gtfs)
+
+    msg = await server.travel_time_matrix(
+        ["Stop A", "Stop D"], ["Stop C", "Stop E"], "2025-01-01T07:55:00", 60
+    )
+    assert "Origin | Stop C | Stop E" in msg
+    assert "Stop A | 25 | 45" in msg
+    assert "Stop D | 1 | 25" in msg
+
+
+@pytest.mark.asyncio
+async def test_trip_details():
+    msg = await server.trip_details("Bus UNI")
+    assert msg.splitlines() == [
+        "Trip T1 on route 1 (to University):",
+        "1. 08:00:00  DART CENTRAL STATION Platform 1",
+        "2. 08:50:00  University Platform 1",
+    ]
+
+    msg = await server.trip_details("nope")
+    assert "not found" in msg
+
+
+def test_tools_hide_the_backend_argument():
+    """Callers owning a backend pass it; MCP clients never see it"""
+    assert "backend" in inspect.signature(server.next_trains.__wrapped__).parameters
+    for tool in (server.next_trains, server.list_stations, server.service_frequency):
+        assert "backend" not in inspect.signature(tool).parameters
@@ -0,0 +1,231 @@
+import sys
+from datetime import date, datetime
+
+import pytest
+
+from dart_mcp import gtfs, server, storage
+
+
+@pytest.fixture
+def backends(feed_folder, tmp_path):
+    sqlite = storage.SQLiteBackend.from_feed(feed_folder, tmp_path / "gtfs.sqlite")
+    yield storage.PandasBackend(gtfs.load_gtfs_data(feed_folder)), sqlite
+    sqlite.close()
+
+
+def test_engines_answer_queries_alike(backends):
+    pandas_engine, sqlite_engine = backends
+    wednesday = date(2025, 1, 1)
+
+    for engine in backends:
+        assert engine.find_stops_by_name("dart") == [
+            {"stop_id": "DCS", "stop_name": "DART CENTRAL STATION"},
+            {"stop_id": "DCS1", "stop_name": "DART CENTRAL STATION Platform 1"},
+        ]
+        assert engine.list_all_stations() == ["DART CENTRAL STATION", "University"]
+        assert engine.get_active_service_ids(wednesday) == ["WEEKDAY"]
+        assert engine.get_active_service_ids(date(2025, 1, 4)) == []
+        assert engine.service_end == date(2025, 12, 31)
+        assert engine.trips_serving(["UNI1"]) == {"T1", "T2", "F1"}
+        assert engine.stop_name("UNI1") == "University Platform 1"
+        assert engine.route_catalog.trip_ids("University") == ["T1", "T2", "F1"]
+
+    assert sqlite_engine.feed_version == pandas_engine.feed_version
+    assert sqlite_engine.route_catalog == pandas_engine.route_catalog
+
+    for after in (0, 9 * 3600, 10 * 3600):
+        expected = pandas_engine.find_departures(["DCS1"], ["T1", "T2", "F1"], after)
+        assert sqlite_engine.find_departures(["DCS1"], ["T1", "T2", "F1"], after) == (
+            expected
+        )
+        expected = pandas_engine.find_next_trains("DCS", "UNI", after, wednesday)
+        assert sqlite_engine.find_next_trains("DCS", "UNI", after, wednesday) == (
+            expected
+        )
+
+    for before in (8 * 3600, 9 * 3600 + 35 * 60, 12 * 3600):
+        expected = pandas_engine.find_arrivals(
+            ["DCS1"], ["UNI1"], ["T1", "T2", "F1"], before, limit=3
+        )
+        assert sqlite_engine.find_arrivals(
+            ["DCS1"], ["UNI1"], ["T1", "T2", "F1"], before, limit=3
+        ) == (expected)
+    # The latest three arriving by noon, in time order
+    assert sqlite_engine.find_arrivals(
+        ["DCS1"], ["UNI1"], ["T1", "T2", "F1"], 12 * 3600, limit=3
+    ) == [
+        ("09:10:00", "09:30:00", "F1", "University"),
+        ("09:20:00", "09:40:00", "F1", "University"),
+        ("11:00:00", "11:40:00", "T2", "University"),
+    ]
+
+    for trip_ids in (["T1", "T2", "F1"], ["F1"], ["T2"]):
+        expected = pandas_engine.service_span(["UNI1"], trip_ids)
+        assert sqlite_engine.service_span(["UNI1"], trip_ids) == expected
+    first, last = sqlite_engine.service_span(["DCS1"], ["T1", "T2", "F1"])
+    assert (first.departure_time, last.departure_time) == ("08:00:00", "11:00:00")
+    # The last F1 instance leaves at 09:20 and arrives at 09:40
+    assert sqlite_engine.service_span(["UNI1"], ["F1"]) == (
+        ("09:20:00", None, "F1", "University"),
+        ("09:40:00", None, "F1", "University"),
+    )
+    assert sqlite_engine.service_span(["UNI1"], []) is None
+
+    assert sqlite_engine.find_next_trains("DCS", "UNI", 9 * 3600, wednesday) == [
+        ("09:00:00", "09:20:00", "F1", "University"),
+        ("09:10:00", "09:30:00", "F1", "University"),
+        ("09:20:00", "09:40:00", "F1", "University"),
+        ("11:00:00", "11:40:00", "T2", "University"),
+    ]
+
+
+def test_sqlite_service_span_reads_span_table(backends, monkeypatch):
+    pandas_engine, sqlite_engine = backends
+    # T1, T2 and F1 call at the same stops for the same route and service
+    assert sqlite_engine.pattern_sizes == {0: 3}
+    queries = []
+    query = sqlite_engine._query
+    monkeypatch.setattr(
+        sqlite_engine,
+        "_query",
+        lambda sql, params=(): queries.append(sql) or query(sql, params),
+    )
+    trip_ids = ["T1", "T2", "F1"]
+    for stop_ids in (["DCS1"], ["UNI1"], ["DCS1", "UNI1"]):
+        expected = pandas_engine.service_span(stop_ids, trip_ids)
+        assert sqlite_engine.service_span(stop_ids, trip_ids) == expected
+    assert queries and not any("stop_times" in sql for sql in queries)
+
+
+def test_departures_roll_over_service_days(feed_folder, tmp_path):
+    # An overnight trip of the weekday service leaving at 00:30 the next day
+    with open(feed_folder / "trips.txt", "a") as f:
+        f.write("1,WEEKDAY,N1,University,OWL\n")
+    with open(feed_folder / "stop_times.txt", "a") as f:
+        f.write("N1,24:30:00,24:30:00,DCS1,1\nN1,25:10:00,25:10:00,UNI1,2\n")
+    pandas_engine = storage.PandasBackend(gtfs.load_gtfs_data(feed_folder))
+    sqlite_engine = storage.SQLiteBackend.from_feed(feed_folder, tmp_path / "db")
+    trip_ids = ["T1", "T2", "F1", "N1"]
+
+    for when in (
+        "2025-01-01T07:00",
+        "2025-01-01T23:50",
+        "2025-01-03T23:00",
+        "2025-01-04T00:10",
+    ):
+        when = datetime.fromisoformat(when)
+        expected = pandas_engine.find_upcoming_departures(["DCS1"], trip_ids, when)
+        assert sqlite_engine.find_upcoming_departures(["DCS1"], trip_ids, when) == (
+            expected
+        )
+    # Friday's overnight trip still runs early on Saturday, then Monday's buses
+    saturday = datetime(2025, 1, 4, 0, 10)
+    rows = sqlite_engine.find_upcoming_departures(["DCS1"], trip_ids, saturday)
+    assert [(row.departure_time, row.train_name) for row in rows] == [
+        ("00:30:00", "OWL"),
+        ("56:00:00", "UNI"),
+        ("57:00:00", "F1"),
+        ("57:10:00", "F1"),
+        ("57:20:00", "F1"),
+    ]
+    rows = sqlite_engine.find_upcoming_departures(
+        ["DCS1"], trip_ids, datetime(2025, 1, 4, 1, 0)
+    )
+    assert [row.departure_time for row in rows][:2] == ["56:00:00", "57:00:00"]
+    # One bus left tonight: the board is topped up from tomorrow's
+    rows = sqlite_engine.find_upcoming_departures(
+        ["DCS1"], trip_ids, datetime(2025, 1, 1, 23, 50)
+    )
+    assert [(row.departure_time, row.train_name) for row in rows] == [
+        ("24:30:00", "OWL"),
+        ("32:00:00", "UNI"),
+        ("33:00:00", "F1"),
+        ("33:10:00", "F1"),
+        ("33:20:00", "F1"),
+    ]
+    sqlite_engine.close()
+
+
+def test_engines_agree_on_service_end(feed_folder, tmp_path):
+    # A date added in calendar_dates extends the feed past the calendar
+    (feed_folder / "calendar_dates.txt").write_text(
+        "service_id,date,exception_type\nWEEKDAY,20260105,1\nWEEKDAY,20260112,2\n"
+    )
+    pandas_engine = storage.PandasBackend(gtfs.load_gtfs_data(feed_folder))
+    sqlite_engine = storage.SQLiteBackend.from_feed(feed_folder, tmp_path / "db")
+    assert pandas_engine.service_end == date(2026, 1, 5)
+    assert sqlite_engine.service_end == date(2026, 1, 5)
+    sqlite_engine.close()
+
+
+def test_sqlite_database_follows_the_feed(feed_folder, tmp_path):
+    path = tmp_path / "gtfs.sqlite"
+    engine = storage.SQLiteBackend.from_feed(feed_folder, path)
+    assert engine.list_all_stations() == ["DART CENTRAL STATION", "University"]
+    engine.close()
+
+    # A changed feed is detected and the database rebuilt
+    with open(feed_folder / "stops.txt", "a") as f:
+        f.write("ALT,Altoona,1,\n")
+    engine = storage.SQLiteBackend.from_feed(feed_folder, path)
+    assert "Altoona" in engine.list_all_stations()
+    engine.close()
+
+
+@pytest.mark.asyncio
+async def test_server_tools_on_sqlite_engine(feed_folder, tmp_path, monkeypatch):
+    engine = storage.SQLiteBackend.from_feed(feed_folder, tmp_path / "gtfs.sqlite")
+    monkeypatch.setattr(storage, "get_default_backend", lambda: engine)
+
+    msg = await server.next_trains("DART", "University", "2025-01-01T07:00:00")
+    assert "• Bus UNI: 08:00:00 (to University)" in msg
+    assert "• Bus F1: 09:00:00 (to University)" in msg
+
+    assert "1 University" in await server.list_routes()
+    assert "2. University Platform 1" in await server.route_stops("1")
+    engine.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_tools_refuse_sqlite_engine(feed_folder, tmp_path, monkeypatch):
+    engine = storage.SQLiteBackend.from_feed(feed_folder, tmp_path / "gtfs.sqlite")
+    monkeypatch.setattr(storage, "get_default_backend", lambda: engine)
+    # The in-memory feed must not be loaded behind the engine's back
+    monkeypatch.setattr(gtfs, "get_default_data", lambda: pytest.fail("loaded"))
+
+    for result in (
+        await server.service_frequency("weekday", route="1"),
+        await server.segment_times("1"),
+    ):
+        assert result.startswith("Error: This tool needs the in-memory storage")
+        assert "DART_MCP_STORAGE=pandas" in result
+    result = await server.segment_times("1", output_format="json")
+    assert result["segments"] == []
+    assert result["message"].startswith("Error:")
+    engine.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_engine_needs_no_pandas(feed_folder, tmp_path, monkeypatch):
+    # Import the package afresh with pandas and numpy unavailable
+    for name in list(sys.modules):
+        if name.split(".")[0] == "dart_mcp":
+            monkeypatch.delitem(sys.modules, name)
+    monkeypatch.setitem(sys.modules, "pandas", None)
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    from dart_mcp import server as bare_server
+    from dart_mcp import storage as bare_storage
+
+    engine = bare_storage.SQLiteBackend.from_feed(feed_folder, tmp_path / "db")
+    monkeypatch.setattr(bare_storage, "get_default_backend", lambda: engine)
+    msg = await bare_server.next_trains("DART", "University", "2025-01-01T07:00:00")
+    assert "• Bus UNI: 08:00:00 (to University)" in msg
+    msg = await bare_server.last_bus("DART", "University", "2025-01-01")
+    assert "Bus T2 at 11:00:00" in msg
+    engine.close()
+
+
+def test_unknown_engine(monkeypatch):
+    monkeypatch.setenv("DART_MCP_STORAGE", "parquet")
+    with pytest.raises(ValueError, match="Unknown storage engine"):
+        storage.get_default_backend()
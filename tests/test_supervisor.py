@@ -0,0 +1,102 @@
+import os
+import signal
+import time
+
+import pytest
+
+from dart_mcp import supervisor
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def started(tmp_path):
+    """A supervisor whose workers record which feed they inherited."""
+    feed = {"version": "v1"}
+    loaded = []
+
+    def target():
+        (tmp_path / str(os.getpid())).write_text(feed["version"])
+        signal.pause()
+
+    def load():
+        loaded.append(feed["version"])
+
+    sup = supervisor.Supervisor(
+        target,
+        workers=2,
+        load=load,
+        signature=lambda: feed["version"],
+        drain_seconds=2.0,
+    )
+    sup.start()
+    yield sup, feed, loaded, tmp_path
+    sup.stop()
+
+
+def workers_on(tmp_path, version):
+    return {
+        int(path.name) for path in tmp_path.iterdir() if path.read_text() == version
+    }
+
+
+def test_rollover_to_new_feed(started):
+    sup, feed, loaded, tmp_path = started
+    wait_for(lambda: workers_on(tmp_path, "v1") == sup.current)
+    first = set(sup.current)
+
+    sup.poll()
+    assert sup.current == first and loaded == ["v1"]
+
+    feed["version"] = "v2"
+    sup.poll()
+    assert loaded == ["v1", "v2"]
+    assert sup.generation == 2
+    assert set(sup.draining) == first
+    wait_for(lambda: workers_on(tmp_path, "v2") == sup.current)
+
+    # The old generation drains and is reaped
+    wait_for(lambda: (sup.poll(check_feed=False), not sup.draining)[1])
+    assert len(sup.current) == 2
+
+
+def test_crashed_worker_is_replaced(started):
+    sup, feed, loaded, tmp_path = started
+    victim = min(sup.current)
+    os.kill(victim, signal.SIGKILL)
+
+    wait_for(lambda: (sup.poll(), victim not in sup.current)[1])
+    assert len(sup.current) == 2
+    assert sup.generation == 1 and loaded == ["v1"]
+
+
+def test_failed_reload_keeps_serving(started):
+    sup, feed, loaded, tmp_path = started
+    first = set(sup.current)
+
+    def broken():
+        raise ValueError("truncated stop_times.txt")
+
+    sup.load = broken
+    feed["version"] = "v2"
+    sup.poll()
+    assert sup.current == first and sup.generation == 1
+
+
+def test_watch_feed(feed_folder):
+    version = supervisor.watch_feed(feed_folder)
+    before = version()
+
+    os.utime(feed_folder / "stops.txt", (0, 0))
+    assert version() == before
+
+    with open(feed_folder / "stops.txt", "a") as f:
+        f.write("ALT,Altoona,1,\n")
+    assert version() != before
@@ -0,0 +1,54 @@
+from datetime import date
+
+import numpy as np
+
+from dart_mcp import gtfs, storage, timetable
+
+
+def test_timetable_round_trip(feed_folder, tmp_path, monkeypatch):
+    expected = gtfs.load_gtfs_data(feed_folder)
+
+    first = gtfs.load_gtfs_data(feed_folder, timetable_dir=tmp_path / "tt")
+    path = timetable.timetable_path(tmp_path / "tt", expected.feed_version)
+    assert (path / "ids.json").exists()
+    assert first.stop_times is None
+
+    # The second load maps the saved arrays without reading stop_times.txt
+    read = []
+    read_csv = gtfs.pd.read_csv
+    monkeypatch.setattr(
+        gtfs.pd,
+        "read_csv",
+        lambda path, **kw: read.append(path.name) or read_csv(path, **kw),
+    )
+    data = gtfs.load_gtfs_data(feed_folder, timetable_dir=tmp_path / "tt")
+    assert "stop_times.txt" not in read
+    assert isinstance(data.trip_layout.departures, np.memmap)
+    assert isinstance(data.connections.trips, np.memmap)
+    assert data.trip_layout.trip_ids == expected.trip_layout.trip_ids
+    assert data.route_catalog == expected.route_catalog
+    assert data.frequency_templates == expected.frequency_templates
+
+    wednesday = date(2025, 1, 1)
+    engines = storage.PandasBackend(expected), storage.PandasBackend(data)
+    for after in (0, 9 * 3600, 10 * 3600):
+        results = [
+            (
+                engine.find_departures(["DCS1"], ["T1", "T2", "F1"], after),
+                engine.find_next_trains("DCS", "UNI", after, wednesday),
+                engine.trips_serving(["UNI1"]),
+            )
+            for engine in engines
+        ]
+        assert results[0] == results[1]
+
+
+def test_new_feed_gets_new_timetable(feed_folder, tmp_path):
+    first = gtfs.load_gtfs_data(feed_folder, timetable_dir=tmp_path)
+    with open(feed_folder / "stop_times.txt", "a") as f:
+        f.write("T2,11:50:00,11:50:00,DCS1,3\n")
+    second = gtfs.load_gtfs_data(feed_folder, timetable_dir=tmp_path)
+
+    assert first.feed_version != second.feed_version
+    assert len(list(tmp_path.glob("timetable-v*"))) == 2
+    assert len(second.trip_layout.stops) == len(first.trip_layout.stops) + 1